@@ -1,6 +1,10 @@
 <?php
 // ===== Session Management and Authentication =====
 $config = include('config.php');
+require_once __DIR__ . '/log_writer.php';
+require_once __DIR__ . '/summary_cache.php';
+require_once __DIR__ . '/log_query.php';
+require_once __DIR__ . '/visit_index.php';
 
 // Set session configuration using loaded config values
 if (!empty($config['SESSION_CONFIG']['SAVE_PATH'])) {
@@ -72,7 +76,11 @@ error_log("Admin panel initializing at " . date('Y-m-d H:i:s'));
  */
 /**
  * Rotates the check-in log automatically. JSON-ONLY.
- * Guaranteed safe against data loss if archive writes fail.
+ * Guaranteed safe against data loss if archive writes fail. Before the
+ * archives are appended to, their sizes are saved as a pending rotation in
+ * the sidecar, as rotate_checkin_log.py does; if the main log is not then
+ * replaced the appends are truncated away, and after a crash
+ * rotate_checkin_log.py rolls them back.
  */
 function rotateCheckinLogIfNeeded($config) {
     if (!isset($config['LOG_PATHS']['CHECKIN'])) return false;
@@ -100,66 +108,140 @@ function rotateCheckinLogIfNeeded($config) {
     }
 
     $currentMonthKey = date('Y_m');
-    $entriesByMonth = [];
-    $hasOldEntries = false;
-
-    $handle = fopen($checkInLog, 'r');
-    if (!$handle) return false;
-
-    while (($line = fgets($handle)) !== false) {
-        $data = json_decode(trim($line), true);
-        if (!$data || !isset($data['timestamp'])) continue;
-        try { $monthKey = (new DateTime($data['timestamp']))->format('Y_m'); } catch (Exception $e) { continue; }
-        if ($monthKey !== $currentMonthKey) $hasOldEntries = true;
-        if (!isset($entriesByMonth[$monthKey])) $entriesByMonth[$monthKey] = [];
-        $entriesByMonth[$monthKey][] = $line;
+    $state = readRotationState($checkInLog);
+    if (!empty($state['pending'])) {
+        error_log("LOG ROTATION (CHECKIN) SKIPPED: An interrupted rotation must be finished by rotate_checkin_log.py");
+        return false;
     }
-    fclose($handle);
-
-    if (!$hasOldEntries) return true;
+    if (!checkinLogNeedsRotation($checkInLog, $state, $currentMonthKey)) return true;
 
-    error_log("Old checkin entries found. Starting rotation.");
-    $successfullyArchivedMonths = [];
     $failedMonths = [];
-
-    foreach ($entriesByMonth as $month => $entries) {
-        if ($month === $currentMonthKey) continue;
-        $archiveFile = $archiveDir . '/checkin_' . $month . '.json';
-        
-        $contentToAppend = implode('', $entries);
-        $bytesWritten = @file_put_contents($archiveFile, $contentToAppend, FILE_APPEND | LOCK_EX);
-        
-        if ($bytesWritten !== false && $bytesWritten === strlen($contentToAppend)) {
-            @chmod($archiveFile, 0666);
-            $successfullyArchivedMonths[$month] = true;
-        } else {
-            $failedMonths[] = $month;
-            error_log("LOG ROTATION (CHECKIN) ERROR: Failed to write " . count($entries) . " entries for $month to $archiveFile");
+    $remainingMonths = [];
+    $pending = null;
+    $result = rewriteLog($checkInLog, function ($lines) use ($checkInLog, $archiveDir, $currentMonthKey, &$failedMonths, &$remainingMonths, &$pending) {
+        $entriesByMonth = [];
+        $hasOldEntries = false;
+        foreach ($lines as $line) {
+            $data = json_decode(trim($line), true);
+            // Lines without a usable timestamp stay in the main log
+            $monthKey = $currentMonthKey;
+            if ($data && isset($data['timestamp'])) {
+                try { $monthKey = (new DateTime($data['timestamp']))->format('Y_m'); } catch (Exception $e) {}
+            }
+            if ($monthKey !== $currentMonthKey) $hasOldEntries = true;
+            $entriesByMonth[$monthKey][] = $line;
         }
-    }
-
-    if (!empty($failedMonths)) {
-        error_log("LOG ROTATION (CHECKIN) ABORTED FULL PRUNING: Archiving failed for month(s): " . implode(', ', $failedMonths) . ". Preserving unarchived entries in main checkin log.");
-    }
+        $remainingMonths = array_keys($entriesByMonth);
+        if (!$hasOldEntries) return null;
 
-    // Keep current month entries PLUS any entries from months where archiving failed
-    $remainingEntries = [];
-    foreach ($entriesByMonth as $month => $entries) {
-        if ($month === $currentMonthKey || !isset($successfullyArchivedMonths[$month])) {
+        error_log("Old checkin entries found. Starting rotation.");
+        $pending = ['inode' => fileinode($checkInLog), 'archives' => []];
+        foreach (array_keys($entriesByMonth) as $month) {
+            if ($month === $currentMonthKey) continue;
+            $archiveFile = $archiveDir . '/checkin_' . $month . '.json';
+            clearstatcache(true, $archiveFile);
+            $pending['archives'][$archiveFile] = is_file($archiveFile) ? filesize($archiveFile) : 0;
+        }
+        if (!writeRotationState($checkInLog, ['pending' => $pending])) {
+            error_log("LOG ROTATION (CHECKIN) FAILED: Could not record the pending rotation");
+            $failedMonths = array_values(array_diff(array_keys($entriesByMonth), [$currentMonthKey]));
+            $pending = null;
+            return null;
+        }
+        // Keep current month entries PLUS any entries from months where archiving failed
+        $remainingEntries = [];
+        $remainingMonths = [];
+        foreach ($entriesByMonth as $month => $entries) {
+            if ($month !== $currentMonthKey) {
+                $archiveFile = $archiveDir . '/checkin_' . $month . '.json';
+                if (appendToLog($archiveFile, implode('', $entries))) {
+                    @chmod($archiveFile, 0666);
+                    continue;
+                }
+                // Drop whatever part of the month did reach the archive
+                truncateArchives([$archiveFile => $pending['archives'][$archiveFile]]);
+                $failedMonths[] = $month;
+                error_log("LOG ROTATION (CHECKIN) ERROR: Failed to write " . count($entries) . " entries for $month to $archiveFile");
+            }
+            $remainingMonths[] = $month;
             foreach ($entries as $eLine) {
                 $remainingEntries[] = $eLine;
             }
         }
-    }
+        if (!empty($failedMonths)) {
+            error_log("LOG ROTATION (CHECKIN) ABORTED FULL PRUNING: Archiving failed for month(s): " . implode(', ', $failedMonths) . ". Preserving unarchived entries in main checkin log.");
+        }
+        return $remainingEntries;
+    });
 
-    if (file_put_contents($checkInLog, implode('', $remainingEntries), LOCK_EX) !== false) {
-        @chmod($checkInLog, 0666);
-        error_log("Checkin log rotation completed. Retained " . count($remainingEntries) . " entries in main log.");
-        return empty($failedMonths);
-    } else {
+    if ($result === false) {
         error_log("LOG ROTATION (CHECKIN) ERROR: Could not rewrite main log file $checkInLog");
+        if ($pending !== null) {
+            // The old entries are still in the main log, so take them back out of the archives
+            truncateArchives($pending['archives']);
+            writeRotationState($checkInLog, $state);
+        }
         return false;
     }
+    saveRotationState($checkInLog, $remainingMonths);
+    if ($result === true) {
+        error_log("Checkin log rotation completed.");
+    }
+    return empty($failedMonths);
+}
+
+/**
+ * Reads the rotation sidecar shared with rotate_checkin_log.py.
+ */
+function readRotationState($checkInLog) {
+    $state = @json_decode(@file_get_contents(dirname($checkInLog) . '/.checkin_rotation.json'), true);
+    return is_array($state) ? $state : [];
+}
+
+/**
+ * O(1) check: the sidecar lists the months in the main log up to a byte
+ * offset, and anything appended since is a current check-in. Only a log
+ * replaced or truncated since the sidecar was written needs a full scan.
+ */
+function checkinLogNeedsRotation($checkInLog, $state, $currentMonthKey) {
+    if (!isset($state['inode'], $state['offset'], $state['months'])) return true;
+    clearstatcache(true, $checkInLog);
+    if ($state['inode'] !== @fileinode($checkInLog) || filesize($checkInLog) < $state['offset']) return true;
+    return array_diff($state['months'], [$currentMonthKey]) !== [];
+}
+
+function saveRotationState($checkInLog, $months) {
+    clearstatcache(true, $checkInLog);
+    sort($months);
+    writeRotationState($checkInLog, ['inode' => fileinode($checkInLog), 'offset' => filesize($checkInLog), 'months' => array_values($months)]);
+}
+
+function writeRotationState($checkInLog, $state) {
+    $stateFile = dirname($checkInLog) . '/.checkin_rotation.json';
+    if (file_put_contents($stateFile . '.tmp', json_encode($state ?: new stdClass())) !== false && rename($stateFile . '.tmp', $stateFile)) {
+        @chmod($stateFile, 0666);
+        return true;
+    }
+    return false;
+}
+
+/**
+ * Truncates archives back to the sizes they had before a rotation appended to them.
+ * @param array $sizes Archive path => size in bytes
+ */
+function truncateArchives($sizes) {
+    foreach ($sizes as $archiveFile => $size) {
+        clearstatcache(true, $archiveFile);
+        if (!is_file($archiveFile) || filesize($archiveFile) <= $size) continue;
+        $handle = openLockedLog($archiveFile, 'r+');
+        if (!$handle || !ftruncate($handle, $size)) {
+            error_log("LOG ROTATION (CHECKIN) ERROR: Could not roll back $archiveFile to $size bytes; run rotate_checkin_log.py");
+        }
+        if ($handle) {
+            flock($handle, LOCK_UN);
+            fclose($handle);
+        }
+    }
 }
 
 /**
@@ -238,10 +320,9 @@ if (isset($_GET['action'])) {
         exit();
     }
 
-    if ($_GET['action'] === 'get_log_entries') {
+    if ($_GET['action'] === 'query_log_entries') {
         try {
-            $entries = getCheckinLogEntries($config);
-            echo json_encode(['entries' => $entries]);
+            echo json_encode(queryLogEntries($config, $_GET));
         } catch (Exception $e) {
             http_response_code(500);
             echo json_encode(['error' => 'Failed to load log entries.']);
@@ -382,57 +463,102 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST') {
         */
     }
     // --- Handle Check-in Log Edits and Deletes ---
-    // Note: This is inefficient for very large logs as it rewrites the entire file.
-    // For now, it is functional.
-    function saveAllLogEntries($entries, $config) {
-        // This helper function will sort and write all entries back to the correct files.
-        $entriesByMonth = [];
-        foreach($entries as $entry) {
-            $monthKey = date('Y_m', strtotime($entry['timestamp']));
-            if (!isset($entriesByMonth[$monthKey])) $entriesByMonth[$monthKey] = [];
-            $entriesByMonth[$monthKey][] = json_encode($entry) . "\n";
-        }
-
+    // Only the file holding the entry (its month's archive, or the main log)
+    // is rewritten, via a temporary file renamed over it under the log lock.
+    // The visit index's write lock is held across the rewrite, as confirm.php
+    // holds it across an append, and the user's entry is recomputed from the
+    // rewritten logs before any kiosk can read it.
+    function saveLogEntry($entry, $changes, $config) {
+        // $changes holds the edited fields, or null to delete the entry
+        $original = $entry;
+        unset($original['id']);
         $checkInLogFile = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
-        $archiveDir = dirname($checkInLogFile) . '/archives';
-        $currentMonthKey = date('Y_m');
+        $archiveFile = dirname($checkInLogFile) . '/archives/checkin_' . date('Y_m', strtotime($entry['timestamp'])) . '.json';
 
-        // Write current month's entries to the main log
-        file_put_contents($checkInLogFile, implode('', $entriesByMonth[$currentMonthKey] ?? []));
-        unset($entriesByMonth[$currentMonthKey]);
+        $visitIndex = openVisitIndex($checkInLogFile);
+        if ($visitIndex !== null) {
+            try {
+                beginVisitIndexWrite($visitIndex);
+                // Apply appends at the old offsets before the main log may change
+                catchUpVisitIndex($visitIndex, $checkInLogFile);
+            } catch (PDOException $e) {
+                visitIndexError('Visit index not updated for log edit: ' . $e->getMessage());
+                rollBackVisitIndexWrite($visitIndex);
+                $visitIndex = null;
+            }
+        }
 
-        // Write all other months to their respective archives
-        foreach($entriesByMonth as $month => $lines) {
-            $archiveFile = $archiveDir . '/checkin_' . $month . '.json';
-            file_put_contents($archiveFile, implode('', $lines));
+        $result = false;
+        $rewrittenFile = null;
+        foreach ([$archiveFile, $checkInLogFile] as $file) {
+            if (!is_file($file)) continue;
+            $result = rewriteLog($file, function ($lines) use ($original, $changes) {
+                foreach ($lines as $index => $line) {
+                    if (parseLogLine($line) !== $original) continue;
+                    if ($changes === null) {
+                        unset($lines[$index]);
+                    } else {
+                        $lines[$index] = json_encode(array_merge(json_decode(trim($line), true), $changes)) . "\n";
+                    }
+                    return array_values($lines);
+                }
+                return null;
+            });
+            if ($result !== null) {
+                $rewrittenFile = $file;
+                break;
+            }
         }
-        return true;
-    }
+        $result = $result ?? false;
 
-    $allEntries = getCheckinLogEntries($config); // Load all entries
+        if ($visitIndex !== null) {
+            try {
+                if ($result) {
+                    if ($rewrittenFile === $checkInLogFile) {
+                        clearstatcache(true, $checkInLogFile);
+                        setVisitIndexMeta($visitIndex, 'log_offset', filesize($checkInLogFile));
+                    }
+                    $purdueIds = array_unique([(string)$entry['purdueId'], (string)($changes['purdueId'] ?? $entry['purdueId'])]);
+                    foreach ($purdueIds as $purdueId) {
+                        refreshVisitInIndex($visitIndex, $checkInLogFile, $purdueId);
+                    }
+                }
+                commitVisitIndexWrite($visitIndex);
+            } catch (PDOException $e) {
+                // Left as it was; visit_index.py or recount_visits.py rebuilds it
+                visitIndexError('Visit index not updated for log edit: ' . $e->getMessage());
+                rollBackVisitIndexWrite($visitIndex);
+            }
+        }
+        return $result;
+    }
 
     if (isset($_POST['delete_entry']) && isset($_POST['entry_id'])) {
-        $idToDelete = $_POST['entry_id'];
-        $allEntries = array_filter($allEntries, fn($entry) => $entry['id'] != $idToDelete);
-        saveAllLogEntries($allEntries, $config);
+        $entry = getLogEntryById($config, $_POST['entry_id'], $_POST['entry_timestamp'] ?? null, $_POST['entry_purdue_id'] ?? null);
+        if ($entry !== null) {
+            saveLogEntry($entry, null, $config);
+        } else {
+            error_log("Log entry not deleted: the check-in listed was moved or changed since the page loaded");
+        }
         header("Location: admin.php?view=editor"); exit();
     }
     
     if (isset($_POST['save_entry']) && isset($_POST['entry_id'])) {
-        $idToEdit = $_POST['entry_id'];
-        foreach($allEntries as &$entry) {
-            if ($entry['id'] == $idToEdit) {
-                // Update fields from POST data (sanitized)
-                $entry['fullName'] = trim(strip_tags($_POST['fullName'] ?? ''));
-                $entry['userGroup'] = trim(strip_tags($_POST['userGroup'] ?? ''));
-                $entry['department'] = trim(strip_tags($_POST['department'] ?? ''));
-                $entry['classification'] = trim(strip_tags($_POST['classification'] ?? ''));
-                $entry['visitCount'] = max(0, intval($_POST['visitCount'] ?? 0));
+        $entry = getLogEntryById($config, $_POST['entry_id'], $_POST['entry_timestamp'] ?? null, $_POST['entry_purdue_id'] ?? null);
+        if ($entry === null) {
+            error_log("Log entry not edited: the check-in listed was moved or changed since the page loaded");
+        } else {
+            // Update fields from POST data (sanitized)
+            $changes = [
+                'fullName' => trim(strip_tags($_POST['fullName'] ?? '')),
+                'userGroup' => trim(strip_tags($_POST['userGroup'] ?? '')),
+                'department' => trim(strip_tags($_POST['department'] ?? '')),
+                'classification' => trim(strip_tags($_POST['classification'] ?? '')),
+                'visitCount' => max(0, intval($_POST['visitCount'] ?? 0))
                 // Add more fields here if you make them editable
-                break;
-            }
+            ];
+            saveLogEntry($entry, $changes, $config);
         }
-        saveAllLogEntries($allEntries, $config);
         header("Location: admin.php?view=editor"); exit();
     }
 }
@@ -514,89 +640,21 @@ function getDebugLogEntries($config, $limit = 100) {
     return $entries;
 }
 function getDailyUsageData($config, $month) {
-    if (!isset($config['LOG_PATHS']['CHECKIN'])) return [];
-    $dailyData = [];
-    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
-    $dailyData = processLogForDailyData($checkInLog, $month, $dailyData);
-    $archiveFileJson = dirname($checkInLog) . '/archives/checkin_' . str_replace('-', '_', $month) . '.json';
-    $dailyData = processLogForDailyData($archiveFileJson, $month, $dailyData);
-    return $dailyData;
-}
-function processLogForDailyData($logFile, $month, $dailyData) {
-    if (!is_readable($logFile)) return $dailyData;
-    $handle = fopen($logFile, 'r');
-    if (!$handle) return $dailyData;
-    while (($line = fgets($handle)) !== false) {
-        $data = parseLogLine($line);
-        if ($data === null) continue;
-        try {
-            $dt = new DateTime($data['timestamp']);
-            if ($dt->format('Y-m') !== $month) continue;
-            $date = $dt->format('Y-m-d');
-        } catch (Exception $e) { continue; }
-        if (!isset($dailyData[$date])) $dailyData[$date] = ['total' => 0, 'groups' => []];
-        $dailyData[$date]['total']++;
-        $dailyData[$date]['groups'][$data['userGroup']] = ($dailyData[$date]['groups'][$data['userGroup']] ?? 0) + 1;
-    }
-    fclose($handle);
-    return $dailyData;
+    return mergeDailyCounts(getDashboardSummaries($config), $month);
 }
 function getUsageReport($config) {
-    if (!isset($config['LOG_PATHS']['CHECKIN'])) return [];
-    $usageReport = [];
-    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
-    $usageReport = processLogForUsageReport($checkInLog, $usageReport);
-    $archiveDir = dirname($checkInLog) . '/archives';
-    foreach (glob($archiveDir . '/checkin_*.json') as $archiveFile) {
-        $usageReport = processLogForUsageReport($archiveFile, $usageReport);
-    }
+    $usageReport = mergeMonthlyCounts(getDashboardSummaries($config), 'groups');
     krsort($usageReport);
     return $usageReport;
 }
-function processLogForUsageReport($logFile, $usageReport) {
-    if (!is_readable($logFile)) return $usageReport;
-    $handle = fopen($logFile, 'r');
-    if (!$handle) return $usageReport;
-    while (($line = fgets($handle)) !== false) {
-        $data = parseLogLine($line);
-        if ($data === null) continue;
-        try { $month = (new DateTime($data['timestamp']))->format('Y-m'); } catch (Exception $e) { continue; }
-        if (!isset($usageReport[$month])) $usageReport[$month] = [];
-        $usageReport[$month][$data['userGroup']] = ($usageReport[$month][$data['userGroup']] ?? 0) + 1;
-    }
-    fclose($handle);
-    return $usageReport;
-}
 function getDepartmentUsageReport($config) {
-    if (!isset($config['LOG_PATHS']['CHECKIN'])) return [];
-    $deptUsage = [];
-    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
-    $deptUsage = processLogForDeptUsage($checkInLog, $deptUsage);
-    $archiveDir = dirname($checkInLog) . '/archives';
-    foreach (glob($archiveDir . '/checkin_*.json') as $archiveFile) {
-        $deptUsage = processLogForDeptUsage($archiveFile, $deptUsage);
-    }
+    $deptUsage = mergeMonthlyCounts(getDashboardSummaries($config), 'departments');
     krsort($deptUsage);
     return $deptUsage;
 }
-function processLogForDeptUsage($logFile, $deptUsage) {
-    if (!is_readable($logFile)) return $deptUsage;
-    $handle = fopen($logFile, 'r');
-    if (!$handle) return $deptUsage;
-    while (($line = fgets($handle)) !== false) {
-        $data = parseLogLine($line);
-        if ($data === null) continue;
-        try { $month = (new DateTime($data['timestamp']))->format('Y-m'); } catch (Exception $e) { continue; }
-        if (!isset($deptUsage[$month])) $deptUsage[$month] = [];
-        $dept = !empty($data['department']) ? $data['department'] : 'N/A';
-        $deptUsage[$month][$dept] = ($deptUsage[$month][$dept] ?? 0) + 1;
-    }
-    fclose($handle);
-    return $deptUsage;
-}
 
 // ===== Prepare Data for Page Display =====
-// Note: Log entries are now loaded via AJAX (get_log_entries) for performance
+// Note: Log entries are loaded a page at a time via AJAX (query_log_entries)
 $usageReport = getUsageReport($config);
 $months = array_keys($usageReport);
 $userGroups = [];
@@ -794,36 +852,10 @@ if (isset($deptUsageReport[$currentMonthKey])) {
     $topDeptCount = current($deptsSorted);
 }
 
-// Today's check-ins + unique visitors require a log scan
-$todayCheckins = 0;
-$uniqueVisitors = [];
-if (isset($config['LOG_PATHS']['CHECKIN'])) {
-    $statsLogPath = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
-    $statsLogFiles = [$statsLogPath];
-    $statsArchive = dirname($statsLogPath) . '/archives/checkin_' . str_replace('-', '_', $currentMonthKey) . '.json';
-    if (is_readable($statsArchive)) $statsLogFiles[] = $statsArchive;
-
-    foreach ($statsLogFiles as $sf) {
-        if (!is_readable($sf)) continue;
-        $handle = fopen($sf, 'r');
-        if (!$handle) continue;
-        while (($line = fgets($handle)) !== false) {
-            $data = parseLogLine($line);
-            if ($data === null) continue;
-            try {
-                $dt = new DateTime($data['timestamp']);
-                if ($dt->format('Y-m') === $currentMonthKey) {
-                    $uniqueVisitors[$data['purdueId']] = true;
-                    if ($dt->format('Y-m-d') === $todayStr) {
-                        $todayCheckins++;
-                    }
-                }
-            } catch (Exception $e) { continue; }
-        }
-        fclose($handle);
-    }
-}
-$uniqueCount = count($uniqueVisitors);
+// Today's check-ins + unique visitors from the summary snapshots
+$currentMonthDays = getDailyUsageData($config, $currentMonthKey);
+$todayCheckins = $currentMonthDays[$todayStr]['total'] ?? 0;
+$uniqueCount = countUniqueVisitors(getDashboardSummaries($config), $currentMonthKey);
 ?>
 
 <!DOCTYPE html>
@@ -970,7 +1002,9 @@ $uniqueCount = count($uniqueVisitors);
 
         <div class="log-viewer" id="log-viewer">
             <div class="log-search-bar">
-                <input type="text" id="log-viewer-search" placeholder="Search by name, group, department...">
+                <input type="text" id="log-viewer-search" placeholder="Search by Purdue ID, name or department...">
+                <input type="date" id="log-viewer-from" title="From date">
+                <input type="date" id="log-viewer-to" title="To date">
                 <span class="result-count" id="log-viewer-count"></span>
             </div>
             <table>
@@ -986,7 +1020,9 @@ $uniqueCount = count($uniqueVisitors);
 
         <div class="log-editor" id="log-editor">
             <div class="log-search-bar">
-                <input type="text" id="log-editor-search" placeholder="Search by name, group, department...">
+                <input type="text" id="log-editor-search" placeholder="Search by Purdue ID, name or department...">
+                <input type="date" id="log-editor-from" title="From date">
+                <input type="date" id="log-editor-to" title="To date">
                 <span class="result-count" id="log-editor-count"></span>
             </div>
             <table>
@@ -1029,32 +1065,49 @@ $uniqueCount = count($uniqueVisitors);
         const ITEMS_PER_PAGE = 50;
         let currentMonth = '<?php echo date('Y-m'); ?>';
         let dailyData = {};
-        let logEntriesCache = null;
-        let viewerState = { page: 1, search: '', filtered: [] };
-        let editorState = { page: 1, search: '', filtered: [] };
-
-        // ===== Log Data Loading (AJAX - Fix #5) =====
-        async function loadLogEntries() {
-            if (logEntriesCache) return logEntriesCache;
-            const response = await fetch('admin.php?action=get_log_entries');
+        let viewerState = newLogState();
+        let editorState = newLogState();
+
+        // ===== Log Data Loading (server-side search & cursor pagination) =====
+        function newLogState() {
+            // cursors[n] is the cursor that fetches page n + 1
+            return { page: 1, search: '', from: '', to: '', cursors: [''], entries: [], nextCursor: null, total: null };
+        }
+
+        async function loadLogPage(state) {
+            const params = new URLSearchParams({
+                action: 'query_log_entries', search: state.search, from: state.from, to: state.to,
+                cursor: state.cursors[state.page - 1] || '', limit: ITEMS_PER_PAGE
+            });
+            const response = await fetch(`admin.php?${params}`);
             if (!response.ok) throw new Error('Failed to load log entries');
             const data = await response.json();
-            logEntriesCache = data.entries || [];
-            return logEntriesCache;
+            state.entries = data.entries || [];
+            state.nextCursor = data.next_cursor;
+            state.total = data.total;
+            state.cursors[state.page] = data.next_cursor;
         }
 
-        // ===== Search & Pagination (Fix #11) =====
-        function filterEntries(entries, search) {
-            if (!search) return entries;
-            const q = search.toLowerCase();
-            return entries.filter(e =>
-                (e.fullName || '').toLowerCase().includes(q) ||
-                (e.userGroup || '').toLowerCase().includes(q) ||
-                (e.department || '').toLowerCase().includes(q) ||
-                (e.classification || '').toLowerCase().includes(q) ||
-                (e.timestamp || '').toLowerCase().includes(q) ||
-                (e.purdueId || '').toLowerCase().includes(q)
-            );
+        async function refreshLogTable(isViewer) {
+            try {
+                await loadLogPage(isViewer ? viewerState : editorState);
+                isViewer ? renderViewerTable() : renderEditorTable();
+            } catch (e) { console.error(e); }
+        }
+
+        function resetLogQuery(isViewer) {
+            const prefix = isViewer ? 'log-viewer' : 'log-editor';
+            const state = isViewer ? viewerState : editorState;
+            state.search = document.getElementById(`${prefix}-search`).value;
+            state.from = document.getElementById(`${prefix}-from`).value;
+            state.to = document.getElementById(`${prefix}-to`).value;
+            state.page = 1;
+            state.cursors = [''];
+            return refreshLogTable(isViewer);
+        }
+
+        function countText(state) {
+            return state.total !== null ? `${state.total} entries` : `${state.entries.length} matches on this page`;
         }
 
         function esc(str) {
@@ -1063,30 +1116,29 @@ $uniqueCount = count($uniqueVisitors);
             return d.innerHTML;
         }
 
-        function renderPagination(containerId, state, renderFn) {
+        function renderPagination(containerId, state) {
             const container = document.getElementById(containerId);
-            const totalPages = Math.max(1, Math.ceil(state.filtered.length / ITEMS_PER_PAGE));
-            if (totalPages <= 1) { container.innerHTML = ''; return; }
+            if (state.page <= 1 && !state.nextCursor) { container.innerHTML = ''; return; }
+            const totalPages = state.total !== null ? Math.max(1, Math.ceil(state.total / ITEMS_PER_PAGE)) : null;
             container.innerHTML = `
                 <button onclick="changePage('${containerId}', -1)" ${state.page <= 1 ? 'disabled' : ''}>&laquo; Prev</button>
-                <span class="page-info">Page ${state.page} of ${totalPages}</span>
-                <button onclick="changePage('${containerId}', 1)" ${state.page >= totalPages ? 'disabled' : ''}>Next &raquo;</button>
+                <span class="page-info">Page ${state.page}${totalPages ? ` of ${totalPages}` : ''}</span>
+                <button onclick="changePage('${containerId}', 1)" ${!state.nextCursor ? 'disabled' : ''}>Next &raquo;</button>
             `;
         }
 
         function changePage(paginationId, direction) {
             const isViewer = paginationId === 'log-viewer-pagination';
             const state = isViewer ? viewerState : editorState;
-            const totalPages = Math.ceil(state.filtered.length / ITEMS_PER_PAGE);
-            state.page = Math.max(1, Math.min(totalPages, state.page + direction));
-            isViewer ? renderViewerTable() : renderEditorTable();
+            if (direction > 0 && !state.nextCursor) return;
+            state.page = Math.max(1, state.page + direction);
+            refreshLogTable(isViewer);
         }
 
         function renderViewerTable() {
             const tbody = document.getElementById('log-viewer-body');
-            const start = (viewerState.page - 1) * ITEMS_PER_PAGE;
-            const pageEntries = viewerState.filtered.slice(start, start + ITEMS_PER_PAGE);
-            document.getElementById('log-viewer-count').textContent = `${viewerState.filtered.length} entries`;
+            const pageEntries = viewerState.entries;
+            document.getElementById('log-viewer-count').textContent = countText(viewerState);
 
             if (pageEntries.length === 0) {
                 tbody.innerHTML = '<tr><td colspan="7" style="text-align:center; padding:20px;">No entries found.</td></tr>';
@@ -1097,14 +1149,13 @@ $uniqueCount = count($uniqueVisitors);
                     <td>${esc(e.agreementStatus)}</td>
                 </tr>`).join('');
             }
-            renderPagination('log-viewer-pagination', viewerState, renderViewerTable);
+            renderPagination('log-viewer-pagination', viewerState);
         }
 
         function renderEditorTable() {
             const tbody = document.getElementById('log-editor-body');
-            const start = (editorState.page - 1) * ITEMS_PER_PAGE;
-            const pageEntries = editorState.filtered.slice(start, start + ITEMS_PER_PAGE);
-            document.getElementById('log-editor-count').textContent = `${editorState.filtered.length} entries`;
+            const pageEntries = editorState.entries;
+            document.getElementById('log-editor-count').textContent = countText(editorState);
 
             if (pageEntries.length === 0) {
                 tbody.innerHTML = '<tr><td colspan="7" style="text-align:center; padding:20px;">No entries found.</td></tr>';
@@ -1114,10 +1165,12 @@ $uniqueCount = count($uniqueVisitors);
                         <td>${esc(e.timestamp)}</td><td>${esc(e.fullName)}</td><td>${esc(e.userGroup)}</td>
                         <td>${esc(e.department)}</td><td>${esc(e.classification)}</td><td>${esc(e.visitCount)}</td>
                         <td class="actions">
-                            <button type="button" class="button" onclick="showEditForm(${e.id})">Edit</button>
+                            <button type="button" class="button" onclick="showEditForm('${e.id}')">Edit</button>
                             <form method="POST" style="display:inline; margin:0; padding:0;">
                                 <input type="hidden" name="csrf_token" value="${CSRF_TOKEN}">
                                 <input type="hidden" name="entry_id" value="${e.id}">
+                                <input type="hidden" name="entry_timestamp" value="${esc(e.timestamp)}">
+                                <input type="hidden" name="entry_purdue_id" value="${esc(e.purdueId)}">
                                 <button type="submit" name="delete_entry" value="delete" class="button" onclick="return confirm('Are you sure you want to delete this entry?');">Delete</button>
                             </form>
                         </td>
@@ -1127,6 +1180,8 @@ $uniqueCount = count($uniqueVisitors);
                             <form method="POST" style="display:inline; margin:0; padding:0;">
                                 <input type="hidden" name="csrf_token" value="${CSRF_TOKEN}">
                                 <input type="hidden" name="entry_id" value="${e.id}">
+                                <input type="hidden" name="entry_timestamp" value="${esc(e.timestamp)}">
+                                <input type="hidden" name="entry_purdue_id" value="${esc(e.purdueId)}">
                                 <input type="text" name="timestamp" value="${esc(e.timestamp)}" readonly>
                                 <input type="text" name="fullName" value="${esc(e.fullName)}">
                                 <input type="text" name="userGroup" value="${esc(e.userGroup)}">
@@ -1134,13 +1189,13 @@ $uniqueCount = count($uniqueVisitors);
                                 <input type="text" name="classification" value="${esc(e.classification)}">
                                 <input type="number" name="visitCount" value="${esc(e.visitCount)}">
                                 <button type="submit" name="save_entry" value="save" class="button">Save</button>
-                                <button type="button" class="button" onclick="hideEditForm(${e.id})">Cancel</button>
+                                <button type="button" class="button" onclick="hideEditForm('${e.id}')">Cancel</button>
                             </form>
                         </td>
                     </tr>
                 `).join('');
             }
-            renderPagination('log-editor-pagination', editorState, renderEditorTable);
+            renderPagination('log-editor-pagination', editorState);
         }
 
         // ===== Button Listeners =====
@@ -1155,12 +1210,7 @@ $uniqueCount = count($uniqueVisitors);
                     if (editLogBtn) editLogBtn.classList.remove('active');
                     document.getElementById('log-viewer').style.display = 'block';
                     document.getElementById('log-editor').style.display = 'none';
-                    try {
-                        const entries = await loadLogEntries();
-                        viewerState.filtered = filterEntries(entries, viewerState.search);
-                        viewerState.page = 1;
-                        renderViewerTable();
-                    } catch (e) { console.error(e); }
+                    await resetLogQuery(true);
                 });
             }
             if (editLogBtn) {
@@ -1169,12 +1219,7 @@ $uniqueCount = count($uniqueVisitors);
                     if (viewLogBtn) viewLogBtn.classList.remove('active');
                     document.getElementById('log-viewer').style.display = 'none';
                     document.getElementById('log-editor').style.display = 'block';
-                    try {
-                        const entries = await loadLogEntries();
-                        editorState.filtered = filterEntries(entries, editorState.search);
-                        editorState.page = 1;
-                        renderEditorTable();
-                    } catch (e) { console.error(e); }
+                    await resetLogQuery(false);
                 });
             }
             if (viewDebugLogBtn) {
@@ -1184,27 +1229,19 @@ $uniqueCount = count($uniqueVisitors);
                 });
             }
 
-            // Search inputs with debounce
+            // Search inputs with debounce; date filters apply on change
             let viewerTimer, editorTimer;
-            document.getElementById('log-viewer-search')?.addEventListener('input', (e) => {
+            document.getElementById('log-viewer-search')?.addEventListener('input', () => {
                 clearTimeout(viewerTimer);
-                viewerTimer = setTimeout(async () => {
-                    viewerState.search = e.target.value;
-                    const entries = await loadLogEntries();
-                    viewerState.filtered = filterEntries(entries, viewerState.search);
-                    viewerState.page = 1;
-                    renderViewerTable();
-                }, 300);
+                viewerTimer = setTimeout(() => resetLogQuery(true), 300);
             });
-            document.getElementById('log-editor-search')?.addEventListener('input', (e) => {
+            document.getElementById('log-editor-search')?.addEventListener('input', () => {
                 clearTimeout(editorTimer);
-                editorTimer = setTimeout(async () => {
-                    editorState.search = e.target.value;
-                    const entries = await loadLogEntries();
-                    editorState.filtered = filterEntries(entries, editorState.search);
-                    editorState.page = 1;
-                    renderEditorTable();
-                }, 300);
+                editorTimer = setTimeout(() => resetLogQuery(false), 300);
+            });
+            ['from', 'to'].forEach(bound => {
+                document.getElementById(`log-viewer-${bound}`)?.addEventListener('change', () => resetLogQuery(true));
+                document.getElementById(`log-editor-${bound}`)?.addEventListener('change', () => resetLogQuery(false));
             });
         }
 
@@ -1236,9 +1273,6 @@ $uniqueCount = count($uniqueVisitors);
             document.getElementById('log-viewer').style.display = 'none';
             document.getElementById('log-editor').style.display = 'none';
             document.getElementById('debug-log-viewer').style.display = 'none';
-            
-            // Pre-fetch log entries in the background for quick-load when clicked
-            loadLogEntries().catch(e => console.error(e));
         });
 
         function navigateToPreviousMonth() { changeMonth('prev'); }
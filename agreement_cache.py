@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+DEFAULT_TTL_DAYS = 30
+CACHE_FILENAME = 'agreement_cache.sqlite'
+COMMIT_EVERY = 500
+VALIDATOR_COLUMNS = ('etag', 'last_modified', 'record_hash')
+
+# What identifies the version of a user record last seen in Alma: its ETag
+# and Last-Modified headers (when Alma sends them) and a hash of its XML
+RecordValidators = namedtuple('RecordValidators', VALIDATOR_COLUMNS)
+# A cached compliant status with the validators of the record it came from
+KnownRecord = namedtuple('KnownRecord', ('has_note', 'segment_type') + VALIDATOR_COLUMNS)
+
+
+def default_cache_path(checkin_log, shard=None):
+    """Keep the cache next to the check-in log it was built from; each shard gets its own file."""
+    filename = CACHE_FILENAME if shard is None else CACHE_FILENAME.replace('.sqlite', f'.{shard}.sqlite')
+    return os.path.join(os.path.dirname(checkin_log) or '.', filename)
+
+
+class AgreementCache:
+    """On-disk record of each user's last observed agreement note status.
+
+    Rows are keyed by user ID and hold whether the note was present, its
+    segment type and when Alma was last checked. Rows older than the TTL are
+    treated as unknown so those users get fetched again. The validators of
+    the record the status was read from let those fetches be conditional.
+    """
+
+    def __init__(self, path, ttl_days=DEFAULT_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.pending = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS agreement_status (
+                user_id TEXT PRIMARY KEY,
+                has_note INTEGER NOT NULL,
+                segment_type TEXT,
+                verified_at REAL NOT NULL
+            )""")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(agreement_status)")}
+        for column in VALIDATOR_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE agreement_status ADD COLUMN {column} TEXT")
+        self.conn.commit()
+
+    def lookup(self, user_id):
+        """Return (has_note, segment_type) if verified within the TTL, else None."""
+        row = self.conn.execute(
+            "SELECT has_note, segment_type FROM agreement_status WHERE user_id = ? AND verified_at >= ?",
+            (user_id, time.time() - self.ttl_seconds)).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+
+    def lookup_record(self, user_id):
+        """Return the user's KnownRecord at any age, or None if it was never seen."""
+        row = self.conn.execute(
+            "SELECT has_note, segment_type, etag, last_modified, record_hash FROM agreement_status "
+            "WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return KnownRecord(bool(row[0]), *row[1:])
+
+    def record(self, user_id, has_note, segment_type, validators=None):
+        """Store the status just observed in Alma for a user, with its record's validators if known."""
+        validators = validators or RecordValidators(None, None, None)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO agreement_status "
+            "(user_id, has_note, segment_type, verified_at, etag, last_modified, record_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, int(bool(has_note)), segment_type, time.time(), *validators))
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def evict_stale(self):
+        """Delete rows older than the TTL; returns the number removed."""
+        cursor = self.conn.execute(
+            "DELETE FROM agreement_status WHERE verified_at < ?", (time.time() - self.ttl_seconds,))
+        self.commit()
+        return cursor.rowcount
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def skip_known_compliant(users, cache, is_known_compliant, results, known=None, revalidate_all=False):
+    """Yield the users whose cached status does not already prove compliance.
+
+    With a `known` dict, each yielded user whose last status was compliant
+    and whose record validators are cached gets its KnownRecord stored there
+    for fetch_user. With `revalidate_all` every user is yielded.
+    """
+    if not revalidate_all:
+        results['cached'] = 0
+    for user_id in users:
+        if not revalidate_all and is_known_compliant(cache.lookup(user_id)):
+            results['cached'] += 1
+            continue
+        if known is not None:
+            record = cache.lookup_record(user_id)
+            if record is not None and is_known_compliant(record[:2]) and any(record[2:]):
+                known[user_id] = record
+        yield user_id
+
+
+def record_validators(response):
+    """RecordValidators of a fetched user record."""
+    return RecordValidators(response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                            hashlib.sha1(response.content).hexdigest())
+
+
+def fetch_user(client, user_id, known=None):
+    """GET a user, conditionally when `known` is the KnownRecord of a compliant record.
+
+    Returns (response, validators, unchanged). `unchanged` is the counters
+    proving the cached status still holds: ('not_modified', 'parse_skipped')
+    when Alma answered 304, ('parse_skipped',) when the record hashes the
+    same as before, else (). validators is None for a failed GET.
+    """
+    if known is None:
+        response = client.get_user(user_id)
+    else:
+        response = client.get_user(user_id, known.etag, known.last_modified)
+        if response.status_code == 304:
+            return response, RecordValidators(*known[2:]), ('not_modified', 'parse_skipped')
+    if response.status_code != 200:
+        return response, None, ()
+    validators = record_validators(response)
+    if known is not None and validators.record_hash == known.record_hash:
+        return response, validators, ('parse_skipped',)
+    return response, validators, ()
+
+
+def open_cache(args, checkin_log, shard=None):
+    """Open the cache selected by the --cache/--no-cache/--cache-ttl options."""
+    if args.no_cache:
+        return None
+    return AgreementCache(args.cache or default_cache_path(checkin_log, shard), args.cache_ttl)
+
+
+def add_cache_arguments(parser):
+    """Add the agreement cache options shared by the note scripts."""
+    parser.add_argument('--cache', help='Agreement status cache file (default: next to the check-in log)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the agreement status cache')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL_DAYS,
+                        help='Days before a cached status must be re-checked in Alma')
+    parser.add_argument('--revalidate-all', action='store_true',
+                        help='Fetch every user from Alma, ignoring cached statuses')
+    parser.add_argument('--conditional-get', action='store_true',
+                        help='Re-check users last seen compliant with conditional GETs, and skip parsing '
+                             'records whose hash is unchanged')
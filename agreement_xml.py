@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+from run_metrics import timer
+
+# lxml parses and serializes full user records several times faster than
+# ElementTree; fall back to the standard library when it is not installed.
+try:
+    from lxml import etree as ET
+    ParseError = ET.XMLSyntaxError
+    BACKEND = 'lxml'
+except ImportError:
+    import xml.etree.ElementTree as ET
+    ParseError = ET.ParseError
+    BACKEND = 'ElementTree'
+
+AGREEMENT_TEXT = "Agreed to Knowledge Lab User Agreement"
+
+
+def parse_user(user_xml):
+    """Parse a user record once so it can be both inspected and modified.
+
+    Pass the raw response bytes where possible: lxml rejects str input that
+    carries an XML encoding declaration, as Alma's responses do.
+    """
+    if isinstance(user_xml, str):
+        user_xml = user_xml.encode('utf-8')
+    with timer('xml_parse'):
+        return ET.fromstring(user_xml)
+
+
+def find_agreement_note(root):
+    """Return the agreement user_note element, or None if the user has none."""
+    for note in root.iter("user_note"):
+        note_text = note.find("note_text")
+        if note_text is not None and note_text.text and AGREEMENT_TEXT in note_text.text:
+            return note
+    return None
+
+
+def remove_roles(root):
+    """Drop the roles section so a PUT cannot conflict with role assignments."""
+    roles = root.find(".//user_roles")
+    if roles is not None:
+        root.remove(roles)
+
+
+def append_agreement_note(root):
+    """Add the standard agreement note in the Internal segment."""
+    user_notes = root.find(".//user_notes")
+    if user_notes is None:
+        user_notes = ET.SubElement(root, "user_notes")
+
+    note = ET.SubElement(user_notes, "user_note")
+    note.set("segment_type", "Internal")
+    ET.SubElement(note, "note_type").text = "CIRCULATION"
+    ET.SubElement(note, "note_text").text = AGREEMENT_TEXT
+    ET.SubElement(note, "user_viewable").text = "true"
+    ET.SubElement(note, "popup_note").text = "true"
+    return note
+
+
+def serialize_user(root):
+    """Serialize a (possibly modified) user record for a PUT."""
+    with timer('xml_serialize'):
+        return ET.tostring(root, encoding='unicode')
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import csv
+import html
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from alma_client import RequestBudgetExceeded
+
+# Alma accepts at most 1,000 members per add_members call
+SET_MEMBERS_PER_CALL = 1000
+DEFAULT_POLL_INTERVAL = 10
+JOB_TIMEOUT = 6 * 3600
+FINISHED_STATUSES = {'COMPLETED_SUCCESS', 'COMPLETED_NO_BULKS', 'COMPLETED_WARNINGS',
+                     'COMPLETED_FAILED', 'FAILED', 'SYSTEM_ABORTED', 'MANUAL_ABORTED'}
+SUCCESS_STATUSES = {'COMPLETED_SUCCESS', 'COMPLETED_NO_BULKS', 'COMPLETED_WARNINGS'}
+
+# Per-user outcomes of the note job, as counter types and report rows, and
+# the (has_note, segment_type) each one proves for the agreement cache
+OUTCOME_AGREEMENT = {
+    'notes_added': (True, 'Internal'),
+    'segments_fixed': (True, 'Internal'),
+    'already_internal': (True, 'Internal'),
+    'wrong_segment': (True, None),
+    'no_note': (False, None),
+    'failed': None,
+}
+
+
+class BulkJobError(Exception):
+    """Raised when a set or job call fails or the job does not complete."""
+
+
+def escape(text):
+    """&, < and > escaped for XML element text, as xml.sax.saxutils.escape does.
+
+    html.escape is used because importing xml.sax.saxutils also imports
+    urllib.request, which is slow to load.
+    """
+    return html.escape(text, quote=False)
+
+
+def api_root(base_url):
+    """'https://host/almaws/v1' from the users BASE_URL in config.php."""
+    root = base_url.rstrip('/')
+    return root[:-len('/users')] if root.endswith('/users') else root
+
+
+def set_xml(name, description):
+    return ('<set><name>%s</name><description>%s</description><type>ITEMIZED</type><content>USER</content>'
+            '<private>false</private><status>ACTIVE</status></set>' % (escape(name), escape(description)))
+
+
+def members_xml(user_ids):
+    members = ''.join('<member><id>%s</id></member>' % escape(user_id) for user_id in user_ids)
+    return '<set><members>%s</members></set>' % members
+
+
+def job_xml(set_id, parameters):
+    """Run request for a manual job on the set, with its parameters in order."""
+    items = [('set_id', set_id)] + list(parameters.items())
+    return '<job><parameters>%s</parameters></job>' % ''.join(
+        '<parameter><name>%s</name><value>%s</value></parameter>' % (escape(name), escape(str(value)))
+        for name, value in items)
+
+
+def chunked(user_ids, size=SET_MEMBERS_PER_CALL):
+    for start in range(0, len(user_ids), size):
+        yield user_ids[start:start + size]
+
+
+def call(client, endpoint, method, path, params='', body=None):
+    """One sets/jobs call through the users client's limiter, retries and budget; returns the XML root."""
+    url = f"{api_root(client.base_url)}{path}?{params + '&' if params else ''}apikey={client.api_key}"
+    kwargs = {'headers': {'Accept': 'application/xml'}}
+    if body is not None:
+        kwargs['data'] = body.encode('utf-8')
+        kwargs['headers']['Content-Type'] = 'application/xml'
+    response = client.request(endpoint, method, url, **kwargs)
+    if response.status_code != 200:
+        raise BulkJobError(f"{endpoint} failed: HTTP {response.status_code}")
+    try:
+        return ET.fromstring(response.content)
+    except ET.ParseError as e:
+        raise BulkJobError(f"{endpoint} returned invalid XML: {str(e)}")
+
+
+def create_user_set(client, name, description, user_ids):
+    """Create an itemized set of users and fill it; returns the set ID."""
+    set_id = call(client, 'POST /conf/sets', 'POST', '/conf/sets', body=set_xml(name, description)).findtext('id')
+    if not set_id:
+        raise BulkJobError("POST /conf/sets returned no set ID")
+    for chunk in chunked(user_ids):
+        call(client, 'POST /conf/sets/{id}', 'POST', f'/conf/sets/{set_id}', 'op=add_members', members_xml(chunk))
+    return set_id
+
+
+def run_job(client, job_id, set_id, parameters):
+    """Start the job on the set; returns the job instance ID."""
+    root = call(client, 'POST /conf/jobs/{id}', 'POST', f'/conf/jobs/{job_id}', 'op=run', job_xml(set_id, parameters))
+    info = root.find('additional_info')
+    link = info.get('link') if info is not None else None
+    if not link:
+        raise BulkJobError(f"Job {job_id} did not report an instance")
+    return link.rstrip('/').rsplit('/', 1)[-1]
+
+
+def wait_for_job(client, job_id, instance_id, poll_interval=DEFAULT_POLL_INTERVAL, timeout=JOB_TIMEOUT):
+    """Poll the job instance until it finishes; returns (status, {counter type: value})."""
+    deadline = time.monotonic() + timeout
+    while True:
+        root = call(client, 'GET /conf/jobs/{id}/instances/{id}', 'GET',
+                    f'/conf/jobs/{job_id}/instances/{instance_id}')
+        status = root.findtext('status') or ''
+        if status in FINISHED_STATUSES:
+            counters = {}
+            for counter in root.iter('counter'):
+                try:
+                    counters[counter.findtext('type')] = int(counter.findtext('value') or 0)
+                except ValueError:
+                    continue
+            return status, counters
+        if time.monotonic() >= deadline:
+            raise BulkJobError(f"Job instance {instance_id} still {status or 'pending'} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def write_payloads(directory, name, description, user_ids, parameters):
+    """Save the set, member and job payloads for review or a manual upload; returns the files written."""
+    os.makedirs(directory, exist_ok=True)
+    files = {'set.xml': set_xml(name, description), 'job.xml': job_xml('SET_ID', parameters)}
+    for number, chunk in enumerate(chunked(user_ids), 1):
+        files[f'members_{number:04d}.xml'] = members_xml(chunk)
+    with open(os.path.join(directory, 'user_ids.txt'), 'w') as f:
+        f.writelines(f"{user_id}\n" for user_id in user_ids)
+    for filename, content in files.items():
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write(content)
+    return ['user_ids.txt'] + list(files)
+
+
+def read_job_report(path):
+    """Yield (user_id, outcome) rows from a job report CSV; a header row is skipped."""
+    with open(path, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[1].strip() not in OUTCOME_AGREEMENT:
+                continue
+            yield row[0].strip(), row[1].strip()
+
+
+def run_bulk(client, users, job_id, parameters, outcome_counters, results, run_id,
+             dry_run=False, export_dir=None, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Handle every user with one set and one job instead of a GET and PUT each.
+
+    The job's counters are added to `results` through `outcome_counters`,
+    which maps each outcome to the script's counters. Per-user statuses
+    only arrive with the job report (see ingest_job_report).
+    """
+    user_ids = list(users)
+    name = f"{run_id} users"
+    description = f"{len(user_ids)} checked-in users for {run_id}"
+    if not user_ids:
+        print("No users need Alma")
+        return results
+    if export_dir:
+        files = write_payloads(export_dir, name, description, user_ids, parameters)
+        print(f"Wrote {len(files)} payload files for {len(user_ids)} users to {export_dir}")
+        return results
+    calls = 1 + -(-len(user_ids) // SET_MEMBERS_PER_CALL) + 1
+    if dry_run:
+        print(f"Would create set '{name}' of {len(user_ids)} users and run job {job_id} "
+              f"({calls} API calls plus status polls)")
+        return results
+
+    try:
+        set_id = create_user_set(client, name, description, user_ids)
+        print(f"Created set {set_id} with {len(user_ids)} users")
+        instance_id = run_job(client, job_id, set_id, parameters)
+        print(f"Started job {job_id}, instance {instance_id}; waiting for it to finish...")
+        status, counters = wait_for_job(client, job_id, instance_id, poll_interval)
+    except (BulkJobError, RequestBudgetExceeded) as e:
+        print(f"\nStopping early: {str(e)}")
+        results['stopped_early'] = True
+        return results
+    except KeyboardInterrupt:
+        print("\nInterrupted; the set and any started job are left in Alma")
+        results['stopped_early'] = True
+        return results
+
+    print(f"Job instance {instance_id} finished: {status}")
+    for outcome, count in counters.items():
+        if outcome not in outcome_counters:
+            continue
+        results['processed'] += count
+        for counter in outcome_counters[outcome]:
+            results[counter] += count
+    if status not in SUCCESS_STATUSES:
+        results['stopped_early'] = True
+    results['job_instance'] = instance_id
+    return results
+
+
+def ingest_job_report(path, outcome_counters, results, cache=None, journal=None):
+    """Count a finished job's per-user report and record each user in the cache and journal."""
+    from bulk_runner import UserResult, tally  # bulk_runner imports this module
+    for user_id, outcome in read_job_report(path):
+        result = UserResult(outcome_counters.get(outcome, ()), [], OUTCOME_AGREEMENT[outcome])
+        tally(results, result)
+        if cache is not None and result.agreement is not None:
+            cache.record(user_id, *result.agreement)
+        if journal is not None:
+            journal.record(user_id, result)
+    return results
+
+
+def parse_job_params(values):
+    """{name: value} from repeated NAME=VALUE options."""
+    params = {}
+    for value in values or ():
+        name, sep, setting = value.partition('=')
+        if not sep or not name:
+            raise ValueError(f"Job parameter '{value}' is not NAME=VALUE")
+        params[name] = setting
+    return params
+
+
+def process_bulk(args, client, users, results, outcome_counters, job_params, cache=None, journal=None):
+    """Run the --bulk-report, --bulk-export or --bulk mode of a note script."""
+    if args.bulk_report:
+        if not os.path.exists(args.bulk_report):
+            print(f"Error: Job report not found at {args.bulk_report}")
+            sys.exit(1)
+        return ingest_job_report(args.bulk_report, outcome_counters, results, cache, journal)
+    if not args.bulk_job_id and not (args.bulk_export or args.dry_run):
+        print("Error: --bulk needs --bulk-job-id")
+        sys.exit(1)
+    try:
+        parameters = dict(job_params, **parse_job_params(args.bulk_param))
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    results = run_bulk(client, users, args.bulk_job_id or 'JOB_ID', parameters, outcome_counters, results,
+                       journal.run_id if journal is not None else 'bulk', args.dry_run, args.bulk_export,
+                       args.bulk_poll)
+    if 'job_instance' in results:
+        print(f"Download the report of job instance {results['job_instance']} and load the per-user "
+              f"statuses with --bulk-report")
+    return results
+
+
+def add_bulk_arguments(parser):
+    """Add the set/job backfill options shared by the note scripts."""
+    group = parser.add_argument_group('bulk backfill')
+    group.add_argument('--bulk', action='store_true',
+                       help='Put the users in an Alma set and run one job on it instead of a GET and PUT each')
+    group.add_argument('--bulk-job-id', metavar='JOB_ID', help='Alma manual job that updates the user notes')
+    group.add_argument('--bulk-param', action='append', metavar='NAME=VALUE',
+                       help='Extra job parameter (repeatable); overrides the script default')
+    group.add_argument('--bulk-export', metavar='DIR', help='Write the set and job payloads to DIR and make no calls')
+    group.add_argument('--bulk-report', metavar='CSV',
+                       help='Ingest a finished job report (user ID, outcome per row) and make no calls')
+    group.add_argument('--bulk-poll', type=float, default=DEFAULT_POLL_INTERVAL,
+                       help='Seconds between job status checks')
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from run_metrics import count, observe
+
+# Alma allows 25 API calls per second per institution; stay a little under it
+DEFAULT_RATE = 20
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 5
+
+GET_PARAMS = 'view=full&expand=none'
+PUT_PARAMS = 'generate_password=false&send_pin_number_letter=false&recalculate_roles=false'
+
+
+def positive_float(value):
+    """argparse type for --rate: a number of calls per second above zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a number")
+    if not 0 < number < float('inf'):
+        raise argparse.ArgumentTypeError(f"'{value}' must be a finite number above 0")
+    return number
+
+
+class RequestBudgetExceeded(Exception):
+    """Raised when a run has used up its cap on total API calls."""
+
+
+def parse_php_config(config_path):
+    """Parse PHP config file for API key and settings."""
+    try:
+        with open(config_path, 'r') as f:
+            config_content = f.read()
+
+        # Extract API key using regex
+        api_key_match = re.search(r"'ALMA_API_KEY'\s*=>\s*'([^']+)'", config_content)
+        if not api_key_match:
+            raise ValueError("Could not find ALMA_API_KEY in config")
+
+        api_key = api_key_match.group(1)
+
+        # Extract base URL
+        base_url_match = re.search(r"'BASE_URL'\s*=>\s*'([^']+)'", config_content)
+        if not base_url_match:
+            raise ValueError("Could not find BASE_URL in config")
+
+        base_url = base_url_match.group(1)
+
+        # Extract log paths
+        checkin_log_match = re.search(r"'CHECKIN'\s*=>\s*'([^']+)'", config_content)
+        if not checkin_log_match:
+            raise ValueError("Could not find CHECKIN log path in config")
+
+        checkin_log = checkin_log_match.group(1)
+
+        return {
+            'api_key': api_key,
+            'base_url': base_url,
+            'checkin_log': checkin_log
+        }
+    except Exception as e:
+        print(f"Error parsing config file: {str(e)}")
+        sys.exit(1)
+
+
+def new_session(workers):
+    """A keep-alive session pooling `workers` connections.
+
+    requests is imported here rather than at module load, so runs that
+    find nothing to fetch (an incremental cron run with no new check-ins)
+    never pay for it.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session, (requests.ConnectionError, requests.Timeout)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the rate of Alma API calls."""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=None):
+        if not 0 < rate < float('inf'):
+            raise ValueError(f"rate must be a finite number above 0, not {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, honouring any backoff pause."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait_time = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def backoff(self, delay):
+        """Pause every caller for `delay` seconds and drain the bucket."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.tokens = 0
+
+
+class EndpointStats:
+    """Call count and latency totals for one API endpoint."""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, status_code, retried):
+        self.calls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if retried:
+            self.retries += 1
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+
+
+class AlmaUsersClient:
+    """Client for the Alma users API shared by the bulk maintenance scripts.
+
+    Connections are pooled and kept alive for `workers` concurrent callers,
+    every call goes through one token bucket, 429/5xx responses and connection
+    errors are retried with jittered exponential backoff, and `max_calls`
+    caps the total number of HTTP requests made during the run.
+    """
+
+    def __init__(self, config, workers=1, rate=DEFAULT_RATE, timeout=DEFAULT_TIMEOUT,
+                 max_retries=MAX_RETRIES, max_calls=None):
+        self.base_url = config['base_url']
+        self.api_key = config['api_key']
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_calls = max_calls
+        self.limiter = TokenBucket(rate)
+        self.stats = {}
+        self.calls_made = 0
+        self.lock = threading.Lock()
+        self.workers = workers
+        self._session = None
+        self.connection_errors = ()
+
+    @property
+    def session(self):
+        """The pooled HTTP session, created on the first request."""
+        if self._session is None:
+            with self.lock:
+                if self._session is None:
+                    self._session, self.connection_errors = new_session(self.workers)
+        return self._session
+
+    def user_url(self, user_id, params):
+        return f"{self.base_url}{user_id}?{params}&apikey={self.api_key}"
+
+    def get_user(self, user_id, etag=None, last_modified=None):
+        """GET the full user record; with an ETag or Last-Modified, Alma may answer 304."""
+        headers = {'Accept': 'application/xml'}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return self.request('GET /users/{id}', 'GET', self.user_url(user_id, GET_PARAMS), headers=headers)
+
+    def put_user(self, user_id, user_xml):
+        """PUT an updated user record."""
+        return self.request('PUT /users/{id}', 'PUT', self.user_url(user_id, PUT_PARAMS),
+                            data=user_xml.encode('utf-8') if isinstance(user_xml, str) else user_xml,
+                            headers={'Content-Type': 'application/xml', 'Accept': 'application/xml'})
+
+    def request(self, endpoint, method, url, **kwargs):
+        """Issue a rate-limited request, retrying on 429, 5xx and connection errors."""
+        kwargs.setdefault('timeout', self.timeout)
+        sent = len(kwargs.get('data') or b'')
+        session = self.session
+        for attempt in range(self.max_retries + 1):
+            self.reserve_call()
+            self.limiter.acquire()
+            count('http_bytes_sent', sent)
+            started = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except self.connection_errors:
+                self.record(endpoint, time.monotonic() - started, None, attempt > 0)
+                if attempt == self.max_retries:
+                    raise
+                self.limiter.backoff(self.backoff_delay(None, attempt))
+                continue
+            self.record(endpoint, time.monotonic() - started, response.status_code, attempt > 0)
+            count('http_bytes_received', len(response.content))
+            if not self.should_retry(response.status_code) or attempt == self.max_retries:
+                return response
+            self.limiter.backoff(self.backoff_delay(response, attempt))
+        return response
+
+    def reserve_call(self):
+        with self.lock:
+            if self.max_calls is not None and self.calls_made >= self.max_calls:
+                raise RequestBudgetExceeded(f"API call budget of {self.max_calls} exhausted")
+            self.calls_made += 1
+
+    def record(self, endpoint, latency, status_code, retried):
+        with self.lock:
+            self.stats.setdefault(endpoint, EndpointStats()).record(latency, status_code, retried)
+        observe(f'http {endpoint}', latency)
+
+    @staticmethod
+    def should_retry(status_code):
+        """Alma signals throttling with 429 and transient failures with 5xx."""
+        return status_code == 429 or status_code >= 500
+
+    @staticmethod
+    def backoff_delay(response, attempt):
+        """Seconds to wait before a retry: Retry-After if sent, else jittered exponential."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, 0.5 * (2 ** attempt))
+
+    def print_report(self):
+        """Print the API cost of this run per endpoint."""
+        print("\nAPI usage:")
+        print(f"Total API calls: {self.calls_made}"
+              + (f" (budget {self.max_calls})" if self.max_calls is not None else ""))
+        for endpoint, stats in sorted(self.stats.items()):
+            avg_ms = stats.total_latency / stats.calls * 1000 if stats.calls else 0
+            print(f"  {endpoint}: {stats.calls} calls, {stats.retries} retries, {stats.errors} errors, "
+                  f"avg {avg_ms:.0f} ms, max {stats.max_latency * 1000:.0f} ms")
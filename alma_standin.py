@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Alma users API, for benchmarks and dry runs.
+
+Serves GET and PUT on /almaws/v1/users/{id} with synthetic user records of
+realistic size. Every user is generated deterministically from its ID, so a
+run with 100k users needs no fixture files; only the agreement-note state
+written back by PUTs is kept in memory.
+
+It also serves the itemized sets and manual job calls used by the --bulk
+mode of the note scripts (alma_bulk.py). Any job ID runs the agreement note
+job: each member's note is added and/or moved to the Internal segment as its
+add_missing_note and fix_note_segment parameters say, and the instance
+reports one counter per outcome.
+
+User GETs carry an ETag and honour If-None-Match with 304 Not Modified,
+unless started with etags=False to mimic an Alma that ignores them.
+"""
+import argparse
+import hashlib
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+AGREEMENT_TEXT = "Agreed to Knowledge Lab User Agreement"
+USERS_PATH = re.compile(r'^/almaws/v1/users/([^/?]+)$')
+SETS_PATH = re.compile(r'^/almaws/v1/conf/sets(?:/([^/?]+))?$')
+JOB_PATH = re.compile(r'^/almaws/v1/conf/jobs/([^/?]+)$')
+JOB_INSTANCE_PATH = re.compile(r'^/almaws/v1/conf/jobs/([^/?]+)/instances/([^/?]+)$')
+
+# Share of users whose record already has the agreement note, by segment
+DEFAULT_SEGMENT_MIX = {'Internal': 0.6, 'External': 0.15, None: 0.25}
+
+FIRST_NAMES = ['Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Johnson', 'Lee', 'Garcia', 'Patel', 'Nguyen', 'Brown', 'Kim']
+USER_GROUPS = ['undergrad', 'graduate', 'faculty', 'staff']
+DEPARTMENTS = ['ENGR', 'AGR', 'SCI', 'LIB', 'HHS', 'PHARM', 'TECH', 'EDUC']
+
+
+def agreement_segment(user_id, segment_mix=DEFAULT_SEGMENT_MIX):
+    """Segment of the user's agreement note in the generated record, or None."""
+    rng = random.Random(f"segment:{user_id}")
+    roll = rng.random()
+    for segment, share in segment_mix.items():
+        if roll < share:
+            return segment
+        roll -= share
+    return None
+
+
+def user_xml(user_id, segment):
+    """Build a synthetic full user record (view=full) of realistic size."""
+    rng = random.Random(user_id)
+    first = rng.choice(FIRST_NAMES)
+    last = rng.choice(LAST_NAMES)
+    group = rng.choice(USER_GROUPS)
+    dept = rng.choice(DEPARTMENTS)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+        '<user link="https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/%s">' % user_id,
+        '<record_type desc="Public">PUBLIC</record_type>',
+        '<primary_id>%s</primary_id>' % user_id,
+        '<first_name>%s</first_name><middle_name></middle_name><last_name>%s</last_name>' % (first, last),
+        '<full_name>%s %s</full_name>' % (first, last),
+        '<user_title desc=""></user_title>',
+        '<job_category desc=""></job_category>',
+        '<job_description>%s | Classification %d</job_description>' % (dept, rng.randint(1, 9)),
+        '<gender desc="None">NONE</gender>',
+        '<user_group desc="%s">%s</user_group>' % (group.title(), group),
+        '<campus_code desc="West Lafayette">WL</campus_code>',
+        '<web_site_url></web_site_url>',
+        '<cataloger_level desc="[00] Default Level">00</cataloger_level>',
+        '<preferred_language desc="English">en</preferred_language>',
+        '<expiry_date>2030-08-15Z</expiry_date><purge_date>2031-08-15Z</purge_date>',
+        '<account_type desc="External">EXTERNAL</account_type>',
+        '<external_id>SIS</external_id>',
+        '<status desc="Active">ACTIVE</status>',
+        '<contact_info><addresses>',
+    ]
+    for i in range(rng.randint(1, 3)):
+        parts.append(
+            '<address preferred="%s" segment_type="External">'
+            '<line1>%d State Street</line1><line2>Room %d</line2><city>West Lafayette</city>'
+            '<state_province>IN</state_province><postal_code>47907</postal_code>'
+            '<country desc="United States">USA</country><address_note></address_note>'
+            '<start_date>2020-01-01Z</start_date>'
+            '<address_types><address_type desc="Home">home</address_type></address_types>'
+            '</address>' % ('true' if i == 0 else 'false', rng.randint(100, 9999), rng.randint(1, 400)))
+    parts.append('</addresses><emails>')
+    parts.append(
+        '<email preferred="true" segment_type="External"><email_address>%s%s@purdue.edu</email_address>'
+        '<email_types><email_type desc="School">school</email_type></email_types></email>'
+        % (first.lower(), rng.randint(1, 999)))
+    parts.append('</emails><phones>')
+    parts.append(
+        '<phone preferred="true" preferred_sms="false" segment_type="External">'
+        '<phone_number>765-49%d-%04d</phone_number><phone_types><phone_type desc="Office">office</phone_type>'
+        '</phone_types></phone>' % (rng.randint(0, 9), rng.randint(0, 9999)))
+    parts.append('</phones></contact_info><pref_first_name></pref_first_name><user_identifiers>')
+    for i in range(rng.randint(2, 5)):
+        parts.append(
+            '<user_identifier segment_type="External"><id_type desc="Barcode">BARCODE</id_type>'
+            '<value>2%013d</value><status>ACTIVE</status></user_identifier>' % rng.randint(0, 10 ** 12))
+    parts.append('</user_identifiers><user_roles>')
+    for i in range(rng.randint(1, 6)):
+        parts.append(
+            '<user_role><status desc="Active">ACTIVE</status>'
+            '<scope desc="Purdue University Libraries">01PURDUE_INST</scope>'
+            '<role_type desc="Patron">200</role_type><parameters/></user_role>')
+    parts.append('</user_roles><user_blocks/><user_notes>')
+    for i in range(rng.randint(0, 4)):
+        parts.append(
+            '<user_note segment_type="Internal"><note_type desc="General">OTHER</note_type>'
+            '<note_text>Routine account note %d</note_text><user_viewable>false</user_viewable>'
+            '<popup_note>false</popup_note><created_by>system</created_by>'
+            '<created_date>2024-0%d-10T12:00:00Z</created_date></user_note>' % (i, rng.randint(1, 9)))
+    if segment is not None:
+        parts.append(
+            '<user_note segment_type="%s"><note_type desc="Circulation">CIRCULATION</note_type>'
+            '<note_text>%s</note_text><user_viewable>true</user_viewable>'
+            '<popup_note>true</popup_note></user_note>' % (segment, AGREEMENT_TEXT))
+    parts.append('</user_notes><user_statistics>')
+    parts.append(
+        '<user_statistic segment_type="External"><statistic_category desc="%s">%s</statistic_category>'
+        '<category_type desc="Department">dept</category_type><statistic_note>%s</statistic_note>'
+        '</user_statistic>' % (dept, dept, dept))
+    parts.append(
+        '<user_statistic segment_type="External"><statistic_category desc="Semester">SEM</statistic_category>'
+        '<category_type desc="Semester">semester</category_type><statistic_note>Fall</statistic_note>'
+        '</user_statistic>')
+    parts.append('</user_statistics><proxy_for_users/></user>')
+    return ''.join(parts)
+
+
+def segment_from_put(body):
+    """Segment of the agreement note in a PUT body, or None if it has none."""
+    root = ET.fromstring(body)
+    for note in root.iter('user_note'):
+        text = note.findtext('note_text') or ''
+        if AGREEMENT_TEXT in text:
+            return note.get('segment_type')
+    return None
+
+
+class AlmaStandIn:
+    """State and knobs shared by all request handler threads."""
+
+    def __init__(self, latency=0.0, rate_429=0.0, segment_mix=DEFAULT_SEGMENT_MIX, seed=0, job_seconds=0.0,
+                 etags=True):
+        self.latency = latency
+        self.etags = etags
+        self.rate_429 = rate_429
+        self.segment_mix = segment_mix
+        self.job_seconds = job_seconds
+        self.rng = random.Random(seed)
+        self.segments = {}  # user_id -> segment written back by PUT or a job
+        self.sets = {}  # set_id -> member user IDs
+        self.instances = {}  # instance_id -> {'started', 'counters', 'report'}
+        self.next_id = 1
+        self.counts = {'GET': 0, 'PUT': 0, 'POST': 0, '304': 0, '429': 0}
+        self.lock = threading.Lock()
+
+    def segment(self, user_id):
+        with self.lock:
+            if user_id in self.segments:
+                return self.segments[user_id]
+        return agreement_segment(user_id, self.segment_mix)
+
+    def throttle(self, method):
+        """Simulate latency and return True if this request should get a 429."""
+        if self.latency:
+            time.sleep(self.latency * (0.5 + self.rng.random()))
+        with self.lock:
+            self.counts[method] += 1
+            if self.rate_429 and self.rng.random() < self.rate_429:
+                self.counts['429'] += 1
+                return True
+        return False
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return str(self.next_id)
+
+    def run_note_job(self, set_id, parameters):
+        """Apply the agreement note job to every set member; returns the instance ID."""
+        add_missing = parameters.get('add_missing_note') == 'true'
+        fix_segment = parameters.get('fix_note_segment') == 'true'
+        report = []
+        for user_id in self.sets[set_id]:
+            segment = self.segment(user_id)
+            if segment == 'Internal':
+                outcome = 'already_internal'
+            elif segment is None:
+                outcome = 'notes_added' if add_missing else 'no_note'
+            else:
+                outcome = 'segments_fixed' if fix_segment else 'wrong_segment'
+            if outcome in ('notes_added', 'segments_fixed'):
+                with self.lock:
+                    self.segments[user_id] = 'Internal'
+            report.append((user_id, outcome))
+        counters = {}
+        for _, outcome in report:
+            counters[outcome] = counters.get(outcome, 0) + 1
+        instance_id = self.new_id()
+        with self.lock:
+            self.instances[instance_id] = {'started': time.monotonic(), 'counters': counters, 'report': report}
+        return instance_id
+
+    def instance_xml(self, instance_id):
+        instance = self.instances[instance_id]
+        if time.monotonic() - instance['started'] < self.job_seconds:
+            return ('<job_instance><id>%s</id><status desc="Running">RUNNING</status>'
+                    '<progress>50</progress></job_instance>' % instance_id)
+        counters = ''.join('<counter><type desc="%s">%s</type><value>%d</value></counter>'
+                           % (outcome.replace('_', ' ').title(), outcome, count)
+                           for outcome, count in sorted(instance['counters'].items()))
+        return ('<job_instance><id>%s</id><status desc="Completed Successfully">COMPLETED_SUCCESS</status>'
+                '<progress>100</progress><counters>%s</counters></job_instance>' % (instance_id, counters))
+
+    def write_job_report(self, instance_id, path):
+        """Save an instance's per-user outcomes as the CSV --bulk-report reads."""
+        with open(path, 'w') as f:
+            f.write('Primary Identifier,Outcome\n')
+            f.writelines(f"{user_id},{outcome}\n" for user_id, outcome in self.instances[instance_id]['report'])
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; without this each response
+        # can wait out the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status, body, extra_headers=()):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in extra_headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def user_id(self):
+            match = USERS_PATH.match(urlsplit(self.path).path)
+            return match.group(1) if match else None
+
+        def error_body(self, message):
+            return ('<?xml version="1.0" encoding="UTF-8"?><web_service_result><errorsExist>true</errorsExist>'
+                    '<errorList><error><errorMessage>%s</errorMessage></error></errorList>'
+                    '</web_service_result>' % message)
+
+        def do_GET(self):
+            match = JOB_INSTANCE_PATH.match(urlsplit(self.path).path)
+            if match and match.group(2) in state.instances:
+                if state.throttle('GET'):
+                    self.send_body(429, self.error_body('PER_SECOND_THRESHOLD'))
+                    return
+                self.send_body(200, state.instance_xml(match.group(2)))
+                return
+            user_id = self.user_id()
+            if user_id is None:
+                self.send_body(404, self.error_body('Not found'))
+                return
+            if state.throttle('GET'):
+                self.send_body(429, self.error_body('PER_SECOND_THRESHOLD'))
+                return
+            body = user_xml(user_id, state.segment(user_id))
+            if not state.etags:
+                self.send_body(200, body)
+                return
+            etag = '"%s"' % hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+            if self.headers.get('If-None-Match') == etag:
+                with state.lock:
+                    state.counts['304'] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_body(200, body, [('ETag', etag)])
+
+        def do_PUT(self):
+            user_id = self.user_id()
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if user_id is None:
+                self.send_body(404, self.error_body('Not found'))
+                return
+            if state.throttle('PUT'):
+                self.send_body(429, self.error_body('PER_SECOND_THRESHOLD'))
+                return
+            try:
+                segment = segment_from_put(body)
+            except ET.ParseError:
+                self.send_body(400, self.error_body('Invalid user XML'))
+                return
+            with state.lock:
+                state.segments[user_id] = segment
+            self.send_body(200, user_xml(user_id, segment))
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            set_match = SETS_PATH.match(url.path)
+            job_match = JOB_PATH.match(url.path)
+            if not set_match and not job_match:
+                self.send_body(404, self.error_body('Not found'))
+                return
+            if state.throttle('POST'):
+                self.send_body(429, self.error_body('PER_SECOND_THRESHOLD'))
+                return
+            try:
+                root = ET.fromstring(body)
+            except ET.ParseError:
+                self.send_body(400, self.error_body('Invalid XML'))
+                return
+
+            if set_match and set_match.group(1) is None:
+                set_id = state.new_id()
+                with state.lock:
+                    state.sets[set_id] = []
+                self.send_body(200, '<set><id>%s</id>%s</set>' % (set_id, ''.join(ET.tostring(child, 'unicode')
+                                                                                  for child in root)))
+            elif set_match:
+                set_id = set_match.group(1)
+                if set_id not in state.sets or 'op=add_members' not in url.query:
+                    self.send_body(400, self.error_body('Unknown set or operation'))
+                    return
+                with state.lock:
+                    state.sets[set_id].extend(member.findtext('id') for member in root.iter('member'))
+                    size = len(state.sets[set_id])
+                self.send_body(200, '<set><id>%s</id><number_of_members>%d</number_of_members></set>'
+                               % (set_id, size))
+            else:
+                parameters = {param.findtext('name'): param.findtext('value') for param in root.iter('parameter')}
+                if parameters.get('set_id') not in state.sets or 'op=run' not in url.query:
+                    self.send_body(400, self.error_body('Unknown set or operation'))
+                    return
+                job_id = job_match.group(1)
+                instance_id = state.run_note_job(parameters['set_id'], parameters)
+                link = f"http://{self.headers.get('Host')}/almaws/v1/conf/jobs/{job_id}/instances/{instance_id}"
+                self.send_body(200, '<job><id>%s</id><additional_info link="%s">Job no. %s triggered</additional_info>'
+                               '</job>' % (job_id, link, instance_id))
+
+    return Handler
+
+
+def start_standin(port=0, **kwargs):
+    """Start the stand-in on a background thread; returns (server, state, base_url)."""
+    state = AlmaStandIn(**kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/almaws/v1/users/"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the Alma users API')
+    parser.add_argument('--port', type=int, default=8089, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean response latency in seconds')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered with HTTP 429')
+    parser.add_argument('--job-seconds', type=float, default=5.0, help='Seconds a bulk job instance reports RUNNING')
+    parser.add_argument('--no-etags', action='store_true', help='Send no ETags and ignore If-None-Match')
+    args = parser.parse_args()
+
+    server, state, base_url = start_standin(args.port, latency=args.latency, rate_429=args.rate_429,
+                                            job_seconds=args.job_seconds, etags=not args.no_etags)
+    print(f"Alma stand-in listening at {base_url}")
+    print("Point BASE_URL in a copy of config.php here. Press Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\nServed {state.counts['GET']} GETs, {state.counts['PUT']} PUTs, {state.counts['POST']} POSTs, "
+              f"{state.counts['304']} not modified, {state.counts['429']} throttled")
+
+
+if __name__ == "__main__":
+    main()
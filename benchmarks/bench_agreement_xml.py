@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Per-user parse and serialize cost of the agreement note XML handling.
+
+Times the single-parse path in agreement_xml (lxml when installed, otherwise
+ElementTree) against the original scripts, which parsed each record once to
+check it and again to modify it. The corpus is either a directory of saved
+`view=full` user records or synthetic records from the Alma stand-in.
+
+    python3 benchmarks/bench_agreement_xml.py --users 2000
+    python3 benchmarks/bench_agreement_xml.py --corpus anonymized_users/
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as StdET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import agreement_xml
+from alma_standin import agreement_segment, user_xml
+
+
+def load_corpus(corpus_dir):
+    """Raw bytes of every .xml file in a directory of saved user records."""
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith('.xml'):
+            with open(os.path.join(corpus_dir, name), 'rb') as f:
+                corpus.append(f.read())
+    return corpus
+
+
+def synthetic_corpus(count):
+    """Stand-in records with the usual mix of missing, External and Internal notes."""
+    return [user_xml(user_id, agreement_segment(user_id)).encode('utf-8')
+            for user_id in (f"00{31000000 + i}" for i in range(count))]
+
+
+def legacy_user(body):
+    """The original flow: parse to check, parse again to modify, serialize."""
+    text = body.decode('utf-8')
+    root = StdET.fromstring(text)
+    for note in root.findall(".//user_note"):
+        note_text = note.find("note_text")
+        if note_text is not None and agreement_xml.AGREEMENT_TEXT in (note_text.text or ''):
+            break
+    root = StdET.fromstring(text)
+    roles = root.find(".//user_roles")
+    if roles is not None:
+        root.remove(roles)
+    return StdET.tostring(root, encoding='unicode')
+
+
+def single_parse_user(body, timings):
+    """Parse once, check and modify the same tree, serialize once."""
+    started = time.perf_counter()
+    root = agreement_xml.parse_user(body)
+    parsed = time.perf_counter()
+    note = agreement_xml.find_agreement_note(root)
+    agreement_xml.remove_roles(root)
+    if note is None:
+        agreement_xml.append_agreement_note(root)
+    else:
+        note.set("segment_type", "Internal")
+    checked = time.perf_counter()
+    xml = agreement_xml.serialize_user(root)
+    finished = time.perf_counter()
+    timings['parse'] += parsed - started
+    timings['patch'] += checked - parsed
+    timings['serialize'] += finished - checked
+    return xml
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark agreement note XML parsing and serialization')
+    parser.add_argument('--corpus', help='Directory of saved user XML records')
+    parser.add_argument('--users', type=int, default=2000, help='Synthetic records to generate without --corpus')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the corpus; the best is reported')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.users)
+    if not corpus:
+        print("Error: No user records to benchmark")
+        sys.exit(1)
+    average_kb = sum(len(body) for body in corpus) / len(corpus) / 1024
+    print(f"{len(corpus)} user records, {average_kb:.1f} KB average, backend: {agreement_xml.BACKEND}")
+
+    best = None
+    for _ in range(args.rounds):
+        timings = {'parse': 0.0, 'patch': 0.0, 'serialize': 0.0}
+        for body in corpus:
+            single_parse_user(body, timings)
+        if best is None or sum(timings.values()) < sum(best.values()):
+            best = timings
+
+    legacy = None
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        for body in corpus:
+            legacy_user(body)
+        elapsed = time.perf_counter() - started
+        legacy = elapsed if legacy is None else min(legacy, elapsed)
+
+    per_user = {name: seconds / len(corpus) * 1e6 for name, seconds in best.items()}
+    total = sum(per_user.values())
+    legacy_per_user = legacy / len(corpus) * 1e6
+    print(f"single parse:   {per_user['parse']:.0f} us parse + {per_user['patch']:.0f} us patch + "
+          f"{per_user['serialize']:.0f} us serialize = {total:.0f} us/user")
+    print(f"legacy (2 parses, ElementTree): {legacy_per_user:.0f} us/user")
+    print(f"speedup: {legacy_per_user / total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""API calls and wall time of a note backfill per user versus one set and job.
+
+Runs each note script through bulk_runner.process_users over the same users against two fresh
+Alma stand-ins: once with a GET and PUT per user, and once in --bulk mode.
+It checks that both runs leave every user's note in the same segment and
+report the same counters. It then ingests the stand-in's job report and
+checks that every user reached the agreement cache.
+
+    python3 benchmarks/bench_bulk_backfill.py --users 20000 --workers 16
+"""
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agreement_cache import AgreementCache
+from alma_client import AlmaUsersClient
+from alma_standin import start_standin
+from bulk_runner import process_users
+
+SCRIPTS = ('fix_agreements', 'validate_note_segments', 'reconcile_agreements')
+
+
+def bulk_args(report=None):
+    return argparse.Namespace(bulk=True, bulk_job_id='M26714', bulk_param=None, bulk_export=None,
+                              bulk_report=report, bulk_poll=0.05, dry_run=False)
+
+
+def run(module, users, latency, workers, bulk=None, cache=None):
+    """Run one script over the users against a fresh stand-in; returns (seconds, calls, results, state)."""
+    server, state, base_url = start_standin(latency=latency, job_seconds=0.2)
+    try:
+        client = AlmaUsersClient({'base_url': base_url, 'api_key': 'bench', 'checkin_log': os.devnull},
+                                 workers=workers, rate=100000)
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = process_users(module.SCRIPT, client, users, False, workers, cache, False, None, bulk)
+        return time.perf_counter() - started, client.calls_made, results, state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-user and set/job note backfills against the stand-in')
+    parser.add_argument('--users', type=int, default=5000, help='Users to backfill')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent users in the per-user run')
+    parser.add_argument('--latency', type=float, default=0.002, help='Mean stand-in response latency in seconds')
+    args = parser.parse_args()
+
+    users = [str(30000000 + i).zfill(10) for i in range(args.users)]
+    print(f"{args.users} users, {args.workers} workers, {args.latency * 1000:.0f} ms stand-in latency")
+    print(f"{'script':<24} {'per-user calls':>14} {'time':>8} {'bulk calls':>10} {'time':>8}")
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for script in SCRIPTS:
+            module = importlib.import_module(script)
+            single_time, single_calls, single_results, single_state = run(module, users, args.latency, args.workers)
+            bulk_time, bulk_calls, bulk_results, bulk_state = run(module, users, args.latency, 1, bulk_args())
+
+            instance_id = bulk_results.pop('job_instance')
+            if bulk_results != single_results:
+                print(f"Error: {script} counters differ: per-user {single_results}, bulk {bulk_results}")
+                sys.exit(1)
+            if any(single_state.segment(user_id) != bulk_state.segment(user_id) for user_id in users):
+                print(f"Error: {script} left different note segments per-user and in bulk")
+                sys.exit(1)
+
+            report = os.path.join(tmp_dir, f'{script}_report.csv')
+            bulk_state.write_job_report(instance_id, report)
+            cache = AgreementCache(os.path.join(tmp_dir, f'{script}.sqlite'))
+            _, report_calls, report_results, _ = run(module, users, args.latency, 1, bulk_args(report), cache)
+            missing = sum(cache.lookup(user_id) is None for user_id in users)
+            cache.close()
+            if report_calls or report_results != single_results or missing:
+                print(f"Error: {script} report ingest made {report_calls} calls, counted {report_results}, "
+                      f"left {missing} users uncached")
+                sys.exit(1)
+
+            print(f"{script:<24} {single_calls:>14} {single_time:>7.2f}s {bulk_calls:>10} {bulk_time:>7.2f}s")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Lines/sec benchmark for compare_logs on a synthetic debug log.
+
+Generates a debug log of the requested size (1 GB by default) with the mix
+of lines confirm.php writes, then times the streaming scan against the
+original per-line regex approach.
+
+    python3 benchmarks/bench_compare_logs.py --size-mb 1024
+"""
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import compare_logs
+
+NOISE = [
+    "[INFO] API Response: <?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?><user><primary_id>{id}</primary_id>",
+    "[INFO] Found official Primary ID from API: {id}",
+    "[INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/{id}?generate_password=false",
+    "[INFO] No existing agreement found, creating new note based on POST confirmation.",
+    "[INFO] Email sent successfully",
+]
+ID_LINES = [
+    "[INFO] Starting API call for Purdue ID: {id}",
+    "[INFO] Logged check-in for user: {id} (Visit #3)",
+]
+
+
+def generate_debug_log(path, size_bytes, id_share=0.2, seed=0):
+    """Write a synthetic debug log of about `size_bytes`; returns the line count."""
+    rng = random.Random(seed)
+    ids = [f"00{rng.randint(10000000, 99999999)}" for _ in range(50000)]
+    lines = 0
+    written = 0
+    with open(path, 'w') as f:
+        while written < size_bytes:
+            chunk = []
+            for _ in range(10000):
+                template = rng.choice(ID_LINES) if rng.random() < id_share else rng.choice(NOISE)
+                ts = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(8, 20):02d}:00:00"
+                chunk.append(f"[{ts}] {template.format(id=rng.choice(ids))}\n")
+            data = ''.join(chunk)
+            f.write(data)
+            written += len(data)
+            lines += len(chunk)
+    return lines
+
+
+def legacy_scan(path):
+    """The original compare_logs loop: three uncompiled searches per line."""
+    debug_ids = {}
+    with open(path, 'r') as f:
+        for line in f:
+            timestamp_match = re.search(r'\[([\d-]+ [\d:]+)\]', line)
+            timestamp = timestamp_match.group(1) if timestamp_match else None
+            match = re.search(r'Purdue ID: (\d+)', line) or re.search(r'user: (\d+)', line)
+            if match:
+                normalized = compare_logs.normalize_id(match.group(1))
+                if normalized and normalized not in debug_ids:
+                    debug_ids[normalized] = (timestamp, line.strip())
+    return len(debug_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compare_logs debug log scanning')
+    parser.add_argument('--size-mb', type=int, default=1024, help='Size of the synthetic debug log')
+    parser.add_argument('--debug-log', help='Use an existing debug log instead of generating one')
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the streaming scan')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.debug_log
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, 'debug.log')
+        print(f"Generating {args.size_mb} MB synthetic debug log...")
+        generate_debug_log(path, args.size_mb * 1024 * 1024)
+    with open(path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"{lines} lines, {size_mb:.0f} MB")
+
+    try:
+        started = time.perf_counter()
+        unique, _ = compare_logs.report_missing_ids(path, set(), out=io.StringIO())
+        elapsed = time.perf_counter() - started
+        print(f"streaming scan: {elapsed:.2f} s, {lines / elapsed:,.0f} lines/s, "
+              f"{size_mb / elapsed:.0f} MB/s, {unique} unique IDs")
+
+        if not args.skip_legacy:
+            started = time.perf_counter()
+            legacy_unique = legacy_scan(path)
+            legacy_elapsed = time.perf_counter() - started
+            print(f"legacy scan:    {legacy_elapsed:.2f} s, {lines / legacy_elapsed:,.0f} lines/s, "
+                  f"{size_mb / legacy_elapsed:.0f} MB/s, {legacy_unique} unique IDs")
+            print(f"speedup: {legacy_elapsed / elapsed:.1f}x")
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cost of re-checking every user with and without conditional fetches.
+
+Runs a note script with --revalidate-all three times against the local Alma
+stand-in, sharing one agreement cache:
+
+  first        fills the cache (and fixes whatever needs fixing)
+  full         re-checks every user with a full GET and parse, as before
+  conditional  re-checks with --conditional-get: 304s when the stand-in
+               honours ETags, record hashes when it does not
+
+It checks that the full and conditional runs report the same outcomes and
+leave the same statuses in the cache.
+
+    python3 benchmarks/bench_conditional_fetch.py --users 20000 --workers 16
+"""
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agreement_cache import AgreementCache
+from alma_client import AlmaUsersClient
+from alma_standin import start_standin
+from bulk_runner import process_users
+
+
+def run(module, users, base_url, cache, workers, conditional):
+    client = AlmaUsersClient({'base_url': base_url, 'api_key': 'bench', 'checkin_log': os.devnull},
+                             workers=workers, rate=100000)
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = process_users(module.SCRIPT, client, users, False, workers, cache, True, None, None, conditional)
+    cache.commit()
+    return time.perf_counter() - started, results
+
+
+def statuses(cache, users):
+    return [cache.lookup(user_id) for user_id in users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full and conditional re-checks against the stand-in')
+    parser.add_argument('--script', default='validate_note_segments',
+                        choices=['fix_agreements', 'validate_note_segments', 'reconcile_agreements'])
+    parser.add_argument('--users', type=int, default=5000, help='Users to re-check')
+    parser.add_argument('--workers', type=int, default=8, help='Users processed concurrently')
+    parser.add_argument('--latency', type=float, default=0.002, help='Mean stand-in response latency in seconds')
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.script)
+    users = [str(40000000 + i).zfill(10) for i in range(args.users)]
+    print(f"{args.script}: {args.users} users, {args.workers} workers")
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for etags in (True, False):
+            server, state, base_url = start_standin(latency=args.latency, etags=etags)
+            cache = AgreementCache(os.path.join(tmp_dir, f'cache_{etags}.sqlite'))
+            try:
+                run(module, users, base_url, cache, args.workers, False)
+                full_time, full = run(module, users, base_url, cache, args.workers, False)
+                full_statuses = statuses(cache, users)
+                conditional_time, conditional = run(module, users, base_url, cache, args.workers, True)
+            finally:
+                server.shutdown()
+                server.server_close()
+            avoided = {key: conditional.pop(key) for key in ('not_modified', 'parse_skipped')}
+            if conditional != full or statuses(cache, users) != full_statuses:
+                print(f"Error: conditional re-check differs: full {full}, conditional {conditional}")
+                sys.exit(1)
+            cache.close()
+            print(f"  ETags {'on ' if etags else 'off'}: full {full_time:.2f}s, conditional {conditional_time:.2f}s "
+                  f"({full_time / conditional_time:.1f}x); {avoided['not_modified']} full fetches and "
+                  f"{avoided['parse_skipped']} parses avoided")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
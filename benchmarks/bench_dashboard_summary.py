@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Time to build the admin dashboard figures with and without summary snapshots.
+
+Generates a check-in history of 1, 12 and 60 months (past months in
+archives, the current month in the main log) and compares:
+
+  scan      the original admin.php approach: the usage, department and
+            daily reports and the quick stats each re-read the raw logs
+  cold      building every snapshot from scratch (first load)
+  warm      loading the snapshots after a few new check-ins were appended,
+            which re-reads only those lines
+
+The figures from the scan and the snapshots are checked to be identical.
+
+    python3 benchmarks/bench_dashboard_summary.py --months 1 12 60 --per-month 3000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dashboard_summary
+from checkin_logs import archive_dir, checkin_log_files
+
+GROUPS = ['Undergraduate', 'Graduate', 'Faculty', 'Staff', 'N/A']
+DEPARTMENTS = [f"Department {i}" for i in range(40)] + ['']
+TODAY = date(2026, 6, 15)
+
+
+def month_start(months_back):
+    year, month = TODAY.year, TODAY.month - months_back
+    while month < 1:
+        year, month = year - 1, month + 12
+    return date(year, month, 1)
+
+
+def record_line(rng, day):
+    return json.dumps({
+        'purdueId': f"00{rng.randrange(31000000, 31020000)}",
+        'timestamp': f"{day.isoformat()} {rng.randrange(8, 20):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+        'fullName': 'Test User',
+        'userGroup': rng.choice(GROUPS),
+        'department': rng.choice(DEPARTMENTS),
+        'campusCode': 'PWL',
+        'visitCount': rng.randrange(1, 50),
+    }) + '\n'
+
+
+def write_history(checkin_log, months, per_month, seed=1):
+    rng = random.Random(seed)
+    os.makedirs(archive_dir(checkin_log), exist_ok=True)
+    for back in range(months - 1, -1, -1):
+        first = month_start(back)
+        last_day = TODAY if back == 0 else (month_start(back - 1) - timedelta(days=1))
+        days = [first + timedelta(days=n) for n in range((last_day - first).days + 1)]
+        lines = sorted(record_line(rng, rng.choice(days)) for _ in range(per_month))
+        path = checkin_log if back == 0 else os.path.join(
+            archive_dir(checkin_log), f"checkin_{first.year}_{first.month:02d}.json")
+        with open(path, 'w') as f:
+            f.writelines(lines)
+
+
+def scan_records(path, month=None):
+    """Read a raw log the way the old admin.php loops did."""
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(data, dict) or 'purdueId' not in data:
+                continue
+            timestamp = str(data.get('timestamp', ''))
+            if month and timestamp[:7] != month:
+                continue
+            yield data, timestamp
+
+
+def scan_dashboard(checkin_log, today):
+    """The original admin.php load: three passes over every file plus one over this month's."""
+    month = today[:7]
+    files = checkin_log_files(checkin_log)
+    usage, departments, daily = {}, {}, {}
+    for path in files:
+        for data, timestamp in scan_records(path):
+            group = data.get('userGroup') or 'N/A'
+            usage.setdefault(timestamp[:7], {})
+            usage[timestamp[:7]][group] = usage[timestamp[:7]].get(group, 0) + 1
+    for path in files:
+        for data, timestamp in scan_records(path):
+            dept = data.get('department') or 'N/A'
+            departments.setdefault(timestamp[:7], {})
+            departments[timestamp[:7]][dept] = departments[timestamp[:7]].get(dept, 0) + 1
+    month_files = [path for path in files if path == checkin_log or month.replace('-', '_') in path]
+    for path in month_files:
+        for data, timestamp in scan_records(path, month):
+            day = daily.setdefault(timestamp[:10], {'total': 0, 'groups': {}})
+            day['total'] += 1
+            group = data.get('userGroup') or 'N/A'
+            day['groups'][group] = day['groups'].get(group, 0) + 1
+    today_checkins, visitors = 0, set()
+    for path in month_files:
+        for data, timestamp in scan_records(path, month):
+            visitors.add(str(data['purdueId']))
+            today_checkins += timestamp[:10] == today
+    return usage, departments, daily, today_checkins, len(visitors)
+
+
+def snapshot_dashboard(checkin_log, today):
+    data = dashboard_summary.dashboard_data(
+        dashboard_summary.load_summaries(checkin_log, current_month=today[:7]), today)
+    return (data['usage'], data['departments'], data['daily'],
+            data['stats']['today_checkins'], data['stats']['unique_visitors'])
+
+
+def best_of(rounds, func):
+    best, result = None, None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dashboard loads with and without summary snapshots')
+    parser.add_argument('--months', type=int, nargs='+', default=[1, 12, 60], help='History lengths to test')
+    parser.add_argument('--per-month', type=int, default=3000, help='Check-ins per month')
+    parser.add_argument('--appended', type=int, default=20, help='Check-ins appended before each warm load')
+    parser.add_argument('--rounds', type=int, default=3, help='Repetitions; the best is reported')
+    args = parser.parse_args()
+
+    today = TODAY.isoformat()
+    print(f"{args.per_month} check-ins per month, {args.appended} appended before each warm load")
+    print(f"{'months':>6} {'scan':>10} {'cold':>10} {'warm':>10} {'speedup':>8}")
+    for months in args.months:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            checkin_log = os.path.join(tmp_dir, 'checkin_log.json')
+            write_history(checkin_log, months, args.per_month)
+            rng = random.Random(months)
+
+            scan, _ = best_of(args.rounds, lambda: scan_dashboard(checkin_log, today))
+
+            def cold():
+                shutil.rmtree(dashboard_summary.summary_dir(checkin_log), ignore_errors=True)
+                return snapshot_dashboard(checkin_log, today)
+            cold_time, _ = best_of(args.rounds, cold)
+
+            def warm():
+                with open(checkin_log, 'a') as f:
+                    f.writelines(record_line(rng, TODAY) for _ in range(args.appended))
+                return snapshot_dashboard(checkin_log, today)
+            warm_time, figures = best_of(args.rounds, warm)
+
+            if figures != scan_dashboard(checkin_log, today):
+                print(f"Error: snapshot figures differ from a full scan at {months} months")
+                sys.exit(1)
+            print(f"{months:>6} {scan * 1000:>8.1f}ms {cold_time * 1000:>8.1f}ms {warm_time * 1000:>8.1f}ms "
+                  f"{scan / warm_time:>7.0f}x")
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
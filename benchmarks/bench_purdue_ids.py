@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Throughput and property checks for purdue_ids normalization and reconciliation.
+
+Times purdue_ids.normalize_ids against the original per-string
+compare_logs.normalize_id loop, and reconcile() on two overlapping sources.
+--check first compares the per-string, pure-Python and batched paths
+against a verbatim copy of the original function on randomized IDs built to
+hit every rule: non-digits, Unicode digits, leading zeros, trailing zeros,
+01/02 suffixes and length limits.
+
+    python3 benchmarks/bench_purdue_ids.py --ids 1000000 --check
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import purdue_ids
+
+NOISE = ['-', ' ', 'x', 'ID', '#', '\t', 'é']
+UNICODE_DIGITS = ['٣', '²', '５', '১']
+
+
+def original_normalize_id(id_str):
+    """compare_logs.normalize_id as it was before purdue_ids, kept as the oracle."""
+    if not (id_str.isascii() and id_str.isdigit()):
+        id_str = ''.join(c for c in id_str if c.isdigit())
+    id_str = id_str.lstrip('0')
+    if len(id_str) < 8 or len(id_str) > 10:
+        return None
+    if id_str.endswith('0'):
+        id_str = id_str.rstrip('0')
+    elif id_str.endswith(('01', '02')):
+        id_str = id_str[:-2]
+    if len(id_str) < 8:
+        return None
+    return id_str
+
+
+def random_id(rng):
+    """An ID-like string biased towards the edges of each normalization rule."""
+    body = ''.join(rng.choice('0123456789' if rng.random() < 0.7 else '0') for _ in range(rng.randint(0, 12)))
+    if rng.random() < 0.4:
+        body = '0' * rng.randint(1, 4) + body
+    roll = rng.random()
+    if roll < 0.2:
+        body += '0' * rng.randint(1, 4)
+    elif roll < 0.4:
+        body += rng.choice(['01', '02', '001', '10', '20'])
+    if rng.random() < 0.1:
+        position = rng.randint(0, len(body))
+        body = body[:position] + rng.choice(NOISE) + body[position:]
+    if rng.random() < 0.02:
+        position = rng.randint(0, len(body))
+        body = body[:position] + rng.choice(UNICODE_DIGITS) + body[position:]
+    return body
+
+
+def realistic_ids(count, rng, users=50000):
+    """IDs as the logs hold them: mostly 10-digit zero-padded, with some
+    variants, drawn from a pool of users who each appear many times."""
+    pool = []
+    for _ in range(users):
+        id_str = f"00{rng.randint(10000000, 99999999)}"
+        roll = rng.random()
+        if roll < 0.05:
+            id_str = id_str.lstrip('0')
+        elif roll < 0.08:
+            id_str = id_str[2:] + rng.choice(['01', '02'])
+        pool.append(id_str)
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def check(count, seed):
+    rng = random.Random(seed)
+    ids = [random_id(rng) for _ in range(count)] + ['', '0', '00000000', '12345678', '1234567801', '9' * 11]
+    expected = [original_normalize_id(id_str) for id_str in ids]
+    failures = 0
+    batch = purdue_ids.normalize_ids(ids)
+    # The first IDs again, few enough to take the pure-Python path
+    small = purdue_ids.normalize_ids(ids[:purdue_ids.NUMPY_MIN_IDS - 1])
+    for id_str, want, got, got_small in zip(ids, expected, batch, small + [None] * (len(ids) - len(small))):
+        scalar = purdue_ids.normalize_id(id_str)
+        if scalar != want or str(got) != (want or '') or got_small not in (None, want or ''):
+            failures += 1
+            if failures <= 10:
+                print(f"  mismatch for {id_str!r}: expected {want!r}, scalar {scalar!r}, batch {str(got)!r}")
+    valid = [want for want in expected if want]
+    assert all(MIN_OK(want) for want in valid), 'normalized IDs must be 8-10 digits without a leading zero'
+
+    left, right = ids[:count // 2], ids[count // 4:]
+    result = purdue_ids.reconcile(left, right)
+    left_set = {want for want in map(original_normalize_id, left) if want}
+    right_set = {want for want in map(original_normalize_id, right) if want}
+    if (set(result.only_left) != left_set - right_set or set(result.only_right) != right_set - left_set
+            or set(result.common) != left_set & right_set):
+        failures += 1
+        print("  reconcile set differences disagree with the original normalization")
+    spellings = {}
+    for id_str in set(left) | set(right):
+        want = original_normalize_id(id_str)
+        if want:
+            spellings.setdefault(want, set()).add(id_str)
+    if {k: sorted(v) for k, v in spellings.items() if len(v) > 1} != result.clusters:
+        failures += 1
+        print("  reconcile duplicate clusters disagree with the original normalization")
+    print(f"checked {len(ids)} IDs ({len(valid)} valid) and reconciliation: {'OK' if not failures else f'{failures} failures'}")
+    return failures == 0
+
+
+def MIN_OK(id_str):
+    return id_str.isdigit() and 8 <= len(id_str) <= 10 and not id_str.startswith('0')
+
+
+def best_of(rounds, func):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and check Purdue ID normalization')
+    parser.add_argument('--ids', type=int, default=1000000, help='IDs to normalize')
+    parser.add_argument('--users', type=int, default=50000, help='Distinct users the IDs are drawn from')
+    parser.add_argument('--rounds', type=int, default=3, help='Repetitions; the best is reported')
+    parser.add_argument('--check', action='store_true', help='Check against the original function first')
+    parser.add_argument('--check-ids', type=int, default=200000, help='Randomized IDs for --check')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    if purdue_ids.load_numpy() is None:
+        print("Error: numpy is required for the batched path")
+        sys.exit(1)
+    if args.check and not check(args.check_ids, args.seed):
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    ids = realistic_ids(args.ids, rng, args.users)
+    loop = best_of(args.rounds, lambda: [purdue_ids.normalize_id(id_str) for id_str in ids])
+    batch = best_of(args.rounds, lambda: purdue_ids.normalize_ids(ids))
+    print(f"normalize {args.ids:,} IDs of {args.users:,} users: per-string {loop:.2f}s ({args.ids / loop:,.0f}/s), "
+          f"batched {batch:.2f}s ({args.ids / batch:,.0f}/s), {loop / batch:.1f}x")
+
+    left, right = ids[:args.ids * 2 // 3], ids[args.ids // 3:]
+
+    def legacy_reconcile():
+        left_ids = {normalized for normalized in map(purdue_ids.normalize_id, left) if normalized}
+        right_ids = {normalized for normalized in map(purdue_ids.normalize_id, right) if normalized}
+        return left_ids - right_ids, right_ids - left_ids, left_ids & right_ids
+
+    legacy = best_of(args.rounds, legacy_reconcile)
+    reconcile = best_of(args.rounds, lambda: purdue_ids.reconcile(left, right))
+    result = purdue_ids.reconcile(left, right)
+    print(f"reconcile {len(left):,} x {len(right):,}: per-string sets {legacy:.2f}s, "
+          f"reconcile {reconcile:.2f}s (with duplicate clusters), {legacy / reconcile:.1f}x")
+    print(f"  only left {len(result.only_left):,}, only right {len(result.only_right):,}, "
+          f"common {len(result.common):,}, clusters {len(result.clusters):,}")
+
+if __name__ == "__main__":
+    main()
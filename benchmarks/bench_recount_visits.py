@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Full-history visitCount recount of 1M check-ins by recount_visits.py.
+
+Generates monthly archives and a main log whose visitCounts have drifted:
+repeat check-ins inside the 30-second window, lost lines and counts that
+are simply wrong. It runs the recount in a child process and reports its
+wall time and peak RSS. It then checks that the rewritten files keep exactly
+the check-ins and counts of a one-at-a-time Python recount, the way
+cleanup_and_recount.php walks entries, and that validate_logs finds no
+duplicates or visitCount gaps left.
+
+    python3 benchmarks/bench_recount_visits.py --records 1000000 --months 24
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkin_logs import checkin_log_files
+from validate_logs import DUPLICATE_WINDOW_SECONDS, scan_checkin_logs, stitch_files
+
+
+def generate_logs(log_dir, records, months, users, drift, seed=0):
+    """Write `records` check-ins over `months` archives and the main log with drifted visitCounts."""
+    rng = random.Random(seed)
+    ids = [str(10000000 + rng.randrange(90000000)).zfill(10) for _ in range(users)]
+    logged = {}
+    clock = datetime(2024, 1, 1, 8, 0, 0)
+    per_file = records // (months + 1)
+    os.makedirs(os.path.join(log_dir, 'archives'))
+    written = 0
+    for month in range(months + 1):
+        if month < months:
+            path = os.path.join(log_dir, 'archives', f'checkin_{2024 + month // 12}_{month % 12 + 1:02d}.json')
+        else:
+            path = os.path.join(log_dir, 'checkin_log.json')
+            per_file = records - written
+        lines = []
+        while len(lines) < per_file:
+            clock += timedelta(seconds=rng.randint(1, 60))
+            user_id = rng.choice(ids)
+            logged[user_id] = logged.get(user_id, 0) + 1
+            roll = rng.random()
+            if roll < drift:
+                logged[user_id] += rng.randint(1, 3)
+            record = {'purdueId': user_id, 'timestamp': clock.strftime('%Y-%m-%d %H:%M:%S'),
+                      'userGroup': 'undergrad', 'visitCount': logged[user_id], 'agreementStatus': 'signed'}
+            lines.append(json.dumps(record, separators=(',', ':')))
+            if drift <= roll < 2 * drift:
+                logged[user_id] += 1
+                repeat = clock + timedelta(seconds=rng.randint(0, DUPLICATE_WINDOW_SECONDS - 1))
+                lines.append(json.dumps(dict(record, timestamp=repeat.strftime('%Y-%m-%d %H:%M:%S'),
+                                             visitCount=logged[user_id]), separators=(',', ':')))
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        written += len(lines)
+    return written
+
+
+def read_checkins(log_path):
+    checkins = []
+    for path in checkin_log_files(log_path):
+        with open(path, 'r') as f:
+            for line in f:
+                record = json.loads(line)
+                checkins.append((record['purdueId'], record['timestamp'], record['visitCount']))
+    return checkins
+
+
+def reference_recount(checkins):
+    """Kept (purdueId, timestamp, visitCount) the slow way: sort, then walk each user's entries."""
+    by_user = {}
+    for user_id, timestamp, _ in checkins:
+        by_user.setdefault(user_id, []).append(timestamp)
+    kept = Counter()
+    for user_id, stamps in by_user.items():
+        last = None
+        visits = 0
+        for timestamp in sorted(stamps):
+            when = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+            if last is None or (when - last).total_seconds() >= DUPLICATE_WINDOW_SECONDS:
+                visits += 1
+                kept[(user_id, timestamp, visits)] += 1
+                last = when
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized full-history visitCount recount')
+    parser.add_argument('--records', type=int, default=1000000, help='Check-ins to generate')
+    parser.add_argument('--months', type=int, default=24, help='Closed monthly archives')
+    parser.add_argument('--users', type=int, default=40000, help='Distinct Purdue IDs')
+    parser.add_argument('--drift', type=float, default=0.01, help='Share of check-ins with wrong counts, and with repeats')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        written = generate_logs(tmp_dir, args.records, args.months, args.users, args.drift)
+        log_path = os.path.join(tmp_dir, 'checkin_log.json')
+        size_mb = sum(os.path.getsize(path) for path in checkin_log_files(log_path)) / 1e6
+        print(f"{written} check-ins in {args.months} archives + main log ({size_mb:.0f} MB)")
+        # Recount before the reference is built, so the child's peak RSS is its own
+        original_dir = os.path.join(tmp_dir, 'original')
+        os.makedirs(original_dir)
+        shutil.copytree(os.path.join(tmp_dir, 'archives'), os.path.join(original_dir, 'archives'))
+        shutil.copy(log_path, original_dir)
+
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, os.path.join(ROOT, 'recount_visits.py'), '--checkin-log', log_path],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            print(result.stdout)
+            sys.exit(1)
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+        expected = reference_recount(read_checkins(os.path.join(original_dir, 'checkin_log.json')))
+        kept = Counter(read_checkins(log_path))
+        if kept != expected:
+            print(f"Error: recount kept {sum(kept.values())} check-ins, the reference {sum(expected.values())}; "
+                  f"{len(kept - expected)} differ")
+            sys.exit(1)
+        scans, _ = scan_checkin_logs(checkin_log_files(log_path), None, 1)
+        left = Counter(problem[1] for _, scan in scans for problem in scan['problems'])
+        left.update(problem.kind for problem in stitch_files(scans))
+        if left:
+            print(f"Error: validate_logs still finds {dict(left)}")
+            sys.exit(1)
+        print(f"Recounted in {elapsed:.2f}s ({written / elapsed:,.0f} check-ins/s), peak RSS {rss_mb:.0f} MB; "
+              f"{written - sum(kept.values())} duplicates dropped, matches the per-entry recount")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Lines/sec benchmark and extraction check for recovery_script on a synthetic debug log.
+
+Generates a debug log of the requested size with the check-in events
+confirm.php wrote (API call, XML response, PUT, logged check-in) mixed with
+other lines, then times the single-pass iter_recovered_entries over it.
+
+--check first runs a small hand-written log through the scan and compares
+the recovered entries with the expected ones. It pins how an XML response
+is read: from the "<?xml" line, whose log-line prefix is dropped before
+user_group is extracted, up to the next timestamped line. It then splits
+that log at every line into a rotated archive and a live log, as
+rotateDebugLogIfNeeded does, and checks that recovering the directory
+still finds every check-in.
+
+    python3 benchmarks/bench_recovery.py --size-mb 200 --check
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import recovery_script
+
+CHECK_LOG = """\
+[2026-03-02 10:00:00] [INFO] Starting API call for Purdue ID: 0012345678
+[2026-03-02 10:00:01] [INFO] API Response: <?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<user>
+  <primary_id>0012345678</primary_id>
+  <user_group desc="Undergraduate">UGRAD</user_group>
+</user>
+[2026-03-02 10:00:02] [INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/0012345678?generate_password=false
+[2026-03-02 10:00:03] [INFO] Logged check-in for user: Purdue ID: 0012345678 (Visit #4)
+[2026-03-02 10:05:00] [INFO] Starting API call for Purdue ID: 0087654321
+[2026-03-02 10:05:01] [INFO] API Response: <?xml version="1.0" encoding="UTF-8" standalone="yes"?><user><user_group desc="Staff">STAFF</user_group></user>
+[2026-03-02 10:05:02] [INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/0087654321?generate_password=false
+[2026-03-02 10:05:03] [INFO] Logged check-in for user: Purdue ID: 0087654321 (Visit #1)
+[2026-03-02 10:10:00] [INFO] Starting API call for Purdue ID: 0011111111
+[2026-03-02 10:10:01] [INFO] API Response: <?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<user><user_group desc="Faculty">FACULTY</user_group></user>
+[2026-03-02 10:10:03] [INFO] Logged check-in for user: Purdue ID: 0011111111 (Visit #2)
+[2026-03-02 10:20:00] [INFO] Starting API call for Purdue ID: 0022222222
+[2026-03-02 10:20:01] [INFO] API Response: <?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<user><user_group desc="Graduate">GRAD</user_group></user>
+[2026-03-02 10:20:02] [INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/0022222222?generate_password=false
+[2026-03-02 10:22:00] [INFO] Logged check-in for user: Purdue ID: 0022222222 (Visit #7)
+[2026-03-02 10:30:00] [INFO] Starting API call for Purdue ID: 0033333333
+[2026-03-02 10:30:01] [INFO] API Response: <?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<user><user_group desc="Graduate">GRAD</user_group></user>
+[2026-03-02 10:30:02] [INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/0033333333?generate_password=false
+[2026-03-02 10:30:03] [INFO] Logged check-in for user: Purdue ID: 0033333333 (Visit #3)
+"""
+# 0011111111 made no PUT and 0022222222 was logged after the timeout
+CHECK_EXPECTED = [
+    ('0012345678', '2026-03-02 10:00:00', 'UGRAD', 4),
+    ('0087654321', '2026-03-02 10:05:00', 'STAFF', 1),
+    ('0033333333', '2026-03-02 10:30:00', 'GRAD', 3),
+]
+
+NOISE = [
+    "[INFO] Found official Primary ID from API: {id}",
+    "[INFO] No existing agreement found, creating new note based on POST confirmation.",
+    "[INFO] Email sent successfully",
+]
+GROUPS = ['UGRAD', 'GRAD', 'STAFF', 'FACULTY']
+
+
+def generate_debug_log(path, size_bytes, checkin_share=0.5, seed=0):
+    """Write a synthetic debug log of about `size_bytes`; returns (lines, check-ins)."""
+    rng = random.Random(seed)
+    ids = [f"00{rng.randint(10000000, 99999999)}" for _ in range(50000)]
+    lines = checkins = 0
+    written = 0
+    seconds = 0
+    with open(path, 'w') as f:
+        while written < size_bytes:
+            chunk = []
+            for _ in range(1000):
+                seconds += rng.randint(1, 30)
+                ts = f"2026-01-01 {seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+                user_id = rng.choice(ids)
+                if rng.random() >= checkin_share:
+                    chunk.append(f"[{ts}] {rng.choice(NOISE).format(id=user_id)}\n")
+                    continue
+                chunk.extend([
+                    f"[{ts}] [INFO] Starting API call for Purdue ID: {user_id}\n",
+                    f"[{ts}] [INFO] API Response: <?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>\n",
+                    f"<user>\n  <primary_id>{user_id}</primary_id>\n",
+                    f"  <user_group desc=\"Group\">{rng.choice(GROUPS)}</user_group>\n</user>\n",
+                    f"[{ts}] [INFO] PUT Request URL: https://api-na.hosted.exlibrisgroup.com/almaws/v1/users/"
+                    f"{user_id}?generate_password=false\n",
+                    f"[{ts}] [INFO] Logged check-in for user: Purdue ID: {user_id} (Visit #{rng.randint(1, 40)})\n",
+                ])
+                checkins += 1
+            data = ''.join(chunk)
+            f.write(data)
+            written += len(data)
+            lines += data.count('\n')
+    return lines, checkins
+
+
+def check():
+    """Compare the entries recovered from CHECK_LOG with CHECK_EXPECTED."""
+    recovered = list(recovery_script.iter_recovered_entries(CHECK_LOG.splitlines(keepends=True)))
+    if recovered != CHECK_EXPECTED:
+        print("Error: recovered entries differ from the expected ones")
+        print(f"  expected:  {CHECK_EXPECTED}")
+        print(f"  recovered: {recovered}")
+        return False
+    print(f"check: {len(recovered)} entries recovered as expected")
+
+    expected = sorted(','.join(map(str, entry)) for entry in CHECK_EXPECTED)
+    lines = CHECK_LOG.splitlines(keepends=True)
+    for split in range(1, len(lines)):
+        with tempfile.TemporaryDirectory() as log_dir:
+            os.makedirs(os.path.join(log_dir, 'archives'))
+            with open(os.path.join(log_dir, 'archives', 'debug_log_2026-03-02_100000.txt'), 'w') as f:
+                f.writelines(lines[:split])
+            with open(os.path.join(log_dir, 'debug.log'), 'w') as f:
+                f.writelines(lines[split:])
+            output_path = os.path.join(log_dir, 'recovered.csv')
+            with contextlib.redirect_stdout(io.StringIO()):
+                recovery_script.process_debug_logs(recovery_script.find_debug_logs(log_dir), output_path, workers=2)
+            with open(output_path) as f:
+                recovered = sorted(f.read().splitlines())
+        if recovered != expected:
+            print(f"Error: with the log rotated before line {split + 1}, recovered {recovered}")
+            return False
+    print(f"check: every check-in recovered with the log rotated at each of {len(lines) - 1} lines")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recovery_script debug log scanning')
+    parser.add_argument('--size-mb', type=int, default=200, help='Size of the synthetic debug log')
+    parser.add_argument('--debug-log', help='Use an existing debug log instead of generating one')
+    parser.add_argument('--check', action='store_true', help='Check the recovered entries of a known log first')
+    args = parser.parse_args()
+
+    if args.check and not check():
+        sys.exit(1)
+
+    tmp_dir = None
+    path = args.debug_log
+    expected = None
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, 'debug.log')
+        print(f"Generating {args.size_mb} MB synthetic debug log...")
+        _, expected = generate_debug_log(path, args.size_mb * 1024 * 1024)
+    with open(path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"{lines} lines, {size_mb:.0f} MB")
+
+    try:
+        started = time.perf_counter()
+        recovered = sum(1 for _ in recovery_script.iter_recovered_entries(recovery_script.iter_log_lines(path)))
+        elapsed = time.perf_counter() - started
+        print(f"single-pass scan: {elapsed:.2f} s, {lines / elapsed:,.0f} lines/s, "
+              f"{size_mb / elapsed:.0f} MB/s, {recovered} check-ins")
+        if expected is not None and recovered != expected:
+            print(f"Error: recovered {recovered} check-ins, the log has {expected}")
+            sys.exit(1)
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
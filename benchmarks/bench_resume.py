@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Interrupted and resumed fix_agreements runs against the Alma stand-in.
+
+Stops a dry run and a real run part way with --max-calls, then resumes
+each from its journal and reports the wall time of every leg. It checks
+that resuming a dry run without --dry-run is refused and changes nothing,
+that a resumed dry run still makes no changes, and that a resumed real run
+covers every user exactly once and leaves no user without a note.
+
+    python3 benchmarks/bench_resume.py --users 500
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alma_standin import start_standin
+
+RUN_ID_RE = re.compile(r'^Run ID: (\S+)$', re.MULTILINE)
+PROCESSED_RE = re.compile(r'^Total users processed: (\d+)$', re.MULTILINE)
+
+
+def write_workdir(directory, base_url, users):
+    """A config.php and check-in log for the runs."""
+    os.makedirs(os.path.join(directory, 'logs'))
+    with open(os.path.join(directory, 'config.php'), 'w') as f:
+        f.write("<?php\nreturn [\n    'ALMA_API_KEY' => 'bench',\n"
+                f"    'BASE_URL' => '{base_url}',\n"
+                "    'LOGS' => [\n        'CHECKIN' => 'logs/checkin.log',\n    ],\n];\n")
+    with open(os.path.join(directory, 'logs', 'checkin.log'), 'w') as f:
+        for user_id in users:
+            f.write(json.dumps({'timestamp': '2026-01-05 10:00:00', 'purdueId': user_id}) + '\n')
+
+
+def run(workdir, *args):
+    """Run fix_agreements.py in workdir; returns (exit code, stdout, seconds)."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'fix_agreements.py'), '--no-cache', '--rate', '1000',
+                             *args], cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+    return result.returncode, result.stdout, time.perf_counter() - started
+
+
+def fail(message, output=None):
+    print(f"Error: {message}")
+    if output:
+        print(output[-2000:])
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and time resumed note script runs against the stand-in')
+    parser.add_argument('--users', type=int, default=500, help='Unique users in the check-in log')
+    parser.add_argument('--stop-after', type=int, help='API calls before the first leg stops (default: users / 2)')
+    args = parser.parse_args()
+    stop_after = args.stop_after or args.users // 2
+
+    users = [str(50000000 + i).zfill(10) for i in range(args.users)]
+    server, state, base_url = start_standin()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        write_workdir(tmp_dir, base_url, users)
+
+        code, output, elapsed = run(tmp_dir, '--dry-run', '--max-calls', str(stop_after))
+        match = RUN_ID_RE.search(output)
+        if code != 0 or match is None or 'Stopping early' not in output:
+            fail("the dry run did not stop early with a run ID", output)
+        dry_run_id = match.group(1)
+        print(f"  dry run, stopped            {elapsed:6.2f}s")
+
+        code, output, elapsed = run(tmp_dir, '--resume', dry_run_id)
+        if code == 0 or 'was a dry run' not in output or state.counts['PUT']:
+            fail(f"resuming dry run {dry_run_id} without --dry-run was not refused", output)
+        print(f"  real resume of dry run      {elapsed:6.2f}s  refused")
+
+        code, output, elapsed = run(tmp_dir, '--dry-run', '--resume', dry_run_id)
+        processed = PROCESSED_RE.search(output)
+        if code != 0 or processed is None or int(processed.group(1)) != args.users or state.counts['PUT']:
+            fail("the resumed dry run did not cover every user without changes", output)
+        print(f"  dry run, resumed            {elapsed:6.2f}s  {args.users} users, 0 PUTs")
+
+        time.sleep(1)  # Run IDs have one-second resolution
+        gets_before = state.counts['GET']
+        code, output, elapsed = run(tmp_dir, '--max-calls', str(stop_after))
+        match = RUN_ID_RE.search(output)
+        if code != 0 or match is None or 'Stopping early' not in output:
+            fail("the real run did not stop early with a run ID", output)
+        print(f"  real run, stopped           {elapsed:6.2f}s")
+
+        code, output, elapsed = run(tmp_dir, '--resume', match.group(1))
+        processed = PROCESSED_RE.search(output)
+        if code != 0 or processed is None or int(processed.group(1)) != args.users:
+            fail("the resumed real run did not cover every user", output)
+        # A user cut off between its GET and PUT is fetched again on resume
+        gets = state.counts['GET'] - gets_before
+        if not args.users <= gets <= args.users + 1:
+            fail(f"the real run and its resume made {gets} GETs for {args.users} users")
+        missing = [user_id for user_id in users if state.segment(user_id) is None]
+        if missing:
+            fail(f"{len(missing)} users still have no agreement note, e.g. {missing[0]}")
+        print(f"  real run, resumed           {elapsed:6.2f}s  {args.users} users, {state.counts['PUT']} PUTs")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
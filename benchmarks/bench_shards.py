@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Wall time of one note script run split into 1, 2, 4... local shards.
+
+Each shard is a separate process talking to a fresh Alma stand-in, and the
+shards split one --rate budget between them, as they must for Alma's
+per-institution limit. Sharding pays off while a single process is held
+back by latency rather than the rate, so the defaults use one worker per
+shard and a slow stand-in. The check-in log repeats users so the shards
+must deduplicate before partitioning. The benchmark checks that the merged
+counters match the unsharded run, that the stand-in saw exactly one GET per
+unique user, that no journal holds a user twice and that the shards
+together stayed within --rate.
+
+    python3 benchmarks/bench_shards.py --users 200 --shards 1 2 4 --rate 20
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alma_client import positive_float
+from alma_standin import start_standin
+from shard_runner import SCRIPTS, merge_results, run_shards
+
+
+def write_workdir(directory, base_url, users, repeats):
+    """A config.php and check-in log for the shards to run against."""
+    os.makedirs(os.path.join(directory, 'logs'))
+    with open(os.path.join(directory, 'config.php'), 'w') as f:
+        f.write("<?php\nreturn [\n    'ALMA_API_KEY' => 'bench',\n"
+                f"    'BASE_URL' => '{base_url}',\n"
+                "    'LOGS' => [\n        'CHECKIN' => 'logs/checkin.log',\n    ],\n];\n")
+    with open(os.path.join(directory, 'logs', 'checkin.log'), 'w') as f:
+        for visit in range(repeats):
+            for user_id in users:
+                f.write(json.dumps({'timestamp': f'2026-01-{visit % 28 + 1:02d} 10:00:00', 'purdueId': user_id}) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sharded note script runs against the stand-in')
+    parser.add_argument('--script', default='fix_agreements', choices=SCRIPTS)
+    parser.add_argument('--users', type=int, default=200, help='Unique users in the check-in log')
+    parser.add_argument('--repeats', type=int, default=3, help='Check-ins per user')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help='Shard counts to run')
+    parser.add_argument('--rate', type=positive_float, default=20, help='API calls per second for all shards together')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent users within each shard')
+    parser.add_argument('--latency', type=float, default=0.1, help='Mean stand-in response latency in seconds')
+    args = parser.parse_args()
+
+    users = [str(50000000 + i).zfill(10) for i in range(args.users)]
+    print(f"{args.script}: {args.users} users x {args.repeats} check-ins, {args.rate:g} calls/s across all shards")
+    tmp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    baseline = None
+    try:
+        for count in args.shards:
+            server, state, base_url = start_standin(latency=args.latency)
+            workdir = os.path.join(tmp_dir, f'shards-{count}')
+            write_workdir(workdir, base_url, users, args.repeats)
+            os.chdir(workdir)
+            try:
+                started = time.perf_counter()
+                paths = run_shards(args.script, count, ['--workers', str(args.workers)], 'results', rate=args.rate)
+                elapsed = time.perf_counter() - started
+                _, counters, shards, problems = merge_results(paths)
+            finally:
+                os.chdir(cwd)
+                server.shutdown()
+                server.server_close()
+
+            if problems or counters['processed'] != args.users or state.counts['GET'] != args.users:
+                print(f"Error: {count} shards: {problems}, processed {counters.get('processed')}, "
+                      f"{state.counts['GET']} GETs for {args.users} users")
+                sys.exit(1)
+            calls = sum(shard['api_calls'] for shard in shards)
+            # Each shard's bucket starts full (at least one token), so allow that burst
+            if calls > args.rate * elapsed + max(args.rate, count):
+                print(f"Error: {count} shards made {calls} API calls in {elapsed:.2f}s, over {args.rate:g}/s")
+                sys.exit(1)
+            baseline = baseline or counters
+            if counters != baseline:
+                print(f"Error: {count} shards counted {counters}, expected {baseline}")
+                sys.exit(1)
+            sizes = ', '.join(str(shard['results']['processed'])
+                              for shard in sorted(shards, key=lambda shard: shard['shard'][0]))
+            print(f"  {count} shard(s): {elapsed:6.2f}s, {args.users / elapsed:7.1f} users/s, "
+                  f"{calls / elapsed:5.1f} calls/s, users per shard {sizes}")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
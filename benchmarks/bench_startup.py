@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Import time of each maint.py subcommand's script, from python -X importtime.
+
+Imports every script in a fresh interpreter several times and reports the
+median cumulative import time and the modules it pulled in. It fails if a
+script loads a heavy dependency it does not need at startup (requests,
+numpy, pytz, urllib.request), or with --budget-ms if any import takes
+longer than that, so a new top-level import shows up as a regression.
+
+    python3 benchmarks/bench_startup.py --repeat 5 --budget-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from maint import COMMANDS
+
+HEAVY = ('requests', 'numpy', 'pytz', 'urllib.request')
+# Scripts whose work is numpy from the first line may load it at import
+NEEDS = {
+    'recount_visits': {'numpy'},
+}
+
+
+def import_time(module):
+    """(cumulative import time in ms, names of every module imported) for one fresh import."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1]}")
+    total = None
+    names = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        names.add(name.strip())
+        if name.strip() == module and not name[1:].startswith(' '):
+            total = int(cumulative) / 1000
+    return total, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and guard the startup time of the maintenance scripts')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh imports per script; the median is reported')
+    parser.add_argument('--budget-ms', type=float, help='Fail if any script takes longer than this to import')
+    parser.add_argument('commands', nargs='*', metavar='COMMAND', help='Subcommands to measure (default: all)')
+    args = parser.parse_args()
+    unknown = [command for command in args.commands if command not in COMMANDS]
+    if unknown:
+        print(f"Error: Unknown command(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    failures = []
+    for command in args.commands or ['maint'] + list(COMMANDS):
+        module = 'maint' if command == 'maint' else COMMANDS[command][0]
+        try:
+            runs = [import_time(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"  {command:<12} {e}")
+            failures.append(command)
+            continue
+        median = statistics.median(total for total, _ in runs)
+        names = runs[0][1]
+        loaded = [name for name in HEAVY if name in names]
+        unexpected = [name for name in loaded if name not in NEEDS.get(module, ())]
+        print(f"  {command:<12} {module:<24} {median:7.1f} ms  {len(names):4d} modules"
+              + (f"  loads {', '.join(loaded)}" if loaded else ""))
+        if unexpected:
+            print(f"Error: import {module} loads {', '.join(unexpected)} at startup")
+            failures.append(command)
+        if args.budget_ms is not None and median > args.budget_ms:
+            print(f"Error: import {module} took {median:.1f} ms, over the {args.budget_ms:g} ms budget")
+            failures.append(command)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
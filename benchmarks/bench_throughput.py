@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""End-to-end throughput benchmark for the Alma note fixers.
+
+Runs bulk_runner.process_users for fix_agreements and validate_note_segments
+against the local Alma stand-in at several user counts and reports users/sec,
+p50/p99 per-user latency and peak RSS. Each run happens in a child process
+so its peak RSS is not polluted by the stand-in or earlier runs.
+
+    python3 benchmarks/bench_throughput.py --sizes 1000 10000 100000
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRIPTS = ('fix_agreements', 'validate_note_segments')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_one(script, size, base_url, workers, dry_run):
+    """Run one script over `size` synthetic users and print a JSON result line."""
+    import importlib
+    from alma_client import AlmaUsersClient
+    from bulk_runner import process_users
+
+    module = importlib.import_module(script)
+    latencies = []
+    process_user = module.SCRIPT.process_user
+
+    def timed_process_user(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return process_user(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    script_spec = module.SCRIPT._replace(process_user=timed_process_user)
+    config = {'base_url': base_url, 'api_key': 'bench', 'checkin_log': os.devnull}
+    users = [str(20000000 + i).zfill(10) for i in range(size)]
+    client = AlmaUsersClient(config, workers=workers, rate=100000)
+
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = process_users(script_spec, client, users, dry_run, workers)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'script': script,
+        'users': size,
+        'seconds': round(elapsed, 3),
+        'users_per_sec': round(size / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'api_calls': client.calls_made,
+        'results': results,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Alma note fixers against a local stand-in')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='User counts to run')
+    parser.add_argument('--scripts', nargs='+', choices=SCRIPTS, default=list(SCRIPTS), help='Scripts to benchmark')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent users per run')
+    parser.add_argument('--latency', type=float, default=0.01, help='Mean stand-in latency in seconds')
+    parser.add_argument('--rate-429', type=float, default=0.001, help='Fraction of requests throttled with HTTP 429')
+    parser.add_argument('--apply', action='store_true', help='Issue PUTs instead of running in dry-run mode')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--run-one', nargs=3, metavar=('SCRIPT', 'SIZE', 'BASE_URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        script, size, base_url = args.run_one
+        run_one(script, int(size), base_url, args.workers, not args.apply)
+        return
+
+    from alma_standin import start_standin
+
+    server, state, base_url = start_standin(latency=args.latency, rate_429=args.rate_429)
+    rows = []
+    try:
+        for size in args.sizes:
+            for script in args.scripts:
+                cmd = [sys.executable, os.path.abspath(__file__), '--workers', str(args.workers),
+                       '--run-one', script, str(size), base_url]
+                if args.apply:
+                    cmd.append('--apply')
+                output = subprocess.run(cmd, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+                row = json.loads(output.strip().splitlines()[-1])
+                rows.append(row)
+                print(f"{row['script']:<24} {row['users']:>7} users  {row['users_per_sec']:>8.1f} users/s  "
+                      f"p50 {row['p50_ms']:>7.2f} ms  p99 {row['p99_ms']:>7.2f} ms  "
+                      f"peak RSS {row['peak_rss_mb']:>6.1f} MB  {row['api_calls']} API calls")
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Cold, parallel and cached scans of years of check-in history by validate_logs.
+
+Generates monthly archives and a main log of synthetic check-ins with
+consecutive visitCounts, injecting known numbers of torn lines, exact
+duplicates, repeat check-ins within 30 seconds and visitCount gaps. It then
+times a one-process scan, a parallel scan that fills the cache, a second
+parallel scan that reuses it without reading the archives, and one after
+touching every archive, which only checksums them. It checks that all four
+find exactly the injected problems. A main-log-only scan, as with --no-archives,
+must find the same problems in the main log without flagging returning
+users whose first check-in there is not visit 1.
+
+    python3 benchmarks/bench_validate_logs.py --months 36 --per-month 20000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkin_logs import checkin_log_files
+from validate_logs import scan_checkin_logs, stitch_files
+
+
+def generate_logs(log_dir, months, per_month, users, anomaly_rate, seed=0):
+    """Write archives and a main log.
+
+    Returns the Counter of problems they should produce, and the Counter of
+    those in the main log alone.
+    """
+    rng = random.Random(seed)
+    ids = [str(10000000 + rng.randrange(90000000)).zfill(10) for _ in range(users)]
+    visits = {}
+    expected = Counter()
+    main_log = Counter()
+    clock = datetime(2023, 1, 1, 8, 0, 0)
+    os.makedirs(os.path.join(log_dir, 'archives'))
+    for month in range(months + 1):
+        if month < months:
+            path = os.path.join(log_dir, 'archives', f'checkin_{2023 + month // 12}_{month % 12 + 1:02d}.json')
+        else:
+            path = os.path.join(log_dir, 'checkin_log.json')
+        lines = []
+        found = expected if month < months else main_log
+        in_file = set()
+        for _ in range(per_month):
+            clock += timedelta(seconds=rng.randint(40, 100))
+            user_id = rng.choice(ids)
+            visits[user_id] = visits.get(user_id, 0) + 1
+            roll = rng.random() / anomaly_rate
+            if roll < 1:
+                visits[user_id] += 1
+                # Without the archives a gap before a user's first check-in in the file cannot be seen
+                (found if user_id in in_file else expected)['visit_count'] += 1
+            record = {'purdueId': user_id, 'timestamp': clock.strftime('%Y-%m-%d %H:%M:%S'),
+                      'visitCount': visits[user_id], 'userGroup': 'undergrad'}
+            line = json.dumps(record)
+            in_file.add(user_id)
+            lines.append(line)
+            if 1 <= roll < 2:
+                lines.append(line)
+                found['duplicate'] += 1
+                found['visit_count'] += 1
+            elif 2 <= roll < 3:
+                visits[user_id] += 1
+                lines.append(json.dumps(dict(record, visitCount=visits[user_id],
+                                             timestamp=(clock + timedelta(seconds=5)).strftime('%Y-%m-%d %H:%M:%S'))))
+                found['rapid_duplicate'] += 1
+            elif 3 <= roll < 4:
+                lines.append(line[:len(line) // 2])
+                found['torn'] += 1
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    return expected + main_log, main_log
+
+
+def scan(log_path, cache_path, workers, archives=True):
+    started = time.perf_counter()
+    files = checkin_log_files(log_path, include_archives=archives)
+    scans, reused = scan_checkin_logs(files, cache_path, workers)
+    kinds = Counter(problem[1] for _, result in scans for problem in result['problems'])
+    kinds.update(problem.kind for problem in stitch_files(scans, full_history=archives))
+    return time.perf_counter() - started, kinds, reused, sum(result['records'] for _, result in scans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark validate_logs cold, parallel and cached scans')
+    parser.add_argument('--months', type=int, default=36, help='Closed monthly archives to generate')
+    parser.add_argument('--per-month', type=int, default=20000, help='Check-ins per file')
+    parser.add_argument('--users', type=int, default=8000, help='Distinct Purdue IDs')
+    parser.add_argument('--anomaly-rate', type=float, default=0.001, help='Share of check-ins given each problem')
+    parser.add_argument('--workers', type=int, help='Scanning processes (default: CPU count)')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        expected, main_log = generate_logs(tmp_dir, args.months, args.per_month, args.users, args.anomaly_rate)
+        log_path = os.path.join(tmp_dir, 'checkin_log.json')
+        cache_path = os.path.join(tmp_dir, 'scan_cache.json')
+        size_mb = sum(os.path.getsize(path) for path in checkin_log_files(log_path)) / 1e6
+        print(f"{args.months} archives + main log, {size_mb:.0f} MB; injected "
+              + ", ".join(f"{kind} {total}" for kind, total in sorted(expected.items())))
+        for label, cache, workers in (('one process, no cache', None, 1),
+                                      ('parallel, filling cache', cache_path, args.workers),
+                                      ('parallel, cached archives', cache_path, args.workers),
+                                      ('parallel, touched archives', cache_path, args.workers)):
+            if label == 'parallel, touched archives':
+                for path in checkin_log_files(log_path)[:-1]:
+                    os.utime(path)
+            elapsed, kinds, reused, records = scan(log_path, cache, workers)
+            if kinds != expected:
+                print(f"Error: {label} found {dict(kinds)}, expected {dict(expected)}")
+                sys.exit(1)
+            print(f"  {label:<26} {elapsed:6.2f}s  {records / elapsed:>10,.0f} records/s  "
+                  f"{reused} archives reused")
+        elapsed, kinds, _, records = scan(log_path, None, 1, archives=False)
+        if kinds != main_log:
+            print(f"Error: main log only found {dict(kinds)}, expected {dict(main_log)}")
+            sys.exit(1)
+        print(f"  {'main log only':<26} {elapsed:6.2f}s  {records / elapsed:>10,.0f} records/s")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Concurrency stress test for the locked log writer.
+
+Starts N writer processes that each append check-in records one at a time
+(like confirm.php, one per request) and debug lines in buffered batches.
+With --rewriter a further process keeps reading the check-in log and
+renaming a rewritten copy over it, as rotation and admin edits do. Afterwards the logs are
+streamed through validate_logs and every record is accounted for.
+
+Writers run log_writer.php through the php CLI when it is installed, or the
+same flock() protocol from Python (checkin_logs.append_locked) otherwise.
+--unlocked uses plain appends and an unlocked rewrite for comparison.
+
+    python3 benchmarks/stress_log_writer.py --writers 32 --lines 2000 --rewriter
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkin_logs import append_locked, locked_log, replace_locked
+from validate_logs import check_checkin_file, check_debug_file
+
+DEBUG_BATCH = 50
+
+PHP_WRITER = r'''<?php
+require $argv[1];
+[$checkinLog, $debugLog, $writer, $lines, $unlocked] = array_slice($argv, 2);
+for ($i = 0; $i < (int)$lines; $i++) {
+    $record = json_encode(['purdueId' => sprintf('9%03d%06d', $writer, $i), 'timestamp' => date('Y-m-d H:i:s'),
+                           'userGroup' => 'stress', 'visitCount' => $i + 1]) . "\n";
+    $debug = '[' . date('Y-m-d H:i:s') . "] [INFO] Logged check-in for writer $writer line $i\n";
+    if ($unlocked) {
+        file_put_contents($checkinLog, $record, FILE_APPEND);
+        file_put_contents($debugLog, $debug, FILE_APPEND);
+    } else {
+        appendToLog($checkinLog, $record);
+        BufferedLog::add($debugLog, $debug);
+    }
+}
+'''
+
+
+def record_line(writer, i):
+    return (json.dumps({'purdueId': f"9{writer:03d}{i:06d}", 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                        'userGroup': 'stress', 'visitCount': i + 1}) + '\n').encode()
+
+
+def python_writer(checkin_log, debug_log, writer, lines, unlocked):
+    append = unlocked_append if unlocked else append_locked
+    debug = []
+    for i in range(lines):
+        append(checkin_log, record_line(writer, i))
+        debug.append(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [INFO] Logged check-in for writer {writer} line {i}\n")
+        if len(debug) >= DEBUG_BATCH or i == lines - 1:
+            append(debug_log, ''.join(debug).encode())
+            debug = []
+
+
+def unlocked_append(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def rewriter(checkin_log, stop, unlocked):
+    """Read and rewrite the log in place until told to stop, like rotation does."""
+    while not stop.is_set():
+        if unlocked:
+            with open(checkin_log, 'rb') as f:
+                data = f.read()
+            with open(checkin_log, 'wb') as f:
+                f.write(data)
+        else:
+            with locked_log(checkin_log, 'rb') as f:
+                replace_locked(checkin_log, f.read())
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress test concurrent log writers')
+    parser.add_argument('--writers', type=int, default=16, help='Number of concurrent writer processes')
+    parser.add_argument('--lines', type=int, default=1000, help='Check-in records per writer')
+    parser.add_argument('--writer', choices=['php', 'python'],
+                        default='php' if shutil.which('php') else 'python', help='Writer implementation')
+    parser.add_argument('--rewriter', action='store_true', help='Also keep replacing the log with a rewritten copy while writing')
+    parser.add_argument('--unlocked', action='store_true', help='Use plain appends without the writer lock')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkin_log = os.path.join(tmp_dir, 'checkin_log.json')
+        debug_log = os.path.join(tmp_dir, 'debug.log')
+        open(checkin_log, 'w').close()
+        php_script = os.path.join(tmp_dir, 'writer.php')
+        with open(php_script, 'w') as f:
+            f.write(PHP_WRITER)
+
+        mode = 'unlocked' if args.unlocked else 'locked'
+        print(f"{args.writers} {args.writer} writers x {args.lines} check-ins, {mode}"
+              f"{', with concurrent rewrites' if args.rewriter else ''}")
+
+        stop = multiprocessing.Event()
+        rewrite_process = None
+        if args.rewriter:
+            rewrite_process = multiprocessing.Process(target=rewriter, args=(checkin_log, stop, args.unlocked))
+            rewrite_process.start()
+
+        started = time.perf_counter()
+        if args.writer == 'php':
+            writers = [subprocess.Popen(['php', php_script, os.path.join(ROOT, 'log_writer.php'), checkin_log,
+                                         debug_log, str(w), str(args.lines), '1' if args.unlocked else '0'])
+                       for w in range(args.writers)]
+            for process in writers:
+                process.wait()
+        else:
+            writers = [multiprocessing.Process(target=python_writer,
+                                               args=(checkin_log, debug_log, w, args.lines, args.unlocked))
+                       for w in range(args.writers)]
+            for process in writers:
+                process.start()
+            for process in writers:
+                process.join()
+        elapsed = time.perf_counter() - started
+        if rewrite_process is not None:
+            stop.set()
+            rewrite_process.join()
+
+        counts = Counter()
+        problems = Counter(problem.kind for problem in check_checkin_file(checkin_log, set(), counts))
+        problems.update(f"debug {problem.kind}" for problem in check_debug_file(debug_log))
+        with open(debug_log, 'rb') as f:
+            debug_lines = sum(1 for _ in f)
+
+    expected = args.writers * args.lines
+    found = sum(counts.values())
+    print(f"check-in records: {found}/{expected} ({expected - found} lost)")
+    print(f"debug lines:      {debug_lines}/{expected} ({expected - debug_lines} lost)")
+    print("problems:         " + (", ".join(f"{kind} {count}" for kind, count in sorted(problems.items())) or "none"))
+    print(f"throughput:       {expected / elapsed:,.0f} check-ins/s ({elapsed:.2f} s)")
+    if found != expected or debug_lines != expected or problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
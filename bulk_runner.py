@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from alma_bulk import add_bulk_arguments, process_bulk
+from alma_client import DEFAULT_RATE, AlmaUsersClient, RequestBudgetExceeded, parse_php_config, positive_float
+from agreement_cache import add_cache_arguments, open_cache, skip_known_compliant
+from checkin_logs import Checkpoint, add_log_source_arguments, checkpoint_path, iter_user_ids
+from run_journal import add_journal_arguments, runs_dir, start_run
+from run_metrics import Progress, add_metrics_arguments, count, finish_metrics, start_metrics, timed_iter, timer
+from shard_runner import add_shard_arguments, in_shard, shard_api_key, shard_label, shard_name, write_results
+
+DEFAULT_WORKERS = 1
+
+# Outcome of processing one user: the results counters it bumps, the lines to
+# print for that user, in order, the (has_note, segment_type) agreement status
+# observed in Alma (None if unknown), the HTTP status of a failed call and the
+# RecordValidators of the record the status was read from.
+UserResult = namedtuple('UserResult', ['counters', 'messages', 'agreement', 'status', 'record'],
+                        defaults=(None, None, None))
+
+# What a note script supplies to the shared run: its name and the banner and
+# argparse description it prints, process_user(client, user_id, dry_run,
+# known), its results counters, the counters of users that need nothing
+# done, the test of whether a cached status needs no fetch, the counters and
+# parameters of its bulk note job (see alma_bulk.py), and (label, counter)
+# lines for its summary.
+NoteScript = namedtuple('NoteScript', ['name', 'description', 'banner', 'process_user', 'counters', 'routine',
+                                       'is_known_compliant', 'bulk_outcomes', 'bulk_job_params', 'summary'])
+
+
+def tally(results, result):
+    """Add one user's result to the run's results counters."""
+    results['processed'] += 1
+    for counter in result.counters:
+        results[counter] += 1
+
+
+def run_users(users, handler, workers=DEFAULT_WORKERS):
+    """Call handler(user_id) for every user, keeping at most `workers` in flight.
+
+    Yields (user_id, result) pairs in the calling thread as they complete, so
+    counters and output never need locking. With a single worker users are
+    handled in order without a thread pool.
+    """
+    if workers <= 1:
+        for user_id in users:
+            yield user_id, handler(user_id)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        user_iter = iter(users)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers:
+                try:
+                    user_id = next(user_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(handler, user_id)] = user_id
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
+def progress_detail(results):
+    """Non-zero outcome counters for a progress line."""
+    return ', '.join(f"{name} {value}" for name, value in results.items()
+                     if name != 'processed' and not isinstance(value, bool) and isinstance(value, int) and value)
+
+
+def process_users(script, client, users, dry_run=False, workers=DEFAULT_WORKERS, cache=None, revalidate_all=False,
+                  journal=None, bulk=None, conditional=False, progress=None):
+    """Run a note script's process_user over users and return its results counters.
+
+    Users the cache already knows to be compliant are skipped. With `bulk`
+    (the parsed --bulk options) the users go through one Alma set and job
+    instead of a GET and PUT each. With a `progress` reporter users that
+    need nothing done (a `routine` counter) are only counted; changes, dry
+    run previews and failures are still printed in full.
+    """
+    results = dict.fromkeys(('processed',) + tuple(script.counters), 0)
+
+    known = {} if conditional and cache is not None and bulk is None else None
+    if known is not None:
+        results.update(not_modified=0, parse_skipped=0)
+    # Only users who are new, stale or last seen non-compliant need Alma
+    if cache is not None and (not revalidate_all or known is not None):
+        users = skip_known_compliant(users, cache, script.is_known_compliant, results, known, revalidate_all)
+    if bulk is not None:
+        return process_bulk(bulk, client, users, results, script.bulk_outcomes, script.bulk_job_params, cache, journal)
+    # Users may be streamed from the check-in log, in which case the total is unknown
+    total = f"/{len(users)}" if hasattr(users, '__len__') else ""
+
+    def handler(user_id):
+        with timer('user'):
+            return script.process_user(client, user_id, dry_run, known.pop(user_id, None) if known is not None else None)
+
+    try:
+        for user_id, result in run_users(users, handler, workers):
+            tally(results, result)
+            if progress is None or not any(counter in script.routine for counter in result.counters):
+                print(f"\nProcessing user {user_id} ({results['processed']}{total})")
+                for message in result.messages:
+                    print(message)
+            if progress is not None:
+                progress.update(results['processed'], progress_detail(results))
+            if cache is not None and result.agreement is not None:
+                cache.record(user_id, *result.agreement, result.record)
+            if journal is not None:
+                journal.record(user_id, result)
+    except RequestBudgetExceeded as e:
+        print(f"\nStopping early: {str(e)}")
+        results['stopped_early'] = True
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+        results['stopped_early'] = True
+    if progress is not None:
+        progress.finish(results['processed'], progress_detail(results))
+
+    return results
+
+
+def run_note_script(script):
+    """Command-line entry point shared by the note scripts."""
+    parser = argparse.ArgumentParser(description=script.description)
+    parser.add_argument('--dry-run', action='store_true', help='Preview changes without making them')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Number of users processed concurrently')
+    parser.add_argument('--rate', type=positive_float, default=DEFAULT_RATE, help='Maximum Alma API calls per second')
+    parser.add_argument('--max-calls', type=int, help='Stop after this many Alma API calls')
+    add_cache_arguments(parser)
+    add_log_source_arguments(parser)
+    add_journal_arguments(parser)
+    add_bulk_arguments(parser)
+    add_metrics_arguments(parser)
+    add_shard_arguments(parser)
+    args = parser.parse_args()
+    metrics = start_metrics(args, script.name)
+
+    print(f"Starting {script.banner}...")
+    if args.dry_run:
+        print("DRY RUN MODE - No changes will be made")
+
+    # Load configuration
+    print("\nLoading configuration...")
+    with timer('config_load'):
+        config = parse_php_config('config.php')
+    config['api_key'] = shard_api_key(args, config['api_key'])
+
+    # Stream unique users from the check-in log and its monthly archives
+    print("\nReading check-in log...")
+    if not os.path.exists(config['checkin_log']):
+        print(f"Error: Check-in log file not found at {config['checkin_log']}")
+        sys.exit(1)
+    run_label = shard_label(script.name, args.shard)
+    checkpoint = None
+    if args.incremental:
+        checkpoint = Checkpoint(checkpoint_path(config['checkin_log'], run_label))
+    users = timed_iter('checkin_log_scan', iter_user_ids(config['checkin_log'], args.since, args.until, checkpoint))
+    users = in_shard(users, args.shard)
+    journal, users, resumed_users = start_run(args, config['checkin_log'], run_label, users)
+    print(f"Run ID: {journal.run_id}")
+    metrics.path = metrics.path or os.path.join(runs_dir(config['checkin_log']), f"{journal.run_id}.metrics.json")
+    metrics.info.update(run_id=journal.run_id, dry_run=args.dry_run, workers=args.workers,
+                        shard=shard_name(args.shard))
+
+    # Process users
+    print("\nProcessing users...")
+    client = AlmaUsersClient(config, workers=args.workers, rate=args.rate, max_calls=args.max_calls)
+    cache = open_cache(args, config['checkin_log'], shard_name(args.shard))
+    bulk = args if args.bulk or args.bulk_export or args.bulk_report else None
+    progress = None if args.verbose else Progress('Users processed', interval=args.progress_every)
+    results = process_users(script, client, users, args.dry_run, args.workers, cache, args.revalidate_all, journal,
+                            bulk, args.conditional_get, progress)
+    for name, value in results.items():
+        if not isinstance(value, bool) and isinstance(value, int):
+            count(name, value)
+    journal.add_prior_counts(results, resumed_users)
+    journal.close()
+    if cache is not None:
+        cache.evict_stale()
+        cache.close()
+    if checkpoint is not None and not results.get('stopped_early'):
+        checkpoint.save()
+    if args.results:
+        write_results(args.results, script.name, args.shard, journal, results, client.calls_made)
+
+    # Print summary
+    print("\nSummary:")
+    print(f"Total users processed: {results['processed']}")
+    for line, counter in script.summary:
+        print(f"{line}: {results[counter]}")
+    if 'cached' in results:
+        print(f"Users skipped via agreement cache: {results['cached']}")
+    if 'not_modified' in results:
+        print(f"Full fetches avoided (HTTP 304): {results['not_modified']}")
+        print(f"Record parses avoided (unchanged records): {results['parse_skipped']}")
+    client.print_report()
+    if results.get('stopped_early'):
+        print(f"\nContinue this run with --resume {journal.run_id}")
+    if args.dry_run:
+        print("\nDry run completed - no changes were made")
+    finish_metrics(metrics)
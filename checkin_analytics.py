@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from checkin_logs import checkin_log_files, iter_lines, parse_line
+
+STORE_FILENAME = 'checkin_analytics.npz'
+# Dictionary-encoded columns and the check-in log field each one holds
+CATEGORIES = {'user_group': 'userGroup', 'department': 'department', 'campus_code': 'campusCode'}
+FINGERPRINT_BYTES = 64
+
+
+def default_store_path(checkin_log):
+    """The store lives next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', STORE_FILENAME)
+
+
+def category_value(record, field):
+    """Mirror admin.php's parseLogLine defaults: missing fields read as 'N/A'."""
+    value = record.get(field)
+    if field == 'department':
+        # getDepartmentUsageReport also reports an empty department as 'N/A'
+        return str(value) if value else 'N/A'
+    return 'N/A' if value is None else str(value)
+
+
+def parse_timestamps(values):
+    """Parse 'Y-m-d H:i:s' strings; unparseable ones become NaT."""
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except ValueError:
+        parsed = np.empty(len(values), dtype='datetime64[s]')
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = np.datetime64(value, 's')
+            except ValueError:
+                parsed[i] = np.datetime64('NaT')
+        return parsed
+
+
+def file_fingerprint(path, offset):
+    """The bytes just before `offset`, to notice a file rewritten in place."""
+    if not offset:
+        return ''
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        return f.read(min(offset, FINGERPRINT_BYTES)).hex()
+
+
+class AnalyticsStore:
+    """Columnar copy of the check-in log and its monthly archives.
+
+    Each check-in is one row of a timestamp column, its day and month (as
+    days and months since 1970, so reports need no calendar arithmetic),
+    dictionary-encoded user group, department and campus code columns, and
+    the source file it came from. The manifest records how far each source
+    file has been read, so an update only parses appended lines. A file that was rotated or
+    rewritten (admin.php edits, log rotation) has its rows dropped and is
+    read again. Everything is saved to a single .npz file replaced
+    atomically, so readers never see a half-written store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}  # abs path -> {'source', 'inode', 'offset', 'fingerprint'}
+        self.dictionaries = {column: [] for column in CATEGORIES}
+        self.codes = {column: {} for column in CATEGORIES}
+        self.next_source = 0
+        self.columns = {'timestamp': np.empty(0, dtype='datetime64[s]'),
+                        'day': np.empty(0, dtype=np.int32),
+                        'month': np.empty(0, dtype=np.int32),
+                        'source': np.empty(0, dtype=np.int32)}
+        for column in CATEGORIES:
+            self.columns[column] = np.empty(0, dtype=np.int32)
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with np.load(self.path) as data:
+            manifest = json.loads(str(data['manifest']))
+            for name in self.columns:
+                self.columns[name] = data[name]
+        self.files = manifest['files']
+        self.next_source = manifest['next_source']
+        self.dictionaries = manifest['dictionaries']
+        self.codes = {column: {value: code for code, value in enumerate(values)}
+                      for column, values in self.dictionaries.items()}
+
+    def save(self):
+        manifest = {'files': self.files, 'next_source': self.next_source, 'dictionaries': self.dictionaries}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, manifest=np.array(json.dumps(manifest)), **self.columns)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def encode(self, column, value):
+        codes = self.codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.dictionaries[column])
+            self.dictionaries[column].append(value)
+        return code
+
+    def drop_source(self, path):
+        source = self.files.pop(path)['source']
+        keep = self.columns['source'] != source
+        for name, values in self.columns.items():
+            self.columns[name] = values[keep]
+
+    def start_offset(self, path):
+        """Offset to resume `path` from, dropping its rows if it was rewritten."""
+        saved = self.files.get(path)
+        if saved is None:
+            return 0
+        stat = os.stat(path)
+        if (saved['inode'] == stat.st_ino and stat.st_size >= saved['offset']
+                and file_fingerprint(path, saved['offset']) == saved['fingerprint']):
+            return saved['offset']
+        self.drop_source(path)
+        return 0
+
+    def ingest(self, path):
+        """Append the rows for lines added to `path` since the last update."""
+        offset = self.start_offset(path)
+        if path in self.files and offset == os.path.getsize(path):
+            return 0
+        timestamps = []
+        categories = {column: [] for column in CATEGORIES}
+        for _, offset, line in iter_lines(path, offset):
+            record = parse_line(line)
+            if record is None or not record.get('timestamp'):
+                continue
+            timestamps.append(record['timestamp'])
+            for column, field in CATEGORIES.items():
+                categories[column].append(self.encode(column, category_value(record, field)))
+
+        saved = self.files.get(path)
+        if saved is None:
+            saved = self.files[path] = {'source': self.next_source}
+            self.next_source += 1
+        saved.update(inode=os.stat(path).st_ino, offset=offset, fingerprint=file_fingerprint(path, offset))
+
+        parsed = parse_timestamps(timestamps)
+        valid = ~np.isnat(parsed)
+        new_columns = {'timestamp': parsed,
+                       'day': parsed.astype('datetime64[D]').astype(np.int32),
+                       'month': parsed.astype('datetime64[M]').astype(np.int32),
+                       'source': np.full(len(parsed), saved['source'], dtype=np.int32)}
+        for column, codes in categories.items():
+            new_columns[column] = np.array(codes, dtype=np.int32)
+        for name, values in new_columns.items():
+            self.columns[name] = np.concatenate([self.columns[name], values[valid]])
+        return int(valid.sum())
+
+    def update(self, checkin_log):
+        """Bring the store up to date with the check-in log and its archives.
+
+        Returns the number of rows added; the store is only saved if anything
+        changed.
+        """
+        files = [os.path.abspath(path) for path in checkin_log_files(checkin_log)]
+        changed = False
+        for path in list(self.files):
+            if path not in files:
+                self.drop_source(path)
+                changed = True
+        added = 0
+        for path in files:
+            before = dict(self.files.get(path, {}))
+            added += self.ingest(path)
+            changed = changed or self.files[path] != before
+        if changed:
+            self.save()
+        return added
+
+    # ----- Vectorized aggregations -----
+
+    def counts_by(self, period, column, rows=None):
+        """Count check-ins per (period, category), e.g. per month and user group.
+
+        `period` is 'day' or 'month'. Returns (period labels, category names,
+        2-D count matrix) with only the periods and categories that occur.
+        """
+        periods = self.columns[period]
+        codes = self.columns[column]
+        if rows is not None:
+            periods, codes = periods[rows], codes[rows]
+        unit = 'D' if period == 'day' else 'M'
+        if not len(periods):
+            return [], [], np.zeros((0, 0), dtype=np.int64)
+        first = int(periods.min())
+        span = int(periods.max()) - first + 1
+        width = len(self.dictionaries[column])
+        counts = np.bincount((periods - first) * width + codes, minlength=span * width).reshape(span, width)
+        used_periods = counts.sum(axis=1) > 0
+        used_names = counts.sum(axis=0) > 0
+        labels = [str(np.datetime64(first + int(offset), unit)) for offset in np.flatnonzero(used_periods)]
+        names = [name for name, used in zip(self.dictionaries[column], used_names) if used]
+        return labels, names, counts[used_periods][:, used_names]
+
+    def monthly_report(self, column):
+        """{'YYYY-MM': {category: count}}, newest month first."""
+        months, names, counts = self.counts_by('month', column)
+        report = {}
+        for month, row in reversed(list(zip(months, counts))):
+            report[month] = {name: int(count) for name, count in zip(names, row) if count}
+        return report
+
+    def usage_report(self):
+        """Check-ins per month and user group, as admin.php's getUsageReport."""
+        return self.monthly_report('user_group')
+
+    def department_report(self):
+        """Check-ins per month and department, as getDepartmentUsageReport."""
+        return self.monthly_report('department')
+
+    def daily_usage(self, month):
+        """Check-ins per day of 'YYYY-MM' with their user groups, as getDailyUsageData."""
+        rows = self.columns['month'] == np.datetime64(month, 'M').astype(np.int32)
+        days, names, counts = self.counts_by('day', 'user_group', rows)
+        return {day: {'total': int(row.sum()),
+                      'groups': {name: int(count) for name, count in zip(names, row) if count}}
+                for day, row in zip(days, counts)}
+
+    def year_over_year(self):
+        """{year: {month number: total}} for the year-over-year chart and table."""
+        yearly = {}
+        months, _, counts = self.counts_by('month', 'user_group')
+        for month, row in zip(months, counts):
+            year, month_num = month.split('-')
+            yearly.setdefault(year, {})[int(month_num)] = int(row.sum())
+        return yearly
+
+
+QUERIES = {
+    'usage': AnalyticsStore.usage_report,
+    'departments': AnalyticsStore.department_report,
+    'year-over-year': AnalyticsStore.year_over_year,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the columnar check-in analytics store')
+    parser.add_argument('command', choices=['build', 'daily'] + list(QUERIES),
+                        help='build updates the store; the others print a report as JSON')
+    parser.add_argument('--month', help='Month for the daily report (YYYY-MM)')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are read too')
+    parser.add_argument('--store', help=f'Store file (default: {STORE_FILENAME} next to the check-in log)')
+    args = parser.parse_args()
+
+    if args.command == 'daily' and not args.month:
+        print("Error: daily needs --month YYYY-MM")
+        sys.exit(1)
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    # Every command first picks up lines appended since the last update
+    started = time.perf_counter()
+    store = AnalyticsStore(args.store or default_store_path(args.checkin_log))
+    added = store.update(args.checkin_log)
+
+    if args.command == 'build':
+        print(f"Added {added} check-ins; store holds {len(store)} check-ins "
+              f"from {len(store.files)} files ({time.perf_counter() - started:.2f}s)")
+    elif args.command == 'daily':
+        print(json.dumps(store.daily_usage(args.month)))
+    else:
+        print(json.dumps(QUERIES[args.command](store)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import contextlib
+import glob
+import json
+import os
+import re
+import stat
+from run_metrics import count
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+ARCHIVE_NAME = re.compile(r'checkin_(\d{4})_(\d{2})\.json$')
+
+
+def archive_dir(log_path):
+    """Monthly archives live in logs/archives next to the main check-in log."""
+    return os.path.join(os.path.dirname(log_path) or '.', 'archives')
+
+
+def archive_month(path):
+    """Return 'YYYY-MM' for an archives/checkin_YYYY_MM.json path, else None."""
+    match = ARCHIVE_NAME.search(os.path.basename(path))
+    return f"{match.group(1)}-{match.group(2)}" if match else None
+
+
+def checkin_log_files(log_path, start=None, end=None, include_archives=True):
+    """List the monthly archives (oldest first) and then the main log.
+
+    Archives whose month lies outside the start/end dates are left out
+    without being opened.
+    """
+    files = []
+    if include_archives:
+        for path in sorted(glob.glob(os.path.join(archive_dir(log_path), 'checkin_*.json'))):
+            month = archive_month(path)
+            if month is None:
+                continue
+            if start and month < start[:7]:
+                continue
+            if end and month > end[:7]:
+                continue
+            files.append(path)
+    if os.path.exists(log_path):
+        files.append(log_path)
+    return files
+
+
+def parse_line(line):
+    """Parse one check-in log line into a dict, or None if it is unusable.
+
+    The live log is JSON lines written by confirm.php; older logs were CSV
+    with the Purdue ID and timestamp as the first two fields.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or not record.get('purdueId'):
+            return None
+        record['purdueId'] = str(record['purdueId'])
+        return record
+    parts = line.split(',')
+    record = {'purdueId': parts[0].strip()}
+    if len(parts) > 1:
+        record['timestamp'] = parts[1].strip()
+    return record
+
+
+def is_valid_user_id(user_id):
+    return bool(user_id) and user_id != "UNKNOWN" and not user_id.startswith("ERROR")
+
+
+def iter_lines(path, offset=0):
+    """Yield (offset, end_offset, raw_line) for complete lines from `offset` on.
+
+    A trailing line without a newline is still being written and is left for
+    the next read, so checkpoints never split a record.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        position = offset
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            end = position + len(line)
+            yield position, end, line
+            position = end
+
+
+@contextlib.contextmanager
+def locked_log(path, mode='ab'):
+    """Open a log holding the same exclusive flock() that log_writer.php takes.
+
+    Appends made while the lock is held cannot interleave with kiosk
+    writes, and a read-then-rewrite under one lock cannot lose lines
+    appended in between. A log replaced by rename while we waited for the
+    lock is reopened, so nothing is written to the unlinked old file.
+    """
+    while True:
+        f = open(path, mode)
+        if fcntl is None:
+            break
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+            break
+        f.close()
+    try:
+        yield f
+    finally:
+        f.flush()
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        f.close()
+
+
+def replace_locked(path, data):
+    """Replace a log we hold the lock on: write a temporary file, then rename.
+
+    The new file keeps the old one's permissions, since the web server
+    writes the logs too.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+    os.replace(tmp_path, path)
+
+
+def append_locked(path, data):
+    """Append complete lines (bytes) to a log under its writer lock."""
+    with locked_log(path) as f:
+        f.write(data)
+
+
+def checkpoint_path(log_path, name):
+    """Per-script checkpoint file kept next to the main check-in log."""
+    return os.path.join(os.path.dirname(log_path) or '.', f'.{name}_checkpoint.json')
+
+
+class Checkpoint:
+    """Byte offset reached in each log file, saved between runs.
+
+    A file whose inode changed or that shrank below its saved offset (log
+    rotation rewrites the main log) is read again from the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.offsets = json.load(f)
+
+    def start_offset(self, log_file):
+        saved = self.offsets.get(os.path.abspath(log_file))
+        if not saved:
+            return 0
+        stat = os.stat(log_file)
+        if saved.get('inode') != stat.st_ino or stat.st_size < saved.get('offset', 0):
+            return 0
+        return saved['offset']
+
+    def advance(self, log_file, offset):
+        self.offsets[os.path.abspath(log_file)] = {'inode': os.stat(log_file).st_ino, 'offset': offset}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.offsets, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def iter_checkins(log_path, start=None, end=None, checkpoint=None, include_archives=True):
+    """Stream check-in records from the archives and the main log.
+
+    `start` and `end` are inclusive 'YYYY-MM-DD' dates. With a checkpoint only
+    lines appended since its last save are read; call checkpoint.save() once
+    the records have been handled.
+    """
+    for path in checkin_log_files(log_path, start, end, include_archives):
+        offset = first = checkpoint.start_offset(path) if checkpoint else 0
+        for _, line_end, line in iter_lines(path, offset):
+            offset = line_end
+            record = parse_line(line)
+            if record is None:
+                continue
+            timestamp = record.get('timestamp', '')
+            if start and timestamp and timestamp[:10] < start:
+                continue
+            if end and timestamp and timestamp[:10] > end:
+                continue
+            yield record
+        count('checkin_log_bytes', offset - first)
+        if checkpoint:
+            checkpoint.advance(path, offset)
+
+
+def iter_user_ids(log_path, start=None, end=None, checkpoint=None, include_archives=True):
+    """Stream each valid Purdue ID once, in order of first appearance."""
+    seen = set()
+    for record in iter_checkins(log_path, start, end, checkpoint, include_archives):
+        user_id = record['purdueId']
+        if user_id not in seen and is_valid_user_id(user_id):
+            seen.add(user_id)
+            yield user_id
+
+
+def add_log_source_arguments(parser):
+    """Add the check-in log selection options shared by the note scripts."""
+    parser.add_argument('--since', help='Only users checked in on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Only users checked in on or before this date (YYYY-MM-DD)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only read check-in log lines appended since the last incremental run')
@@ -1,80 +1,133 @@
+import argparse
+import os
 import re
 import sys
-from datetime import datetime
+from checkin_logs import iter_checkins
+from purdue_ids import normalize_id, normalize_ids
+from run_metrics import add_metrics_arguments, count, finish_metrics, start_metrics, timed_iter, timer
+
+TIMESTAMP_RE = re.compile(r'\[([\d-]+ [\d:]+)\]')
+PURDUE_ID_RE = re.compile(r'Purdue ID: (\d+)')
+USER_ID_RE = re.compile(r'user: (\d+)')
+
+# Byte-level patterns for the streaming scan. One regex runs over large
+# chunks of the file so lines that mention no user cost no Python work.
+CHUNK_SIZE = 8 * 1024 * 1024
+PURDUE_ID_MARKER = b'Purdue ID: '
+ID_BYTES_RE = re.compile(rb'(Purdue ID|user): (\d+)')
+PURDUE_ID_BYTES_RE = re.compile(rb'Purdue ID: (\d+)')
+TIMESTAMP_BYTES_RE = re.compile(rb'\[([\d-]+ [\d:]+)\]')
 
 def extract_id_from_debug(line):
-    # Extract timestamp if present
-    timestamp_match = re.search(r'\[([\d-]+ [\d:]+)\]', line)
+    # Look for Purdue ID in API call lines, then user ID in log entries
+    match = PURDUE_ID_RE.search(line) or USER_ID_RE.search(line)
+    if not match:
+        return None, None, None
+    timestamp_match = TIMESTAMP_RE.search(line)
     timestamp = timestamp_match.group(1) if timestamp_match else None
+    return match.group(1), timestamp, line.strip()
+
+def iter_chunks(path):
+    """Read a file in large chunks that always end on a line boundary."""
+    with open(path, 'rb') as f:
+        remainder = b''
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                if remainder:
+                    yield remainder + b'\n'
+                return
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = data
+                continue
+            remainder = data[cut:]
+            yield data[:cut]
+
+def scan_debug_log(debug_log_path):
+    """Yield (raw_id, line_bytes) for every debug log line naming a user.
+
+    Like extract_id_from_debug, a "Purdue ID:" match wins over a "user:"
+    match on the same line and only one ID is taken per line.
+    """
+    for chunk in iter_chunks(debug_log_path):
+        last_line_start = -1
+        for match in ID_BYTES_RE.finditer(chunk):
+            line_start = chunk.rfind(b'\n', 0, match.start()) + 1
+            if line_start == last_line_start:
+                continue
+            last_line_start = line_start
+            line_end = chunk.find(b'\n', match.end())
+            line = chunk[line_start:line_end]
+            raw_id = match.group(2)
+            if match.group(1) == b'user' and PURDUE_ID_MARKER in line:
+                purdue_match = PURDUE_ID_BYTES_RE.search(line)
+                if purdue_match:
+                    raw_id = purdue_match.group(1)
+            yield raw_id.decode('ascii'), line
 
-    # Look for Purdue ID in API call lines
-    api_match = re.search(r'Purdue ID: (\d+)', line)
-    if api_match:
-        return api_match.group(1), timestamp, line.strip()
-    # Look for user ID in log entries
-    log_match = re.search(r'user: (\d+)', line)
-    if log_match:
-        return log_match.group(1), timestamp, line.strip()
-    return None, None, None
+def load_checkin_ids(checkin_log_path):
+    """Normalized IDs of everyone in the check-in log and its monthly archives."""
+    raw_ids = {record['purdueId'] for record in iter_checkins(checkin_log_path)}
+    return set(map(str, normalize_ids(list(raw_ids)))) - {''}
 
-def normalize_id(id_str):
-    # Remove any non-digit characters
-    id_str = ''.join(c for c in id_str if c.isdigit())
-    
-    # Valid IDs should be 8-10 digits after removing leading zeros
-    id_str = id_str.lstrip('0')
-    if len(id_str) < 8 or len(id_str) > 10:
-        return None
-        
-    # Remove trailing zeros and common suffixes (01, 02 etc)
-    id_str = re.sub(r'(0+|0[12])$', '', id_str)
+def report_missing_ids(debug_log_path, checkin_ids, out=sys.stdout):
+    """Stream IDs seen in the debug log but absent from the check-in log.
 
-    # Ensure remaining ID is still valid length
-    if len(id_str) < 8:
-        return None
-    
-    return id_str
+    Each missing ID is reported once, at its first appearance in the debug
+    log, so only the set of IDs seen is held in memory. Returns
+    (unique debug IDs, missing IDs).
+    """
+    seen = set()
+    normalized_cache = {}
+    missing = 0
+    for raw_id, line in timed_iter('debug_log_scan', scan_debug_log(debug_log_path)):
+        normalized = normalized_cache.get(raw_id)
+        if normalized is None:
+            normalized = normalize_id(raw_id) or ''
+            normalized_cache[raw_id] = normalized
+        if not normalized or normalized in seen:
+            continue
+        seen.add(normalized)
+        if normalized in checkin_ids:
+            continue
+        missing += 1
+        timestamp_match = TIMESTAMP_BYTES_RE.search(line)
+        timestamp = timestamp_match.group(1).decode('ascii') if timestamp_match else None
+        with timer('output_write'):
+            out.write(f"\nMissing ID: {normalized}\n")
+            out.write(f"Timestamp: {timestamp}\n")
+            out.write(f"Log entry: {line.decode('utf-8', errors='replace').strip()}\n")
+    return len(seen), missing
 
 def main():
-    debug_ids = {}  # Changed to dict to store timestamp and line info
-    checkin_ids = set()
-    
-    # Process debug log
-    with open('logs/debug.log', 'r') as f:
-        for line in f:
-            id_str, timestamp, log_line = extract_id_from_debug(line)
-            if id_str:
-                normalized = normalize_id(id_str)
-                if normalized:
-                    if normalized not in debug_ids:
-                        debug_ids[normalized] = (timestamp, log_line)
-    
-    # Process checkin log
-    with open('logs/checkin_log.csv', 'r') as f:
-        for line in f:
-            # Extract ID (first part of each line before the timestamp)
-            id_str = line.split('2025-')[0].strip()
-            if id_str:
-                normalized = normalize_id(id_str)
-                if normalized:
-                    checkin_ids.add(normalized)
-    
-    # Find IDs in debug log but not in checkin log
-    missing_ids = set(debug_ids.keys()) - checkin_ids
-    
-    # Generate report
-    if missing_ids:
-        print(f"\nFound {len(missing_ids)} IDs in debug.log that are missing from checkin_log.csv:")
-        for id_str in sorted(missing_ids):
-            timestamp, log_line = debug_ids[id_str]
-            print(f"\nMissing ID: {id_str}")
-            print(f"Timestamp: {timestamp}")
-            print(f"Log entry: {log_line}")
+    parser = argparse.ArgumentParser(description='Find users in the debug log who are missing from the check-in log')
+    parser.add_argument('--debug-log', default='logs/debug.log', help='Debug log to scan')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are read too')
+    add_metrics_arguments(parser, progress=False)
+    args = parser.parse_args()
+    metrics = start_metrics(args, 'compare_logs')
+
+    # Process checkin log and archives
+    with timer('checkin_log_load'):
+        checkin_ids = load_checkin_ids(args.checkin_log)
+
+    # Stream the debug log, reporting missing IDs as they are found
+    print(f"\nIDs in {args.debug_log} that are missing from {args.checkin_log} and its archives:")
+    debug_total, missing = report_missing_ids(args.debug_log, checkin_ids)
+    count('debug_log_bytes', os.path.getsize(args.debug_log))
+    count('missing_ids', missing)
+
+    if missing:
+        print(f"\nFound {missing} IDs in debug.log that are missing from the check-in log")
     else:
-        print("\nNo missing IDs found - all IDs in debug.log are present in checkin_log.csv")
-    
-    print(f"\nTotal unique IDs in debug.log: {len(debug_ids.keys())}")
-    print(f"Total unique IDs in checkin_log.csv: {len(checkin_ids)}")
+        print("\nNo missing IDs found - all IDs in debug.log are present in the check-in log")
+
+    print(f"\nTotal unique IDs in debug.log: {debug_total}")
+    print(f"Total unique IDs in check-in log: {len(checkin_ids)}")
+    finish_metrics(metrics)
 
 if __name__ == "__main__":
     main()
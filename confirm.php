@@ -37,6 +37,8 @@ if (!isset($_SESSION['purdueid'])) {
 
 // ===== Configuration Loading =====
 $config = include('config.php');
+require_once __DIR__ . '/log_writer.php';
+require_once __DIR__ . '/visit_index.php';
 
 if (!isset($config['ALMA_API_KEY'])) {
     die('API key not set in config.php.');
@@ -45,7 +47,7 @@ if (!isset($config['ALMA_API_KEY'])) {
 $purdueId = $_SESSION['purdueid'];
 
 /**
- * Writes debug messages to a log file
+ * Queues a debug message; lines are written in batches under a lock
  * @param string $message The message to log
  * @param string $level The log level (INFO, ERROR, etc.)
  */
@@ -55,7 +57,7 @@ function debugLog($message, $level = 'INFO') {
     $logFile = dirname(__FILE__) . '/' . $config['LOG_PATHS']['DEBUG'];
     $timestamp = date('Y-m-d H:i:s');
     $logMessage = "[$timestamp] [$level] $message\n";
-    file_put_contents($logFile, $logMessage, FILE_APPEND);
+    BufferedLog::add($logFile, $logMessage, $level === 'ERROR');
 }
 
 /**
@@ -234,66 +236,26 @@ function pushUserNoteAndCheckAgreement($purdueId_input, $config) {
     $checkInLogFile = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
     
     $logVisit = function($agreementStatus) use ($purdueId_official, $checkInLogFile, $fullName, $userGroup, $department, $classification, $campusCode, $userStatus) {
-        $visitCount = 0;
-        $lastVisitTimestamp = 0;
-        $foundInMain = false;
-
-        // 1. Scan the main log file (logs/checkin_log.json)
-        if (is_readable($checkInLogFile) && ($handle = fopen($checkInLogFile, "r"))) {
-            while (($line = fgets($handle)) !== false) {
-                if (strpos($line, '"purdueId":"'.$purdueId_official.'"') !== false) {
-                    $data = json_decode(trim($line), true);
-                    if ($data) {
-                        $foundInMain = true;
-                        $visitCount = max($visitCount, intval($data['visitCount'] ?? 0));
-                        if (isset($data['timestamp'])) {
-                            $currentTs = strtotime($data['timestamp']);
-                            if ($currentTs > $lastVisitTimestamp) $lastVisitTimestamp = $currentTs;
-                        }
-                    }
-                }
+        // Look the user up in the visit index, holding its write lock until
+        // the check-in is appended so concurrent kiosks cannot interleave
+        $visitIndex = openVisitIndex($checkInLogFile);
+        if ($visitIndex !== null) {
+            try {
+                beginVisitIndexWrite($visitIndex);
+                [$visitCount, $lastVisitTimestamp] = lookupVisitInIndex($visitIndex, $checkInLogFile, $purdueId_official);
+            } catch (PDOException $e) {
+                debugLog('Visit index lookup failed, scanning logs instead: ' . $e->getMessage(), 'ERROR');
+                rollBackVisitIndexWrite($visitIndex);
+                $visitIndex = null;
             }
-            fclose($handle);
         }
-
-        // 2. If not found in the main log, check the archives in reverse chronological order
-        if (!$foundInMain) {
-            $logDir = dirname($checkInLogFile);
-            $archiveDir = $logDir . '/archives';
-            if (is_dir($archiveDir)) {
-                $archiveFiles = glob($archiveDir . '/checkin_*.json');
-                if ($archiveFiles) {
-                    // Sort files in reverse chronological order
-                    rsort($archiveFiles);
-                    foreach ($archiveFiles as $archiveFile) {
-                        if (is_readable($archiveFile) && ($handle = fopen($archiveFile, "r"))) {
-                            $foundInArchive = false;
-                            while (($line = fgets($handle)) !== false) {
-                                if (strpos($line, '"purdueId":"'.$purdueId_official.'"') !== false) {
-                                    $data = json_decode(trim($line), true);
-                                    if ($data) {
-                                        $foundInArchive = true;
-                                        $visitCount = max($visitCount, intval($data['visitCount'] ?? 0));
-                                        if (isset($data['timestamp'])) {
-                                            $currentTs = strtotime($data['timestamp']);
-                                            if ($currentTs > $lastVisitTimestamp) $lastVisitTimestamp = $currentTs;
-                                        }
-                                    }
-                                }
-                            }
-                            fclose($handle);
-                            // Stop scanning older months if we found entries in the most recent archived month
-                            if ($foundInArchive) {
-                                break;
-                            }
-                        }
-                    }
-                }
-            }
+        if ($visitIndex === null) {
+            [$visitCount, $lastVisitTimestamp] = scanVisitHistory($checkInLogFile, $purdueId_official);
         }
 
         if ($lastVisitTimestamp > 0 && (time() - $lastVisitTimestamp < 30)) {
             debugLog("Skipping duplicate check-in for user: $purdueId_official");
+            if ($visitIndex !== null) rollBackVisitIndexWrite($visitIndex);
             return false;
         }
         $visitCount++;
@@ -305,7 +267,19 @@ function pushUserNoteAndCheckAgreement($purdueId_input, $config) {
             'campusCode' => $campusCode, 'userStatus' => $userStatus,
             'visitCount' => $visitCount, 'agreementStatus' => $agreementStatus
         ];
-        file_put_contents($checkInLogFile, json_encode($logData) . "\n", FILE_APPEND);
+        $written = appendToLog($checkInLogFile, json_encode($logData) . "\n");
+        if ($visitIndex !== null) {
+            try {
+                if ($written) {
+                    recordAppendedVisit($visitIndex, $checkInLogFile, $purdueId_official, $visitCount, $logData['timestamp']);
+                }
+                commitVisitIndexWrite($visitIndex);
+            } catch (PDOException $e) {
+                // The next lookup catches up from the log, so the index self-heals
+                debugLog('Failed to update visit index: ' . $e->getMessage(), 'ERROR');
+                rollBackVisitIndexWrite($visitIndex);
+            }
+        }
         debugLog("Logged JSON check-in: " . json_encode($logData));
         return true;
     };
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from checkin_logs import checkin_log_files, iter_lines
+
+# Same day/month keys as DateTime::format in summary_cache.php
+TIMESTAMP_DAY = re.compile(r'^(\d{4}-\d{2})-(\d{2})')
+
+
+def summary_dir(checkin_log):
+    """Snapshots live in logs/summaries next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', 'summaries')
+
+
+def summary_path(log_file, directory):
+    name = os.path.basename(log_file)
+    if name.endswith('.json'):
+        name = name[:-len('.json')]
+    return os.path.join(directory, f'{name}.summary.json')
+
+
+def empty_summary(stat):
+    return {'inode': stat.st_ino, 'size': 0, 'mtime': 0, 'offset': 0, 'months': {}}
+
+
+def summarize_lines(log_file, summary, is_main_log, current_month):
+    """Fold complete lines past summary['offset'] into the summary, as summarizeLogLines does."""
+    for _, end, raw in iter_lines(log_file, summary['offset']):
+        summary['offset'] = end
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line.startswith('{'):
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(data, dict) or data.get('purdueId') is None:
+            continue
+        match = TIMESTAMP_DAY.match(str(data.get('timestamp', '')))
+        if not match:
+            continue
+        month, date = match.group(1), match.group(0)
+        group = str(data.get('userGroup') if data.get('userGroup') is not None else 'N/A')
+        dept = str(data['department']) if data.get('department') else 'N/A'
+
+        m = summary['months'].setdefault(month, {'groups': {}, 'departments': {}, 'days': {}})
+        m['groups'][group] = m['groups'].get(group, 0) + 1
+        m['departments'][dept] = m['departments'].get(dept, 0) + 1
+        day = m['days'].setdefault(date, {'total': 0, 'groups': {}})
+        day['total'] += 1
+        day['groups'][group] = day['groups'].get(group, 0) + 1
+        if is_main_log or month == current_month:
+            visitors = m.get('visitors') or {}  # PHP writes an empty set as []
+            visitors[str(data['purdueId'])] = 1
+            m['visitors'] = visitors
+
+
+def load_summary(log_file, directory, is_main_log, current_month=None):
+    """Return one log file's summary, rebuilding or extending its snapshot if stale.
+
+    Archives are summarized again when their inode, size or mtime changes.
+    The main log's snapshot is extended from its saved offset while the
+    inode is the same and the file has not shrunk.
+    """
+    current_month = current_month or time.strftime('%Y-%m')
+    stat = os.stat(log_file)
+    path = summary_path(log_file, directory)
+    try:
+        with open(path, 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        summary = None
+    valid = isinstance(summary, dict) and summary.get('inode') == stat.st_ino
+    if is_main_log:
+        if not valid or stat.st_size < summary.get('offset', 0):
+            summary = empty_summary(stat)
+        if stat.st_size == summary['offset']:
+            return summary
+    else:
+        if valid and summary.get('size') == stat.st_size and summary.get('mtime') == int(stat.st_mtime):
+            return summary
+        summary = empty_summary(stat)
+
+    summarize_lines(log_file, summary, is_main_log, current_month)
+    summary['size'] = stat.st_size
+    summary['mtime'] = int(stat.st_mtime)
+    os.makedirs(directory, 0o775, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, separators=(',', ':'))
+    os.chmod(tmp_path, 0o666)
+    os.replace(tmp_path, path)
+    return summary
+
+
+def load_summaries(checkin_log, current_month=None):
+    """Summaries of every monthly archive and the main log, refreshed as needed."""
+    directory = summary_dir(checkin_log)
+    return [load_summary(path, directory, path == checkin_log, current_month)
+            for path in checkin_log_files(checkin_log)]
+
+
+def merge_monthly(summaries, field):
+    """{month: {name: count}} for 'groups' or 'departments', newest month first."""
+    report = {}
+    for summary in summaries:
+        for month, m in summary['months'].items():
+            counts = report.setdefault(month, {})
+            for name, count in m.get(field, {}).items():
+                counts[name] = counts.get(name, 0) + count
+    return dict(sorted(report.items(), reverse=True))
+
+
+def merge_daily(summaries, month):
+    daily = {}
+    for summary in summaries:
+        for date, day in summary['months'].get(month, {}).get('days', {}).items():
+            merged = daily.setdefault(date, {'total': 0, 'groups': {}})
+            merged['total'] += day['total']
+            for group, count in day['groups'].items():
+                merged['groups'][group] = merged['groups'].get(group, 0) + count
+    return dict(sorted(daily.items()))
+
+
+def unique_visitors(summaries, month):
+    visitors = set()
+    for summary in summaries:
+        visitors.update(summary['months'].get(month, {}).get('visitors') or ())
+    return len(visitors)
+
+
+def dashboard_data(summaries, today=None):
+    """The figures admin.php shows on load: reports, this month's calendar and quick stats."""
+    today = today or time.strftime('%Y-%m-%d')
+    month = today[:7]
+    usage = merge_monthly(summaries, 'groups')
+    departments = merge_monthly(summaries, 'departments')
+    daily = merge_daily(summaries, month)
+    month_departments = departments.get(month, {})
+    top_department = max(month_departments.items(), key=lambda item: item[1]) if month_departments else ('—', 0)
+    return {
+        'usage': usage,
+        'departments': departments,
+        'daily': daily,
+        'stats': {
+            'month_checkins': sum(usage.get(month, {}).values()),
+            'today_checkins': daily.get(today, {}).get('total', 0),
+            'unique_visitors': unique_visitors(summaries, month),
+            'top_department': {'name': top_department[0], 'count': top_department[1]},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or refresh the dashboard summary snapshots')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are summarized too')
+    parser.add_argument('--stats', action='store_true', help='Print the dashboard quick stats as JSON')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    summaries = load_summaries(args.checkin_log)
+    elapsed = time.perf_counter() - started
+    if args.stats:
+        print(json.dumps(dashboard_data(summaries)['stats'], indent=2))
+        return
+    months = sum(len(summary['months']) for summary in summaries)
+    print(f"Summaries for {len(summaries)} log file(s), {months} month(s) in {summary_dir(args.checkin_log)} "
+          f"({elapsed:.3f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 // ===== Session Management =====
 // Load configuration
 $config = include('config.php');
+require_once __DIR__ . '/log_writer.php';
 
 // Configure session parameters
 if (!empty($config['SESSION_CONFIG']['SAVE_PATH'])) {
@@ -162,7 +163,7 @@ class Logger {
         $logMessage = "[$date] [$type] $message" . PHP_EOL;
         
         if ($this->initialized) {
-            if (@error_log($logMessage, 3, $this->logPath)) {
+            if (appendToLog($this->logPath, $logMessage)) {
                 return true;
             }
         }
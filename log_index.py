@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import argparse
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from checkin_logs import archive_month, checkin_log_files, iter_lines
+
+# Same layout as log_query.php: a padded JSON header, then fixed-width
+# "YYYY-MM-DD HH:MM:SS <offset>\n" records sorted newest first.
+HEADER_BYTES = 64
+RECORD_BYTES = 32
+NO_TIMESTAMP = '0000-00-00 00:00:00'
+TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+SEARCH_FIELDS = ('purdueId', 'fullName', 'department')
+PLAIN_SEARCH = re.compile(r'^[a-z0-9 ]+$')
+
+
+def index_dir(checkin_log):
+    """Indexes live in logs/indexes next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', 'indexes')
+
+
+def index_path(log_file, directory):
+    name = os.path.basename(log_file)
+    if name.endswith('.json'):
+        name = name[:-len('.json')]
+    return os.path.join(directory, f'{name}.idx')
+
+
+def file_key(log_file, checkin_log):
+    """'main' for the main log, 'YYYY_MM' for an archive, as in entry ids."""
+    return 'main' if log_file == checkin_log else archive_month(log_file).replace('-', '_')
+
+
+def parse_entry(raw):
+    """The check-in if the line is one parseLogLine accepts, else None."""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get('purdueId') is None:
+        return None
+    return data
+
+
+def build_index(log_file, path):
+    """Write the sorted offset index of one log file; returns its record count."""
+    stat = os.stat(log_file)
+    records = []
+    for offset, _, raw in iter_lines(log_file):
+        data = parse_entry(raw)
+        if data is not None:
+            match = TIMESTAMP.match(str(data.get('timestamp', '')))
+            records.append(f"{match.group(0) if match else NO_TIMESTAMP} {offset:011d}\n")
+    records.sort(reverse=True)
+    header = json.dumps({'inode': stat.st_ino, 'size': stat.st_size, 'count': len(records)}, separators=(',', ':'))
+    os.makedirs(os.path.dirname(path), 0o775, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(header.ljust(HEADER_BYTES - 1) + '\n')
+        f.writelines(records)
+    os.chmod(tmp_path, 0o666)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def index_is_fresh(log_file, path):
+    try:
+        with open(path, 'r') as f:
+            header = json.loads(f.read(HEADER_BYTES))
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(log_file)
+    return header.get('inode') == stat.st_ino and header.get('size') == stat.st_size
+
+
+class LogIndex:
+    """Read access to one file's index by record position."""
+
+    def __init__(self, log_file, key, path):
+        self.log_file = log_file
+        self.key = key
+        self.f = open(path, 'rb')
+        self.count = json.loads(self.f.read(HEADER_BYTES))['count']
+
+    def record(self, position):
+        """(timestamp, file key, offset) of the record at `position`."""
+        self.f.seek(HEADER_BYTES + position * RECORD_BYTES)
+        raw = self.f.read(RECORD_BYTES)
+        return raw[:19].decode(), self.key, int(raw[20:31])
+
+    def first_below(self, bound):
+        """First position whose record sorts after (is older than) `bound`."""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.record(mid) < bound:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def close(self):
+        self.f.close()
+
+
+def open_indexes(checkin_log, start=None, end=None):
+    """Open the index of every log file in the date range, rebuilding stale ones."""
+    directory = index_dir(checkin_log)
+    indexes = []
+    for log_file in checkin_log_files(checkin_log, start, end):
+        path = index_path(log_file, directory)
+        if not index_is_fresh(log_file, path):
+            build_index(log_file, path)
+        indexes.append(LogIndex(log_file, file_key(log_file, checkin_log), path))
+    return indexes
+
+
+def decode_cursor(cursor):
+    timestamp, key, offset = cursor.split('|')
+    return timestamp, key, int(offset)
+
+
+class Newest:
+    """Heap wrapper that pops the newest record key first."""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+def query(checkin_log, search='', start=None, end=None, cursor=None, limit=50):
+    """One page of entries newest first, as queryLogEntries in log_query.php returns it."""
+    search = search.strip().lower()
+    # Plain words appear verbatim in the raw JSON, so most lines skip parsing
+    prefilter = search.encode() if PLAIN_SEARCH.match(search) else None
+    cursor = decode_cursor(cursor) if cursor else None
+    indexes = open_indexes(checkin_log, start, end)
+    heap = []
+    total = 0
+    for number, index in enumerate(indexes):
+        first = index.first_below((f"{end} 23:59:59", index.key, sys.maxsize)) if end else 0
+        last = index.first_below((f"{start} 00:00:00", index.key, -1)) if start else index.count
+        total += max(0, last - first)
+        if cursor is not None:
+            first = max(first, index.first_below(cursor))
+        if first < last:
+            record = index.record(first)
+            # heapq is a min-heap; negate the order by wrapping the key
+            heapq.heappush(heap, (Newest(record), number, first, last))
+
+    entries = []
+    last_key = None
+    log_files = {}
+    while heap and len(entries) < limit:
+        wrapped, number, position, last = heapq.heappop(heap)
+        timestamp, key, offset = wrapped.key
+        index = indexes[number]
+        if key not in log_files:
+            log_files[key] = open(index.log_file, 'rb')
+        log_files[key].seek(offset)
+        raw = log_files[key].readline()
+        if prefilter and prefilter not in raw.lower():
+            data = None
+        else:
+            data = parse_entry(raw)
+        if data is not None and (not search or any(search in str(data.get(field, '')).lower() for field in SEARCH_FIELDS)):
+            data['id'] = f"{key}:{offset}"
+            entries.append(data)
+            last_key = wrapped.key
+        if position + 1 < last:
+            heapq.heappush(heap, (Newest(index.record(position + 1)), number, position + 1, last))
+
+    for f in log_files.values():
+        f.close()
+    for index in indexes:
+        index.close()
+    next_cursor = '|'.join(map(str, last_key)) if heap and last_key else None
+    return {'entries': entries, 'next_cursor': next_cursor, 'total': None if search else total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the sorted offset indexes used by the admin log viewer')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are indexed too')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('build', help='Build or refresh the index of every log file (default)')
+    query_parser = subparsers.add_parser('query', help='Print one page of entries as JSON')
+    query_parser.add_argument('--search', default='', help='Purdue ID, name or department substring')
+    query_parser.add_argument('--from', dest='start', help='Earliest date (YYYY-MM-DD)')
+    query_parser.add_argument('--to', dest='end', help='Latest date (YYYY-MM-DD)')
+    query_parser.add_argument('--cursor', help='next_cursor of the previous page')
+    query_parser.add_argument('--limit', type=int, default=50, help='Entries per page')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if args.command == 'query':
+        print(json.dumps(query(args.checkin_log, args.search, args.start, args.end, args.cursor, args.limit), indent=2))
+        return
+    directory = index_dir(args.checkin_log)
+    built = 0
+    files = checkin_log_files(args.checkin_log)
+    for log_file in files:
+        path = index_path(log_file, directory)
+        if not index_is_fresh(log_file, path):
+            build_index(log_file, path)
+            built += 1
+    print(f"Indexed {len(files)} log file(s), {built} rebuilt, in {directory} ({time.perf_counter() - started:.3f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+<?php
+/**
+ * Server-side search and cursor pagination over the check-in logs.
+ *
+ * Every log file (the main log and each monthly archive) gets a sorted
+ * offset index in logs/indexes/<name>.idx: a 64-byte JSON header with the
+ * log's inode, size and record count, then one fixed-width record per
+ * check-in, "YYYY-MM-DD HH:MM:SS <byte offset>\n", newest first. Fixed-width
+ * records let a date bound or a cursor be found by binary search, and a
+ * page is read by merging the indexes and seeking to just the lines shown.
+ * An index is rebuilt when its log's inode or size changes; log_index.py
+ * builds the same files from cron.
+ *
+ * Entries are identified as "<file key>:<byte offset>", where the file key
+ * is "main" or the archive's "YYYY_MM". A rotation or edit rewrites the
+ * file, so an id is only trusted if the line it points at still has the
+ * timestamp and Purdue ID it was listed with. Relies on parseLogLine() from
+ * admin.php.
+ */
+
+const LOG_INDEX_HEADER_BYTES = 64;
+const LOG_INDEX_RECORD_BYTES = 32;
+const LOG_QUERY_MAX_LIMIT = 200;
+
+function logIndexPath($logFile, $indexDir) {
+    return $indexDir . '/' . basename($logFile, '.json') . '.idx';
+}
+
+/**
+ * Sort key of a log line's timestamp; unparsable ones sort last.
+ */
+function indexTimestamp($timestamp) {
+    return preg_match('/^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}/', (string)$timestamp, $m) ? $m[0] : '0000-00-00 00:00:00';
+}
+
+function buildLogIndex($logFile, $indexFile, $stat) {
+    $records = [];
+    $handle = fopen($logFile, 'r');
+    if (!$handle) return false;
+    $offset = 0;
+    while (($line = fgets($handle)) !== false) {
+        $data = parseLogLine($line);
+        if ($data !== null) {
+            $records[] = indexTimestamp($data['timestamp']) . ' ' . sprintf('%011d', $offset) . "\n";
+        }
+        $offset += strlen($line);
+    }
+    fclose($handle);
+    rsort($records, SORT_STRING);
+
+    $header = json_encode(['inode' => $stat['ino'], 'size' => $stat['size'], 'count' => count($records)]);
+    $tmpFile = $indexFile . '.' . getmypid() . '.tmp';
+    $data = str_pad($header, LOG_INDEX_HEADER_BYTES - 1) . "\n" . implode('', $records);
+    if (@file_put_contents($tmpFile, $data) === false) return false;
+    @chmod($tmpFile, 0666);
+    if (!@rename($tmpFile, $indexFile)) {
+        @unlink($tmpFile);
+        return false;
+    }
+    return true;
+}
+
+/**
+ * Opens a log file's index, rebuilding it first if the log has changed.
+ * @return array|null ['key', 'log', 'handle', 'count'], or null if unreadable
+ */
+function openLogIndex($logFile, $key, $indexDir) {
+    clearstatcache(true, $logFile);
+    $stat = @stat($logFile);
+    if (!$stat || !is_readable($logFile)) return null;
+    $indexFile = logIndexPath($logFile, $indexDir);
+    for ($attempt = 0; $attempt < 2; $attempt++) {
+        $handle = @fopen($indexFile, 'r');
+        if ($handle) {
+            $header = json_decode(trim(fread($handle, LOG_INDEX_HEADER_BYTES)), true);
+            if (is_array($header) && $header['inode'] === $stat['ino'] && $header['size'] === $stat['size']) {
+                return ['key' => $key, 'log' => $logFile, 'handle' => $handle, 'count' => $header['count']];
+            }
+            fclose($handle);
+        }
+        if ($attempt === 0 && !buildLogIndex($logFile, $indexFile, $stat)) break;
+    }
+    return null;
+}
+
+/**
+ * @return array [timestamp, file key, offset]
+ */
+function readIndexRecord($index, $position) {
+    fseek($index['handle'], LOG_INDEX_HEADER_BYTES + $position * LOG_INDEX_RECORD_BYTES);
+    $record = fread($index['handle'], LOG_INDEX_RECORD_BYTES);
+    return [substr($record, 0, 19), $index['key'], (int)substr($record, 20, 11)];
+}
+
+/**
+ * Orders entries newest first: by timestamp, then file key, then offset.
+ */
+function compareEntryKeys($a, $b) {
+    return [$a[0], $a[1], $a[2]] <=> [$b[0], $b[1], $b[2]];
+}
+
+/**
+ * First position whose record sorts after (is older than) $bound.
+ */
+function firstIndexBelow($index, $bound) {
+    $low = 0;
+    $high = $index['count'];
+    while ($low < $high) {
+        $mid = intdiv($low + $high, 2);
+        if (compareEntryKeys(readIndexRecord($index, $mid), $bound) < 0) {
+            $high = $mid;
+        } else {
+            $low = $mid + 1;
+        }
+    }
+    return $low;
+}
+
+function encodeLogCursor($key) {
+    return $key[0] . '|' . $key[1] . '|' . $key[2];
+}
+
+function decodeLogCursor($cursor) {
+    if (!preg_match('/^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|(main|\d{4}_\d{2})\|(\d+)$/', (string)$cursor, $m)) return null;
+    return [$m[1], $m[2], (int)$m[3]];
+}
+
+/**
+ * The main log and the archives whose month overlaps the date range.
+ * @return array [file key => path]
+ */
+function queryLogFiles($config, $from, $to) {
+    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
+    $files = [];
+    foreach (glob(dirname($checkInLog) . '/archives/checkin_*.json') ?: [] as $archiveFile) {
+        if (!preg_match('/checkin_(\d{4})_(\d{2})\.json$/', $archiveFile, $m)) continue;
+        $month = $m[1] . '-' . $m[2];
+        if ($from !== '' && $month < substr($from, 0, 7)) continue;
+        if ($to !== '' && $month > substr($to, 0, 7)) continue;
+        $files[$m[1] . '_' . $m[2]] = $archiveFile;
+    }
+    $files['main'] = $checkInLog;
+    return $files;
+}
+
+function entryMatchesSearch($entry, $search) {
+    foreach (['purdueId', 'fullName', 'department'] as $field) {
+        if (stripos((string)$entry[$field], $search) !== false) return true;
+    }
+    return false;
+}
+
+/**
+ * One page of check-in entries, newest first.
+ *
+ * $params: 'search' (Purdue ID, name or department), 'from' and 'to'
+ * (inclusive YYYY-MM-DD), 'cursor' (from the previous page) and 'limit'.
+ * 'total' is only counted when there is no search, from the indexes alone.
+ * @return array ['entries' => [...], 'next_cursor' => string|null, 'total' => int|null]
+ */
+function queryLogEntries($config, $params) {
+    $result = ['entries' => [], 'next_cursor' => null, 'total' => null];
+    if (!isset($config['LOG_PATHS']['CHECKIN'])) return $result;
+    $search = trim($params['search'] ?? '');
+    $from = preg_match('/^\d{4}-\d{2}-\d{2}$/', $params['from'] ?? '') ? $params['from'] : '';
+    $to = preg_match('/^\d{4}-\d{2}-\d{2}$/', $params['to'] ?? '') ? $params['to'] : '';
+    $limit = max(1, min(LOG_QUERY_MAX_LIMIT, (int)($params['limit'] ?? 50)));
+    $cursor = decodeLogCursor($params['cursor'] ?? '');
+    // Plain words appear verbatim in the raw JSON, so most lines skip parsing
+    $prefilter = (bool)preg_match('/^[A-Za-z0-9 ]+$/', $search);
+
+    $indexDir = dirname(dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN']) . '/indexes';
+    if (!is_dir($indexDir)) @mkdir($indexDir, 0775, true);
+
+    // Each file contributes the positions [start, end) of its index
+    $heap = new class extends SplHeap {
+        protected function compare($a, $b): int { return compareEntryKeys($a['record'], $b['record']); }
+    };
+    $indexes = [];
+    $total = 0;
+    foreach (queryLogFiles($config, $from, $to) as $key => $logFile) {
+        $index = openLogIndex($logFile, $key, $indexDir);
+        if ($index === null) continue;
+        $indexes[] = $index;
+        $start = $to !== '' ? firstIndexBelow($index, [$to . ' 23:59:59', $key, PHP_INT_MAX]) : 0;
+        $end = $from !== '' ? firstIndexBelow($index, [$from . ' 00:00:00', $key, -1]) : $index['count'];
+        $total += max(0, $end - $start);
+        if ($cursor !== null) $start = max($start, firstIndexBelow($index, $cursor));
+        if ($start < $end) {
+            $heap->insert(['record' => readIndexRecord($index, $start), 'index' => $index, 'position' => $start, 'end' => $end]);
+        }
+    }
+    if ($search === '') $result['total'] = $total;
+
+    $logHandles = [];
+    $lastKey = null;
+    while (!$heap->isEmpty() && count($result['entries']) < $limit) {
+        $head = $heap->extract();
+        [$timestamp, $key, $offset] = $head['record'];
+        if (!isset($logHandles[$key])) $logHandles[$key] = fopen($head['index']['log'], 'r');
+        fseek($logHandles[$key], $offset);
+        $line = (string)fgets($logHandles[$key]);
+        $entry = $prefilter && stripos($line, $search) === false ? null : parseLogLine($line);
+        if ($entry !== null && ($search === '' || entryMatchesSearch($entry, $search))) {
+            $entry['id'] = $key . ':' . $offset;
+            $result['entries'][] = $entry;
+            $lastKey = $head['record'];
+        }
+        if (++$head['position'] < $head['end']) {
+            $head['record'] = readIndexRecord($head['index'], $head['position']);
+            $heap->insert($head);
+        }
+    }
+    if (!$heap->isEmpty() && $lastKey !== null) $result['next_cursor'] = encodeLogCursor($lastKey);
+
+    foreach ($logHandles as $handle) fclose($handle);
+    foreach ($indexes as $index) fclose($index['handle']);
+    return $result;
+}
+
+/**
+ * Reads the entry with the given "<file key>:<offset>" id, or null if there
+ * is none or the line at that offset is no longer the expected check-in.
+ */
+function getLogEntryById($config, $id, $timestamp, $purdueId) {
+    if (!isset($config['LOG_PATHS']['CHECKIN'])) return null;
+    if (!preg_match('/^(main|\d{4}_\d{2}):(\d+)$/', (string)$id, $m)) return null;
+    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
+    $logFile = $m[1] === 'main' ? $checkInLog : dirname($checkInLog) . '/archives/checkin_' . $m[1] . '.json';
+    $handle = @fopen($logFile, 'r');
+    if (!$handle) return null;
+    fseek($handle, (int)$m[2]);
+    $entry = parseLogLine((string)fgets($handle));
+    fclose($handle);
+    if ($entry === null || (string)$entry['timestamp'] !== (string)$timestamp
+        || (string)$entry['purdueId'] !== (string)$purdueId) {
+        return null;
+    }
+    $entry['id'] = $id;
+    return $entry;
+}
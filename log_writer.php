@@ -0,0 +1,135 @@
+<?php
+/**
+ * Locked, batched appends to the check-in and debug logs.
+ *
+ * Every writer takes an exclusive flock() on the log and writes its whole
+ * payload in one go, so lines from concurrent kiosks never interleave and an
+ * append cannot land between another process reading and rewriting the log
+ * (rotation, admin edits). Rewrites go to a temporary file that is renamed
+ * over the log. The Python tools use the same lock through
+ * checkin_logs.locked_log.
+ *
+ * Debug lines are buffered per request and written as one locked append
+ * when the buffer fills, when an ERROR is logged, and at shutdown.
+ */
+
+const DEBUG_LOG_FLUSH_LINES = 50;
+
+/**
+ * Opens a log and takes its exclusive lock.
+ *
+ * Rotation and edits replace a log by renaming a new file over it while
+ * holding the lock, so a writer that was waiting on the old file reopens
+ * the path once it gets the lock.
+ * @return resource|false Locked handle, or false on failure
+ */
+function openLockedLog($file, $mode) {
+    for ($attempt = 0; $attempt < 10; $attempt++) {
+        $handle = @fopen($file, $mode);
+        if (!$handle) return false;
+        if (!flock($handle, LOCK_EX)) {
+            fclose($handle);
+            return false;
+        }
+        clearstatcache(true, $file);
+        if (fstat($handle)['ino'] === @fileinode($file)) {
+            return $handle;
+        }
+        flock($handle, LOCK_UN);
+        fclose($handle);
+    }
+    return false;
+}
+
+/**
+ * Appends data to a log file under an exclusive advisory lock.
+ * @param string $file Log file path
+ * @param string $data One or more complete lines
+ * @return bool True if every byte was written
+ */
+function appendToLog($file, $data) {
+    $handle = openLockedLog($file, 'a');
+    if (!$handle) return false;
+    $written = 0;
+    $length = strlen($data);
+    while ($written < $length) {
+        $bytes = fwrite($handle, substr($data, $written));
+        if ($bytes === false || $bytes === 0) break;
+        $written += $bytes;
+    }
+    fflush($handle);
+    flock($handle, LOCK_UN);
+    fclose($handle);
+    return $written === strlen($data);
+}
+
+/**
+ * Rewrites a log's lines under its lock, replacing it crash-safely.
+ *
+ * $transform receives the current lines (with newlines) and returns the
+ * lines to keep, or null to leave the file untouched. The result is written
+ * to a temporary file and renamed over the log while the lock is held.
+ * @return bool|null True if rewritten, null if unchanged, false on failure
+ */
+function rewriteLog($file, callable $transform) {
+    $handle = openLockedLog($file, 'r');
+    if (!$handle) return false;
+    $lines = [];
+    while (($line = fgets($handle)) !== false) {
+        $lines[] = $line;
+    }
+    $newLines = $transform($lines);
+    $result = null;
+    if ($newLines !== null) {
+        $tmpFile = $file . '.tmp';
+        $result = file_put_contents($tmpFile, implode('', $newLines)) !== false && rename($tmpFile, $file);
+        if ($result) {
+            @chmod($file, 0666);
+        } else {
+            @unlink($tmpFile);
+        }
+    }
+    flock($handle, LOCK_UN);
+    fclose($handle);
+    return $result;
+}
+
+/**
+ * Per-request buffer of debug log lines, flushed as a single locked append.
+ */
+class BufferedLog {
+    private static $buffers = [];
+    private static $shutdownRegistered = false;
+
+    /**
+     * Queues a line for the given log file.
+     * @param bool $flushNow Write the buffer immediately (e.g. for errors)
+     */
+    public static function add($file, $line, $flushNow = false) {
+        if (!self::$shutdownRegistered) {
+            register_shutdown_function([self::class, 'flushAll']);
+            self::$shutdownRegistered = true;
+        }
+        self::$buffers[$file][] = $line;
+        if ($flushNow || count(self::$buffers[$file]) >= DEBUG_LOG_FLUSH_LINES) {
+            self::flush($file);
+        }
+    }
+
+    public static function flush($file) {
+        if (empty(self::$buffers[$file])) return true;
+        $data = implode('', self::$buffers[$file]);
+        self::$buffers[$file] = [];
+        if (!appendToLog($file, $data)) {
+            error_log("Equipment Agreement: could not write to $file");
+            return false;
+        }
+        return true;
+    }
+
+    public static function flushAll() {
+        foreach (array_keys(self::$buffers) as $file) {
+            self::flush($file);
+        }
+    }
+}
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""One entry point for the maintenance scripts, for cron and by hand.
+
+Each subcommand runs the main() of the script of the same job, with the
+rest of the command line as that script's own options. Only the chosen
+script is imported, so `maint.py rotate` never loads requests and
+`maint.py fix` never loads numpy or pytz.
+
+    python3 maint.py fix --workers 4
+    python3 maint.py recover logs/debug.log recovered.csv --start 2026-01-01
+    python3 maint.py fix --help
+"""
+import argparse
+import importlib
+import os
+import sys
+
+# Subcommand -> (module, help)
+COMMANDS = {
+    'fix': ('fix_agreements', 'Add missing agreement notes in Alma'),
+    'validate': ('validate_note_segments', 'Validate and fix agreement note segments in Alma'),
+    'reconcile': ('reconcile_agreements', 'Add missing notes and fix their segments in one pass'),
+    'recover': ('recovery_script', 'Recover check-ins from the debug log'),
+    'compare': ('compare_logs', 'Find debug-log users missing from the check-in log'),
+    'check-logs': ('validate_logs', 'Flag torn, duplicate or out-of-sequence log records'),
+    'recount': ('recount_visits', 'Recount every visitCount in the check-in history'),
+    'rotate': ('rotate_checkin_log', 'Move past months of check-ins into monthly archives'),
+    'visit-index': ('visit_index', 'Rebuild the per-user visit index used by confirm.php'),
+    'log-index': ('log_index', 'Build the offset indexes used by the admin log viewer'),
+    'summary': ('dashboard_summary', 'Build or refresh the dashboard summary snapshots'),
+    'shards': ('shard_runner', 'Run a note script as shards, or merge shard results'),
+}
+
+
+def run_command(command, args):
+    """Import the subcommand's script and run its main() with `args` as its command line."""
+    module_name = COMMANDS[command][0]
+    module = importlib.import_module(module_name)
+    sys.argv = [f'{os.path.basename(sys.argv[0])} {command}', *args]
+    module.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a maintenance job',
+        epilog='Commands:\n' + '\n'.join(f'  {name:<12} {help}' for name, (_, help) in COMMANDS.items())
+               + '\n\nRun "%(prog)s COMMAND --help" for the options of a command.',
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS, metavar='COMMAND')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    run_command(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()
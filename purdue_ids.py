@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+from collections import namedtuple
+
+# numpy and the powers of ten, set by load_numpy() on first use
+np = None
+POWERS_OF_TEN = None
+
+MIN_LENGTH = 8
+MAX_LENGTH = 10
+BATCH_SIZE = 1 << 18
+ZERO = ord('0')
+# Longest all-digit ID parsed as an int64; longer ones are never valid
+MAX_PARSED_DIGITS = 18
+# Below this many IDs normalize_ids stays in Python; importing numpy costs
+# about 100 ms, more than the array path saves on a smaller batch
+NUMPY_MIN_IDS = 100000
+
+Reconciliation = namedtuple('Reconciliation', ['only_left', 'only_right', 'common', 'clusters',
+                                               'invalid_left', 'invalid_right'])
+
+
+def load_numpy():
+    """Import numpy on first use; returns it, or None if it is not installed."""
+    global np, POWERS_OF_TEN
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        POWERS_OF_TEN = 10 ** numpy.arange(MAX_PARSED_DIGITS + 1, dtype=numpy.int64)
+        np = numpy
+    return np
+
+
+def normalize_id(id_str):
+    """Canonical form of a Purdue ID, or None if it is not one.
+
+    Non-digits and leading zeros are dropped, leaving 8-10 digits. Then
+    either every trailing zero or a trailing "01"/"02" suffix is removed,
+    and at least 8 digits must remain.
+    """
+    # Remove any non-digit characters
+    if not (id_str.isascii() and id_str.isdigit()):
+        id_str = ''.join(c for c in id_str if c.isdigit())
+
+    # Valid IDs should be 8-10 digits after removing leading zeros
+    id_str = id_str.lstrip('0')
+    if len(id_str) < MIN_LENGTH or len(id_str) > MAX_LENGTH:
+        return None
+
+    # Remove trailing zeros and common suffixes (01, 02 etc)
+    if id_str.endswith('0'):
+        id_str = id_str.rstrip('0')
+    elif id_str.endswith(('01', '02')):
+        id_str = id_str[:-2]
+
+    # Ensure remaining ID is still valid length
+    if len(id_str) < MIN_LENGTH:
+        return None
+
+    return id_str
+
+
+def _normalize_batch(ids, extras):
+    """normalize_id over a 1-D str array as int64 codes, 0 for invalid IDs.
+
+    A normalized ID never starts with a zero, so the integer round-trips
+    to the same string and sorts and compares far faster. IDs made only of
+    ASCII digits are parsed as integers and normalized arithmetically:
+    leading zeros vanish in the parse, the digit count comes from powers
+    of ten, and suffixes are dropped by integer division. Other IDs go
+    through normalize_id; a result that keeps non-ASCII digits gets a
+    negative code from `extras`.
+    """
+    codes = np.zeros(len(ids), dtype=np.int64)
+    if not len(ids) or not ids.dtype.itemsize:
+        return codes
+    chars = ids.view(np.uint32).reshape(len(ids), ids.dtype.itemsize // 4)
+
+    # Parse column by column (Horner's rule), noting rows with a non-digit
+    values = np.zeros(len(ids), dtype=np.int64)
+    length = np.zeros(len(ids), dtype=np.intp)
+    plain = ~(chars[:, MAX_PARSED_DIGITS:] != 0).any(axis=1)
+    for column in chars[:, :MAX_PARSED_DIGITS].T:
+        present = column != 0
+        plain &= ((column >= ZERO) & (column <= ZERO + 9)) | ~present
+        values = np.where(present, values * 10 + (column.astype(np.int64) - ZERO), values)
+        length += present
+    plain &= length > 0
+
+    for row in np.flatnonzero(~plain):
+        normalized = normalize_id(str(ids[row]))
+        if normalized:
+            codes[row] = int(normalized) if normalized.isascii() else extras.setdefault(normalized, -len(extras) - 1)
+
+    values = values[plain]
+    count = np.searchsorted(POWERS_OF_TEN, values, side='right')
+    valid = (count >= MIN_LENGTH) & (count <= MAX_LENGTH)
+    trailing_zero = valid & (values % 10 == 0)
+    suffix = valid & ~trailing_zero & np.isin(values % 100, (1, 2))
+    values[suffix] //= 100
+    while trailing_zero.any():
+        values[trailing_zero] //= 10
+        trailing_zero &= values % 10 == 0
+    valid &= values >= 10 ** (MIN_LENGTH - 1)
+    codes[plain] = np.where(valid, values, 0)
+    return codes
+
+
+def _normalize_codes(ids, extras):
+    """Normalize a sequence of IDs to int64 codes (see _normalize_batch)."""
+    ids = np.ascontiguousarray(np.asarray(ids, dtype=str).ravel())
+    if len(ids) <= BATCH_SIZE:
+        return _normalize_batch(ids, extras)
+    return np.concatenate([_normalize_batch(ids[i:i + BATCH_SIZE], extras) for i in range(0, len(ids), BATCH_SIZE)])
+
+
+def _codes_to_ids(codes, extras):
+    """Normalized ID strings for int64 codes, '' for 0."""
+    ids = codes.astype(f'U{MAX_LENGTH}')
+    ids[codes <= 0] = ''
+    if extras:
+        ids = ids.astype(object)
+        for normalized, code in extras.items():
+            ids[codes == code] = normalized
+        ids = ids.astype(str)
+    return ids
+
+
+def _sorted_unique(codes):
+    codes = np.sort(codes)
+    return codes[np.concatenate(([True], codes[1:] != codes[:-1]))] if len(codes) else codes
+
+
+def normalize_ids(ids):
+    """Normalize a sequence of IDs at once ('' for invalid IDs).
+
+    Equivalent to [normalize_id(i) or '' for i in ids]. Each distinct
+    spelling is normalized once, since IDs taken from logs repeat heavily.
+    From NUMPY_MIN_IDS IDs on this runs in batches of array operations and
+    returns a str array; smaller batches, or any without numpy, get a list.
+    """
+    ids = ids if isinstance(ids, list) else list(ids)
+    if len(ids) < NUMPY_MIN_IDS or load_numpy() is None:
+        normalized = {id_str: normalize_id(str(id_str)) or '' for id_str in dict.fromkeys(ids)}
+        return [normalized[id_str] for id_str in ids]
+    distinct = list(dict.fromkeys(ids))
+    if len(distinct) * 2 > len(ids):
+        # Mostly distinct: mapping back would cost more than it saves
+        extras = {}
+        return _codes_to_ids(_normalize_codes(ids, extras), extras)
+    position = {id_str: index for index, id_str in enumerate(distinct)}
+    inverse = np.array(list(map(position.__getitem__, ids)), dtype=np.intp)
+    extras = {}
+    return _codes_to_ids(_normalize_codes(distinct, extras), extras)[inverse]
+
+
+def reconcile(left, right):
+    """Compare two sources of raw IDs after normalization.
+
+    Returns arrays, in numeric order, of the normalized IDs found only on
+    the left, only on the right and on both sides, and the sorted raw IDs
+    that did not normalize on each side. `clusters` maps each normalized ID
+    that was written more than one way (across both sources) to its sorted
+    raw spellings.
+    """
+    if load_numpy() is None:
+        raise RuntimeError('reconcile requires numpy')
+    # Each distinct spelling once: left only, then both, then right only
+    left_set, right_set = set(left), set(right)
+    both = left_set & right_set
+    raw = list(left_set - both) + list(both) + list(right_set - both)
+    extras = {}
+    codes = _normalize_codes(raw, extras)
+    left_end, right_start = len(left_set), len(left_set) - len(both)
+    left_ids = _sorted_unique(codes[:left_end][codes[:left_end] != 0])
+    right_ids = _sorted_unique(codes[right_start:][codes[right_start:] != 0])
+
+    # Codes reached from more than one spelling
+    valid = np.sort(codes[codes != 0])
+    repeated = _sorted_unique(valid[1:][valid[1:] == valid[:-1]])
+    clusters = {}
+    for index in np.flatnonzero(np.isin(codes, repeated)):
+        clusters.setdefault(int(codes[index]), []).append(raw[index])
+    names = {code: normalized for normalized, code in extras.items()}
+    clusters = {names.get(code, str(code)): sorted(spellings) for code, spellings in sorted(clusters.items())}
+
+    invalid = np.flatnonzero(codes == 0)
+    return Reconciliation(
+        only_left=_codes_to_ids(np.setdiff1d(left_ids, right_ids, assume_unique=True), extras),
+        only_right=_codes_to_ids(np.setdiff1d(right_ids, left_ids, assume_unique=True), extras),
+        common=_codes_to_ids(np.intersect1d(left_ids, right_ids, assume_unique=True), extras),
+        clusters=clusters,
+        invalid_left=np.array(sorted(raw[i] for i in invalid[invalid < left_end]), dtype=str),
+        invalid_right=np.array(sorted(raw[i] for i in invalid[invalid >= right_start]), dtype=str),
+    )
+
+
+def read_source(spec):
+    """Raw IDs from 'checkin:PATH' (log and archives), 'debug:PATH' or a one-ID-per-line file.
+
+    A line of a plain file may be CSV; its first field is the ID, so Alma
+    user exports can be used directly.
+    """
+    kind, _, path = spec.partition(':')
+    if kind == 'checkin' and path:
+        from checkin_logs import iter_checkins
+        return [record['purdueId'] for record in iter_checkins(path)]
+    if kind == 'debug' and path:
+        from compare_logs import scan_debug_log
+        return [raw_id for raw_id, _ in scan_debug_log(path)]
+    with open(spec, 'r', encoding='utf-8', errors='replace') as f:
+        return [line.split(',', 1)[0].strip().strip('"') for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile Purdue IDs between two sources')
+    parser.add_argument('left', help="checkin:PATH, debug:PATH, or a file with one ID (or CSV row) per line")
+    parser.add_argument('right', help='Second source, in the same forms')
+    parser.add_argument('--show', type=int, default=20, help='IDs to list per category')
+    args = parser.parse_args()
+
+    if load_numpy() is None:
+        print("Error: numpy is required for reconciliation")
+        sys.exit(1)
+    try:
+        result = reconcile(read_source(args.left), read_source(args.right))
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for label, ids in [(f"Only in {args.left}", result.only_left), (f"Only in {args.right}", result.only_right),
+                       ("In both", result.common), (f"Invalid in {args.left}", result.invalid_left),
+                       (f"Invalid in {args.right}", result.invalid_right)]:
+        print(f"{label}: {len(ids)}")
+        for id_str in ids[:args.show]:
+            print(f"  {id_str}")
+    print(f"IDs written more than one way: {len(result.clusters)}")
+    for normalized, spellings in list(result.clusters.items())[:args.show]:
+        print(f"  {normalized}: {', '.join(spellings)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+from agreement_cache import fetch_user
+from agreement_xml import ParseError, append_agreement_note, find_agreement_note, parse_user, remove_roles, serialize_user
+from alma_client import RequestBudgetExceeded
+from bulk_runner import NoteScript, UserResult, run_note_script
+
+def process_user(client, user_id, dry_run=False, known=None):
+    """Fetch and parse a user once, then add or fix the agreement note with at most one PUT."""
+    messages = []
+    try:
+        # GET user data, conditionally if the cache holds a compliant record
+        response, validators, unchanged = fetch_user(client, user_id, known)
+
+        if unchanged:
+            messages.append(f"User {user_id} agreement note already in Internal segment (record unchanged)")
+            return UserResult(('already_correct',) + unchanged, messages, known[:2], record=validators)
+
+        if response.status_code != 200:
+            messages.append(f"Error getting user data: HTTP {response.status_code}")
+            return UserResult(('failed',), messages, status=response.status_code)
+
+        try:
+            root = parse_user(response.content)
+        except ParseError as e:
+            messages.append(f"Error parsing user XML: {str(e)}")
+            return UserResult(('failed',), messages)
+
+        note = find_agreement_note(root)
+        if note is None:
+            counters = ('no_note',)
+            done_counter = 'notes_added'
+            messages.append(f"User {user_id} does not have agreement note")
+            if dry_run:
+                messages.append(f"Would add agreement note to user {user_id}")
+                return UserResult(counters, messages, (False, None), record=validators)
+            append_agreement_note(root)
+            segment_type = None
+        else:
+            segment_type = note.get("segment_type")
+            if segment_type == "Internal":
+                messages.append(f"User {user_id} agreement note already in Internal segment")
+                return UserResult(('already_correct',), messages, (True, segment_type), record=validators)
+            counters = ('needs_update',)
+            done_counter = 'segments_fixed'
+            messages.append(f"User {user_id} has agreement note in {segment_type} segment")
+            if dry_run:
+                messages.append(f"Would update agreement note segment to Internal for user {user_id}")
+                return UserResult(counters, messages, (True, segment_type), record=validators)
+            note.set("segment_type", "Internal")
+
+        # PUT updated user data
+        remove_roles(root)
+        put_response = client.put_user(user_id, serialize_user(root))
+
+        if put_response.status_code == 200:
+            messages.append(f"Successfully updated user {user_id}")
+            return UserResult(counters + (done_counter,), messages, (True, "Internal"))
+        messages.append(f"Failed to update user {user_id}: HTTP {put_response.status_code}")
+        return UserResult(counters + ('failed',), messages, (note is not None, segment_type), put_response.status_code)
+
+    except RequestBudgetExceeded:
+        raise
+    except Exception as e:
+        messages.append(f"Error processing user {user_id}: {str(e)}")
+        return UserResult(('failed',), messages)
+
+# Counters bumped by each outcome of the bulk note job (see alma_bulk.py)
+BULK_OUTCOMES = {
+    'notes_added': ('no_note', 'notes_added'),
+    'segments_fixed': ('needs_update', 'segments_fixed'),
+    'already_internal': ('already_correct',),
+    'failed': ('failed',),
+}
+BULK_JOB_PARAMS = {'add_missing_note': 'true', 'fix_note_segment': 'true'}
+
+def is_known_compliant(status):
+    """A cached status needs no fetch if the note was already Internal."""
+    return status is not None and status[0] and status[1] == "Internal"
+
+SCRIPT = NoteScript(
+    name='reconcile_agreements',
+    description='Add missing agreement notes and fix their segments in one pass',
+    banner='agreement reconciliation script',
+    process_user=process_user,
+    counters=('no_note', 'notes_added', 'needs_update', 'segments_fixed', 'already_correct', 'failed'),
+    routine=('already_correct',),
+    is_known_compliant=is_known_compliant,
+    bulk_outcomes=BULK_OUTCOMES,
+    bulk_job_params=BULK_JOB_PARAMS,
+    summary=(
+        ("Users without agreement note", 'no_note'),
+        ("Agreement notes added", 'notes_added'),
+        ("Users with note in wrong segment", 'needs_update'),
+        ("Note segments fixed", 'segments_fixed'),
+        ("Users with note already in Internal segment", 'already_correct'),
+        ("Users with errors", 'failed'),
+    ),
+)
+
+def main():
+    run_note_script(SCRIPT)
+
+if __name__ == "__main__":
+    main()
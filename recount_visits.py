@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import numpy as np
+from checkin_analytics import parse_timestamps
+from checkin_logs import checkin_log_files, locked_log, replace_locked
+from run_metrics import add_metrics_arguments, count, finish_metrics, start_metrics, timer
+from validate_logs import DUPLICATE_WINDOW_SECONDS
+from visit_index import default_index_path, rebuild_index
+
+VISIT_COUNT = re.compile(rb'"visitCount"\s*:\s*(?:"[^"]*"|[^,}\s]*)')
+NO_VISIT_COUNT = -1
+
+
+def parse_record(line):
+    try:
+        return json.loads(line) if line.lstrip().startswith(b'{') else None
+    except ValueError:
+        return None
+
+
+def read_records(path):
+    """The parsed JSON object (or None) of each complete line of a log file, and their length in bytes.
+
+    A file of well-formed JSON lines is parsed as one JSON array in a single
+    call; one with torn, legacy CSV or blank lines is parsed line by line.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    size = data.rfind(b'\n') + 1
+    if not size:
+        return [], 0
+    try:
+        records = json.loads(b'[' + data[:size - 1].replace(b'\n', b',') + b']')
+        if len(records) == data.count(b'\n', 0, size) and all(type(record) is dict for record in records):
+            return records, size
+    except ValueError:
+        pass
+    return [parse_record(line) for line in data[:size - 1].split(b'\n')], size
+
+
+class CheckinHistory:
+    """Every JSON check-in in the main log and its archives, as parallel arrays.
+
+    `users` holds interned purdueId codes (ids[code] is the ID), `timestamps`
+    seconds since 1970, `visit_counts` the logged visitCount (-1 when it is
+    missing or not a number), `files` an index into `paths` and `lines` the
+    record's line number in its file. Lines that are not JSON check-ins with
+    a valid timestamp are not loaded and are left alone on rewrite.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.codes = {}
+        self.paths = []
+        self.stats = []  # (inode, bytes of complete lines read) per path
+        self.users = np.empty(0, dtype=np.int32)
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.visit_counts = np.empty(0, dtype=np.int64)
+        self.files = np.empty(0, dtype=np.int16)
+        self.lines = np.empty(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.users)
+
+    def intern(self, user_id):
+        code = self.codes.get(user_id)
+        if code is None:
+            code = self.codes[user_id] = len(self.ids)
+            self.ids.append(user_id)
+        return code
+
+    def load(self, checkin_log):
+        """Read every log file once, keeping only the columns the recount needs."""
+        columns = {'users': [], 'timestamps': [], 'visit_counts': [], 'files': [], 'lines': []}
+        intern, codes = self.intern, self.codes
+        for path in checkin_log_files(checkin_log):
+            inode = os.stat(path).st_ino
+            records, size = read_records(path)
+            count('checkin_log_bytes', size)
+            records = [record if type(record) is dict else {} for record in records]
+            lines = [number for number, record in enumerate(records)
+                     if record.get('purdueId') and type(record.get('timestamp')) is str]
+            if len(lines) < len(records):
+                records = [records[number] for number in lines]
+            ids = [str(record['purdueId']) for record in records]
+            for user_id in set(ids).difference(codes):
+                intern(user_id)
+            users = [codes[user_id] for user_id in ids]
+            stamps = [record['timestamp'] for record in records]
+            visit_counts = [record.get('visitCount', NO_VISIT_COUNT) for record in records]
+            visit_counts = [value if type(value) is int else NO_VISIT_COUNT for value in visit_counts]
+            parsed = parse_timestamps(stamps)
+            valid = ~np.isnat(parsed)
+            columns['users'].append(np.array(users, dtype=np.int32)[valid])
+            columns['timestamps'].append(parsed[valid].astype(np.int64))
+            columns['visit_counts'].append(np.array(visit_counts, dtype=np.int64)[valid])
+            columns['files'].append(np.full(int(valid.sum()), len(self.paths), dtype=np.int16))
+            columns['lines'].append(np.array(lines, dtype=np.int32)[valid])
+            self.paths.append(path)
+            self.stats.append((inode, size))
+        for name, chunks in columns.items():
+            if chunks:
+                setattr(self, name, np.concatenate(chunks))
+
+
+def recount(users, timestamps, window=DUPLICATE_WINDOW_SECONDS):
+    """Each check-in's corrected visitCount, or 0 for a duplicate to drop.
+
+    Check-ins are sorted once by user and time. A check-in less than
+    `window` seconds after the user's last kept one is a duplicate, as
+    confirm.php would have refused it; the rest are numbered 1, 2, 3... per
+    user. Returns an int64 array in the order of the input.
+    """
+    n = len(users)
+    order = np.lexsort((timestamps, users))
+    users, timestamps = users[order], timestamps[order]
+    close = np.zeros(n, dtype=bool)
+    if n > 1:
+        close[1:] = (users[1:] == users[:-1]) & (timestamps[1:] - timestamps[:-1] < window)
+    keep = ~close
+
+    # A run of check-ins each within the window of the one before is settled
+    # at once when the whole run fits in the window. Longer runs (a user
+    # badging every 20 seconds) keep each check-in a full window after the
+    # last one kept, which needs a walk through that run.
+    starts = np.flatnonzero(keep)
+    ends = np.append(starts[1:], n) - 1
+    for run in np.flatnonzero(timestamps[ends] - timestamps[starts] >= window):
+        last = timestamps[starts[run]]
+        for i in range(starts[run] + 1, ends[run] + 1):
+            if timestamps[i] - last >= window:
+                keep[i] = True
+                last = timestamps[i]
+
+    kept = np.flatnonzero(keep)
+    kept_users = users[kept]
+    first = np.ones(len(kept), dtype=bool)
+    first[1:] = kept_users[1:] != kept_users[:-1]
+    position = np.arange(len(kept))
+    visits = np.zeros(n, dtype=np.int64)
+    visits[kept] = position - np.maximum.accumulate(np.where(first, position, 0)) + 1
+    result = np.empty(n, dtype=np.int64)
+    result[order] = visits
+    return result
+
+
+def set_visit_count(raw, visit_count):
+    """The check-in line with its visitCount replaced, or added if it had none."""
+    value = b'"visitCount":%d' % visit_count
+    patched, found = VISIT_COUNT.subn(value, raw, count=1)
+    if found:
+        return patched
+    end = raw.rfind(b'}')
+    return raw[:end] + b',' + value + raw[end:]
+
+
+def rewrite_file(path, stat, changes):
+    """Apply {line number: new visitCount, or 0 to drop} to one log file atomically.
+
+    The file is read and replaced under the writers' lock. Lines appended
+    after it was loaded are kept as they are. Returns False, changing
+    nothing, if the file was replaced or truncated since it was loaded.
+    """
+    inode, size = stat
+    with locked_log(path, 'rb') as f:
+        current = os.fstat(f.fileno())
+        if current.st_ino != inode or current.st_size < size:
+            return False
+        data = f.read()
+        out = []
+        for number, raw in enumerate(io.BytesIO(data[:size])):
+            visit_count = changes.get(number)
+            if visit_count is None:
+                out.append(raw)
+            elif visit_count:
+                out.append(set_visit_count(raw, visit_count))
+        out.append(data[size:])
+        replace_locked(path, b''.join(out))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recount every visitCount in the check-in log and its archives')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are rewritten too')
+    parser.add_argument('--window', type=int, default=DUPLICATE_WINDOW_SECONDS,
+                        help='Seconds within which a repeat check-in is a duplicate and dropped')
+    parser.add_argument('--dry-run', action='store_true', help='Report the corrections without rewriting any file')
+    parser.add_argument('--no-index', action='store_true', help='Do not rebuild the visit index afterwards')
+    add_metrics_arguments(parser, progress=False)
+    args = parser.parse_args()
+    metrics = start_metrics(args, 'recount_visits')
+
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    print("Loading check-ins...")
+    history = CheckinHistory()
+    with timer('load'):
+        history.load(args.checkin_log)
+    print(f"Loaded {len(history)} check-ins by {len(history.ids)} users from {len(history.paths)} file(s)")
+
+    with timer('recount'):
+        visits = recount(history.users, history.timestamps, args.window)
+    changed = visits != history.visit_counts
+    dropped = int(np.count_nonzero(visits == 0))
+    corrected = int(np.count_nonzero(changed)) - dropped
+    files = np.unique(history.files[changed])
+    count('checkins', len(history))
+    count('duplicates_dropped', dropped)
+    count('visit_counts_corrected', corrected)
+
+    print(f"\nDuplicates within {args.window}s to drop: {dropped}")
+    print(f"visitCounts to correct: {corrected}")
+    print(f"Files to rewrite: {len(files)} of {len(history.paths)}")
+    if args.dry_run or not len(files):
+        if args.dry_run:
+            print("\nDry run completed - no changes were made")
+        finish_metrics(metrics)
+        return
+
+    skipped = []
+    with timer('rewrite'):
+        for index in files.tolist():
+            rows = np.flatnonzero(changed & (history.files == index))
+            changes = dict(zip(history.lines[rows].tolist(), visits[rows].tolist()))
+            path = history.paths[index]
+            if rewrite_file(path, history.stats[index], changes):
+                print(f"Rewrote {path}")
+            else:
+                skipped.append(path)
+    if not args.no_index and os.path.exists(default_index_path(args.checkin_log)):
+        with timer('index_rebuild'):
+            users = rebuild_index(args.checkin_log, default_index_path(args.checkin_log))
+        print(f"Rebuilt the visit index for {users} users")
+    finish_metrics(metrics)
+    if skipped:
+        for path in skipped:
+            print(f"Error: {path} was replaced or truncated during the recount and was not rewritten")
+        print("Run the recount again once log rotation has finished")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ echo "=================================================\n\n";
 
 // --- CONFIGURATION ---
 $config = include(__DIR__ . '/config.php');
+require_once __DIR__ . '/log_writer.php';
 $debugLogPath = __DIR__ . '/' . $config['LOG_PATHS']['DEBUG'];
 $checkinLogPath = __DIR__ . '/' . $config['LOG_PATHS']['CHECKIN'];
 // --- END CONFIGURATION ---
@@ -123,12 +124,7 @@ if ($totalRecovered === 0) {
         }
         
         echo "Writing " . count($lines) . " recovered entries to $targetFile...\n";
-        $fp = fopen($targetFile, 'a');
-        if ($fp) {
-            foreach ($lines as $l) {
-                fwrite($fp, $l);
-            }
-            fclose($fp);
+        if (appendToLog($targetFile, implode('', $lines))) {
             @chmod($targetFile, 0666);
         } else {
             echo "ERROR: Could not open $targetFile for appending!\n";
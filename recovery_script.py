@@ -1,38 +1,68 @@
 #!/usr/bin/env python3
+import argparse
+import bisect
+import bz2
+import glob
+import gzip
+import json
+import os
 import re
-import xml.etree.ElementTree as ET
 import sys
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-import pytz
+from functools import lru_cache
+from checkin_logs import iter_checkins
+from run_metrics import Progress, add_metrics_arguments, count, finish_metrics, start_metrics, timer
+
+TIMEOUT = timedelta(seconds=60)  # Timeout for PUT request
+READ_BUFFER = 1024 * 1024
+
+TIMESTAMP_RE = re.compile(r'\[(.*?)\]')
+PURDUE_ID_RE = re.compile(r'Purdue ID: (\w+)')
+PUT_URL_RE = re.compile(r'PUT Request URL: .*?/users/(\w+)\?')
+VISIT_RE = re.compile(r'Visit #(\d+)')
+XML_DECL_RE = re.compile(r'<\?xml.*?\?>')
+
+# Markers of the events that make up one check-in in the debug log
+START_MARKER = 'Starting API call for Purdue ID:'
+PUT_MARKER = 'PUT Request URL:'
+LOGGED_MARKER = 'Logged check-in for user:'
+EVENT_MARKERS = ((b'Starting API call', 'start'), (b'PUT Request URL', 'put'), (b'Logged check-in', 'logged'))
+
+@lru_cache(maxsize=None)
+def eastern():
+    """Indianapolis time zone; pytz is imported on first use, not at startup."""
+    import pytz
+    return pytz.timezone('America/Indianapolis')
+
+@lru_cache(maxsize=4096)
+def localize_timestamp(ts_str):
+    """Parse a log timestamp in Eastern time; cached since consecutive lines share timestamps."""
+    try:
+        return eastern().localize(datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S'))
+    except ValueError:
+        return None  # Handle invalid timestamp format
 
 def parse_timestamp(log_line):
     """Extract timestamp from log line and convert to Eastern time."""
-    match = re.match(r'\[(.*?)\]', log_line)
-    if match:
-        ts_str = match.group(1)
-        try:
-            # Parse timestamp and ensure it's in Eastern time
-            ts = datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S')
-            eastern = pytz.timezone('America/Indianapolis')
-            ts = eastern.localize(ts)
-            return ts
-        except ValueError:
-            return None  # Handle invalid timestamp format
-    return None
+    if not log_line.startswith('['):
+        return None
+    match = TIMESTAMP_RE.match(log_line)
+    return localize_timestamp(match.group(1)) if match else None
 
 def extract_purdue_id(log_line):
     """Extract Purdue ID from API call or PUT request log line."""
-    match = re.search(r'Purdue ID: (\w+)', log_line)
+    match = PURDUE_ID_RE.search(log_line)
     if not match:
-        match = re.search(r'PUT Request URL: .*?/users/(\w+)\?', log_line)
+        match = PUT_URL_RE.search(log_line)
     return match.group(1) if match else None
 
 def extract_user_group(xml_text):
     """Extract user group from XML response."""
     try:
-        xml_text = re.sub(r'<\?xml.*?\?>', '', xml_text)  # Remove XML declaration
-        xml_text = re.sub(r'standalone="yes"', '', xml_text)  # Remove standalone attribute
-        root = ET.fromstring(xml_text)
+        xml_text = xml_text[xml_text.find('<?xml'):]  # Drop the log line prefix
+        xml_text = XML_DECL_RE.sub('', xml_text, count=1)  # Remove XML declaration
+        root = ET.fromstring(xml_text.strip())
         user_group = root.find(".//user_group")
         return user_group.text if user_group is not None else None
     except ET.ParseError:
@@ -40,85 +70,351 @@ def extract_user_group(xml_text):
 
 def get_visit_count(log_line):
     """Extract visit count from check-in log line."""
-    match = re.search(r'Visit #(\d+)', log_line)
+    match = VISIT_RE.search(log_line)
     return int(match.group(1)) if match else None
 
-def process_debug_log(debug_log_path, output_path):
-    """Process debug log and write recovered check-ins to output file."""
-    recovered_entries = set()  # Track unique entries
-    current_entry = {}
-    timeout_seconds = 60  # Timeout for PUT request
+def index_path(debug_log_path):
+    return debug_log_path + '.idx.json'
 
-    print(f"Processing debug log: {debug_log_path}")
-    print(f"Output will be written to: {output_path}")
+def build_event_index(debug_log_path):
+    """Build or extend the byte-offset index of check-in events in a debug log.
 
+    The index lists [offset, timestamp, kind] for every "Starting API call",
+    "PUT Request URL" and "Logged check-in" line and is saved next to the log.
+    A log that only grew since the last build is scanned from where the
+    previous build stopped.
+    """
+    stat = os.stat(debug_log_path)
+    index = {'inode': stat.st_ino, 'size': 0, 'events': []}
     try:
-        with open(debug_log_path, 'r') as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print(f"Error: Debug log file not found: {debug_log_path}")
-        return
+        with open(index_path(debug_log_path), 'r') as f:
+            saved = json.load(f)
+        if saved.get('inode') == stat.st_ino and saved.get('size', 0) <= stat.st_size:
+            index = saved
+    except (OSError, ValueError):
+        pass
+
+    if index['size'] < stat.st_size:
+        events = index['events']
+        with open(debug_log_path, 'rb', buffering=READ_BUFFER) as f:
+            f.seek(index['size'])
+            offset = index['size']
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # Line still being written; index it next time
+                for marker, kind in EVENT_MARKERS:
+                    if marker in raw:
+                        match = TIMESTAMP_RE.match(raw.decode('utf-8', errors='replace'))
+                        if match:
+                            events.append([offset, match.group(1), kind])
+                        break
+                offset += len(raw)
+        index['size'] = offset
+        tmp_path = index_path(debug_log_path) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path(debug_log_path))
+    return index
+
+def slice_for_range(index, start=None, end=None):
+    """Byte range (first, stop) of the debug log covering check-ins in [start, end].
+
+    Dates are 'YYYY-MM-DD'. The slice starts at the first API call on or after
+    `start` and stops at the first API call after `end`; None means open-ended.
+    """
+    first, stop = 0, None
+    for offset, ts, kind in index['events']:
+        if kind != 'start':
+            continue
+        if start and ts[:10] < start:
+            first = None
+            continue
+        if first is None:
+            first = offset
+        if end and ts[:10] > end:
+            stop = offset
+            break
+    if first is None:
+        first = index['size']  # Nothing on or after start
+    return first, stop
+
+def open_log(path):
+    """Open a plain, gzip or bzip2 debug log for binary reading."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb', buffering=READ_BUFFER)
+
+def is_compressed(path):
+    return path.endswith(('.gz', '.bz2'))
+
+def iter_log_lines(debug_log_path, first=0, stop=None):
+    """Stream decoded lines of a debug log between two byte offsets."""
+    with open_log(debug_log_path) as f:
+        if first:
+            f.seek(first)
+        offset = first
+        for raw in f:
+            if stop is not None and offset >= stop:
+                break
+            offset += len(raw)
+            yield raw.decode('utf-8', errors='replace')
+
+def find_debug_logs(source):
+    """Expand a debug log path, directory or glob into the files to scan.
+
+    A directory yields its debug logs and those in its archives/ folder,
+    where admin.php's rotateDebugLogIfNeeded puts them, compressed or not.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for directory in (source, os.path.join(source, 'archives')):
+            for pattern in ('debug*.log', 'debug_log_*.txt'):
+                for suffix in ('', '.gz', '.bz2'):
+                    paths.extend(glob.glob(os.path.join(directory, pattern + suffix)))
+    elif os.path.exists(source):
+        paths = [source]
+    else:
+        paths = glob.glob(source)
+    return sorted(set(paths))
+
+def iter_recovered_entries(lines):
+    """Single-pass state machine yielding (purdue_id, timestamp, user_group, visit_count).
+
+    Each check-in shows up as an API call, a PUT, an XML response spanning
+    one or more lines, and a "Logged check-in" line, all within the timeout.
+    """
+    current_entry = {}
+    xml_lines = None
+    last_timestamp = None
+
+    for line in lines:
+        timestamp = parse_timestamp(line)
+
+        # An XML response runs until the next timestamped log line
+        if xml_lines is not None:
+            if timestamp is None:
+                xml_lines.append(line)
+                continue
+            current_entry['user_group'] = extract_user_group(''.join(xml_lines))
+            xml_lines = None
+
+        if timestamp is None:
+            timestamp = last_timestamp
+        else:
+            last_timestamp = timestamp
+        if timestamp is None:
+            continue
+
+        in_window = current_entry.get('timestamp') and (timestamp - current_entry['timestamp']) <= TIMEOUT
 
-    with open(output_path, 'a') as out_f:
-        for i, line in enumerate(lines):
+        # Check for new API call
+        if START_MARKER in line:
+            current_entry = {
+                'timestamp': timestamp,
+                'purdue_id': extract_purdue_id(line),
+                'put_request': False
+            }
+
+        # Check for PUT request
+        elif PUT_MARKER in line and current_entry.get('purdue_id') == extract_purdue_id(line):
+            current_entry['put_request'] = True
+
+        # Look for XML response
+        elif '<?xml' in line and in_window:
+            xml_lines = [line]
+
+        # Look for visit count and successful agreement
+        elif LOGGED_MARKER in line and in_window:
+            visit_count = get_visit_count(line)
+            if extract_purdue_id(line) != current_entry.get('purdue_id'):
+                continue  # skip if the logged in user is different
+
+            # Only process if we have all required information and PUT request was successful
+            if all(key in current_entry for key in ['timestamp', 'purdue_id', 'user_group']) and current_entry.get('put_request') and visit_count:
+                yield (current_entry['purdue_id'], current_entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
+                       current_entry['user_group'], visit_count)
+
+            current_entry = {}  # Clear entry after processing the check-in
+
+def in_date_range(entry, start=None, end=None):
+    ts_str = entry[1]
+    return not (start and ts_str[:10] < start or end and ts_str[:10] > end)
+
+def recover_file(debug_log_path, start=None, end=None):
+    """Recover every check-in in one debug log; runs in a worker process.
+
+    Returns (entries, first timestamp, head, tail). `head` holds the lines
+    within the timeout of the file's first line that come before its first
+    API call, and `tail` the lines from its last API call on while that
+    check-in could still complete, so that stitch_rotated_files can recover
+    a check-in split between this file and its neighbour.
+    """
+    first, stop = 0, None
+    if (start or end) and not is_compressed(debug_log_path):
+        first, stop = slice_for_range(build_event_index(debug_log_path), start, end)
+    head, tail = [], []
+    first_timestamp = None
+
+    def lines():
+        nonlocal tail, first_timestamp
+        in_head = True
+        tail_started = None
+        for line in iter_log_lines(debug_log_path, first, stop):
             timestamp = parse_timestamp(line)
+            if timestamp is not None and first_timestamp is None:
+                first_timestamp = timestamp
+            if START_MARKER in line:
+                in_head = False
+                tail, tail_started = [], timestamp
+            if in_head:
+                if timestamp is not None and timestamp - first_timestamp > TIMEOUT:
+                    in_head = False
+                else:
+                    head.append(line)
+            if tail_started is not None:
+                if timestamp is not None and timestamp - tail_started > TIMEOUT:
+                    tail, tail_started = [], None  # That check-in is over
+                else:
+                    tail.append(line)
+            yield line
+
+    entries = [entry for entry in iter_recovered_entries(lines()) if in_date_range(entry, start, end)]
+    return entries, first_timestamp, head, tail
+
+def stitch_rotated_files(scans, start=None, end=None):
+    """Recover the check-ins split across rotated files of one debug log.
+
+    `scans` maps each path to its recover_file result. Files are put in
+    order by their first timestamp, and each file's tail is scanned
+    together with the next file's head. Check-ins that completed within the
+    tail come out again; the caller drops those.
+    """
+    ordered = sorted((scan for scan in scans.values() if scan[1] is not None), key=lambda scan: scan[1])
+    entries = []
+    for (_, _, _, tail), (_, _, head, _) in zip(ordered, ordered[1:]):
+        if tail:
+            entries.extend(entry for entry in iter_recovered_entries(tail + head)
+                           if in_date_range(entry, start, end))
+    return entries
+
+def load_logged_checkins(checkin_log):
+    """Map each Purdue ID to the sorted times it appears in the check-in log and archives."""
+    logged = {}
+    for record in iter_checkins(checkin_log):
+        try:
+            ts = datetime.strptime(record.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+        logged.setdefault(record['purdueId'], []).append(ts)
+    for times in logged.values():
+        times.sort()
+    return logged
+
+def already_logged(logged, purdue_id, ts_str):
+    """True if the check-in log has this user within the timeout of the recovered API call."""
+    times = logged.get(purdue_id)
+    if not times:
+        return False
+    ts = datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S')
+    i = bisect.bisect_left(times, ts - TIMEOUT)
+    return i < len(times) and times[i] <= ts + TIMEOUT
 
-            # Check for new API call
-            if 'Starting API call for Purdue ID:' in line:
-                new_purdue_id = extract_purdue_id(line)
-                # Reset current_entry if it's a new Purdue ID or timeout
-                if current_entry and (current_entry.get('purdue_id') != new_purdue_id or \
-                                      (timestamp - current_entry.get('timestamp', timestamp)) > timedelta(seconds=timeout_seconds)):
-                    current_entry = {}
-
-                current_entry = {
-                    'timestamp': timestamp,
-                    'purdue_id': new_purdue_id,
-                    'put_request': False
-                }
-
-            # Check for PUT request
-            elif 'PUT Request URL:' in line and current_entry.get('purdue_id') == extract_purdue_id(line):
-                current_entry['put_request'] = True
-
-            # Look for XML response
-            elif '<?xml' in line and current_entry.get('timestamp') and (timestamp - current_entry.get('timestamp')) <= timedelta(seconds=timeout_seconds):
-                xml_text = line
-                j = i + 1
-                while j < len(lines) and '<?xml' not in lines[j]:
-                    xml_text += lines[j]
-                    j += 1
-                current_entry['user_group'] = extract_user_group(xml_text)
-
-            # Look for visit count and successful agreement
-            elif 'Logged check-in for user:' in line and current_entry.get('timestamp') and (timestamp - current_entry.get('timestamp')) <= timedelta(seconds=timeout_seconds):
-                visit_count = get_visit_count(line)
-                log_purdue_id = extract_purdue_id(line)
-
-                if log_purdue_id != current_entry.get('purdue_id'):
-                    continue #skip if the logged in user is different
-
-                # Only process if we have all required information and PUT request was successful
-                if all(key in current_entry for key in ['timestamp', 'purdue_id', 'user_group']) and current_entry.get('put_request') and visit_count:
-                    entry_key = f"{current_entry['purdue_id']},{current_entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
-
-                    if entry_key not in recovered_entries:
-                        out_f.write(f"{current_entry['purdue_id']},{current_entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S')},"
-                                  f"{current_entry['user_group']},{visit_count}\n")
-                        recovered_entries.add(entry_key)
-                        print(f"Recovered entry for {current_entry['purdue_id']} at {current_entry['timestamp']}")
-
-                current_entry = {}  # Clear entry after processing the check-in
+def process_debug_logs(debug_log_paths, output_path, start=None, end=None, workers=None, checkin_log=None,
+                       progress=None):
+    """Recover check-ins from several debug logs in parallel and write them in timestamp order.
+
+    With a `progress` reporter, recovered entries are counted periodically
+    instead of printed one per line.
+    """
+    recovered_entries = set()  # Track unique entries
+    print(f"Output will be written to: {output_path}")
+
+    logged = {}
+    if checkin_log and os.path.exists(checkin_log):
+        print(f"Loading existing check-ins from {checkin_log} and its archives")
+        with timer('checkin_log_load'):
+            logged = load_logged_checkins(checkin_log)
+
+    entries = []
+    count('debug_log_bytes', sum(os.path.getsize(path) for path in debug_log_paths))
+    with timer('debug_log_scan'):
+        if len(debug_log_paths) == 1:
+            print(f"Processing debug log: {debug_log_paths[0]}")
+            entries = recover_file(debug_log_paths[0], start, end)[0]
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            scans = {}
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(recover_file, path, start, end): path for path in debug_log_paths}
+                for future in as_completed(futures):
+                    scans[futures[future]] = scan = future.result()
+                    print(f"Processed debug log: {futures[future]} ({len(scan[0])} check-ins)")
+                    entries.extend(scan[0])
+            found = set(entries)
+            entries.extend(entry for entry in stitch_rotated_files(scans, start, end) if entry not in found)
+    count('entries_found', len(entries))
+
+    skipped = 0
+    with timer('output_write'), open(output_path, 'a') as out_f:
+        for purdue_id, ts_str, user_group, visit_count in sorted(entries, key=lambda entry: entry[1]):
+            entry_key = f"{purdue_id},{ts_str}"
+            if entry_key in recovered_entries:
+                continue
+            recovered_entries.add(entry_key)
+            if already_logged(logged, purdue_id, ts_str):
+                skipped += 1
+                continue
+            out_f.write(f"{purdue_id},{ts_str},{user_group},{visit_count}\n")
+            if progress is None:
+                print(f"Recovered entry for {purdue_id} at {ts_str}")
+            else:
+                progress.update(len(recovered_entries) - skipped)
+    count('entries_recovered', len(recovered_entries) - skipped)
+    count('entries_already_logged', skipped)
+
+    print(f"\nRecovered {len(recovered_entries) - skipped} check-ins; {skipped} were already in the check-in log")
+
+def process_debug_log(debug_log_path, output_path, start=None, end=None):
+    """Process debug log and write recovered check-ins to output file."""
+    if not os.path.exists(debug_log_path):
+        print(f"Error: Debug log file not found: {debug_log_path}")
+        return
+    process_debug_logs([debug_log_path], output_path, start, end)
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python3 recovery_script.py <debug_log_path> <output_path>")
+    parser = argparse.ArgumentParser(description='Recover check-ins from the debug log')
+    parser.add_argument('debug_log_path', help='Debug log to scan, or a directory or glob of rotated debug logs')
+    parser.add_argument('output_path', nargs='?', help='CSV file recovered check-ins are appended to')
+    parser.add_argument('--start', help='Only recover check-ins on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Only recover check-ins on or before this date (YYYY-MM-DD)')
+    parser.add_argument('--build-index', action='store_true', help='Only build or extend the event index')
+    parser.add_argument('--workers', type=int, help='Processes used to scan several debug logs (default: CPU count)')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='Skip check-ins already in this log or its monthly archives')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    debug_log_paths = find_debug_logs(args.debug_log_path)
+    if not debug_log_paths:
+        print(f"Error: No debug logs found at {args.debug_log_path}")
         sys.exit(1)
-    
-    debug_log_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
-    process_debug_log(debug_log_path, output_path)
+
+    if args.build_index:
+        for path in debug_log_paths:
+            if not is_compressed(path):
+                index = build_event_index(path)
+                print(f"Indexed {len(index['events'])} events in {index_path(path)}")
+        return
+    if not args.output_path:
+        parser.error('output_path is required unless --build-index is given')
+
+    metrics = start_metrics(args, 'recovery_script')
+    progress = None if args.verbose else Progress('Check-ins recovered', interval=args.progress_every)
+    process_debug_logs(debug_log_paths, args.output_path, args.start, args.end, args.workers, args.checkin_log,
+                       progress)
+    finish_metrics(metrics)
 
 if __name__ == "__main__":
     main()
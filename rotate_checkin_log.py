@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from checkin_logs import archive_dir, iter_lines, locked_log, replace_locked
+
+STATE_FILENAME = '.checkin_rotation.json'
+TIMESTAMP_MONTH = re.compile(rb'"timestamp":\s*"(\d{4})-(\d{2})')
+
+
+def state_path(checkin_log):
+    """The rotation sidecar is kept next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', STATE_FILENAME)
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def save_state(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def line_month(raw):
+    """'YYYY_MM' of a check-in line's timestamp, or None if it has none."""
+    match = TIMESTAMP_MONTH.search(raw)
+    return f"{match.group(1).decode()}_{match.group(2).decode()}" if match else None
+
+
+def scan_months(checkin_log, offset, months):
+    """Add the months of complete lines from `offset` on; returns the new end offset."""
+    for _, offset, raw in iter_lines(checkin_log, offset):
+        month = line_month(raw)
+        if month is not None:
+            months.add(month)
+    return offset
+
+
+def split_by_month(data, current_month):
+    """Split the log into byte ranges to archive per month and bytes to keep.
+
+    Consecutive lines of the same month are moved as one range. Lines of the
+    current month, lines without a timestamp and an unterminated last line
+    stay in the main log.
+    """
+    moved = {}
+    kept = []
+    start = 0
+    range_start, range_month = 0, current_month
+    while start < len(data):
+        end = data.find(b'\n', start)
+        end = len(data) if end == -1 else end + 1
+        month = line_month(data[start:end]) if data[end - 1:end] == b'\n' else None
+        month = month or current_month
+        if month != range_month:
+            target = kept if range_month == current_month else moved.setdefault(range_month, [])
+            target.append(data[range_start:start])
+            range_start, range_month = start, month
+        start = end
+    target = kept if range_month == current_month else moved.setdefault(range_month, [])
+    target.append(data[range_start:])
+    return moved, b''.join(kept)
+
+
+def recover_pending(checkin_log, state):
+    """Undo the archive appends of a rotation that crashed before its rename.
+
+    If the main log was never replaced, its old entries are still there, so
+    the archives are truncated back to their sizes before the rotation and
+    the rotation simply runs again.
+    """
+    pending = state.get('pending')
+    if not pending:
+        return
+    if os.stat(checkin_log).st_ino == pending['inode']:
+        for archive, size in pending['archives'].items():
+            if os.path.exists(archive) and os.path.getsize(archive) > size:
+                with locked_log(archive, 'r+b') as f:
+                    f.truncate(size)
+                print(f"Rolled back interrupted rotation of {archive}")
+    state.clear()
+
+
+def append_archive(archive, data):
+    """Append a month's ranges to its archive, durably and on a line boundary."""
+    if not os.path.exists(archive):
+        open(archive, 'ab').close()
+        os.chmod(archive, 0o666)
+    with locked_log(archive, 'ab') as f:
+        if f.tell() and not ends_with_newline(archive):
+            f.write(b'\n')
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def rotate(checkin_log, current_month=None, dry_run=False):
+    """Move entries from past months out of the main log into their archives.
+
+    The sidecar remembers which months the main log holds up to a byte
+    offset, so when nothing needs rotating only the lines appended since the
+    last run are read. Returns {month: entries moved}.
+    """
+    current_month = current_month or time.strftime('%Y_%m')
+    path = state_path(checkin_log)
+    state = load_state(path)
+    recover_pending(checkin_log, state)
+
+    months = set()
+    stat = os.stat(checkin_log)
+    if state.get('inode') == stat.st_ino and stat.st_size >= state.get('offset', 0):
+        months.update(state.get('months', []))
+        offset = scan_months(checkin_log, state['offset'], months)
+    else:
+        offset = scan_months(checkin_log, 0, months)
+    if months <= {current_month}:
+        if not dry_run:
+            save_state(path, {'inode': stat.st_ino, 'offset': offset, 'months': sorted(months)})
+        return {}
+
+    with locked_log(checkin_log, 'rb') as f:
+        data = f.read()
+        moved, kept = split_by_month(data, current_month)
+        counts = {month: sum(chunk.count(b'\n') for chunk in chunks) for month, chunks in moved.items()}
+        if dry_run:
+            return counts
+
+        archives = {month: os.path.join(archive_dir(checkin_log), f'checkin_{month}.json') for month in moved}
+        state = {'pending': {'inode': os.fstat(f.fileno()).st_ino,
+                             'archives': {archive: os.path.getsize(archive) if os.path.exists(archive) else 0
+                                          for archive in archives.values()}}}
+        save_state(path, state)
+        os.makedirs(archive_dir(checkin_log), exist_ok=True)
+        for month, chunks in sorted(moved.items()):
+            append_archive(archives[month], b''.join(chunks))
+        replace_locked(checkin_log, kept)
+
+    kept_months = set()
+    offset = scan_months(checkin_log, 0, kept_months)
+    save_state(path, {'inode': os.stat(checkin_log).st_ino, 'offset': offset, 'months': sorted(kept_months)})
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move past months from the main check-in log into monthly archives')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json', help='JSON-lines check-in log')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be moved without moving it')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    counts = rotate(args.checkin_log, dry_run=args.dry_run)
+    if not counts:
+        print(f"Nothing to rotate ({time.perf_counter() - started:.3f}s)")
+        return
+    verb = "Would move" if args.dry_run else "Moved"
+    for month, count in sorted(counts.items()):
+        print(f"{verb} {count} entries to {os.path.join(archive_dir(args.checkin_log), f'checkin_{month}.json')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+from datetime import datetime
+
+FSYNC_EVERY = 100
+
+
+def runs_dir(checkin_log):
+    """Journals are kept in logs/runs next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', 'runs')
+
+
+def journal_outcome(result):
+    """Collapse a result's counters into skipped, updated or failed."""
+    if 'failed' in result.counters:
+        return 'failed'
+    if result.counters and set(result.counters) & {'updated', 'notes_added', 'segments_fixed'}:
+        return 'updated'
+    return 'skipped'
+
+
+class RunJournal:
+    """Append-only record of each user's outcome in one bulk run.
+
+    Every line is flushed as soon as the user completes, so after a crash or
+    Ctrl-C the journal holds everything finished before it. A torn final
+    line is ignored when the journal is read back.
+    """
+
+    def __init__(self, path, run_id, header):
+        self.path = path
+        self.run_id = run_id
+        self.header = header
+        self.entries = {}  # user_id -> last journal entry
+        self.unsynced = 0
+        if os.path.exists(path):
+            self.load()
+        self.f = open(path, 'a')
+        if not os.path.getsize(path):
+            self.write(header)
+        elif not self.ends_with_newline():
+            # Terminate a torn final line so the next entry starts cleanly
+            self.f.write('\n')
+
+    def ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @classmethod
+    def create(cls, directory, script, dry_run):
+        os.makedirs(directory, exist_ok=True)
+        run_id = f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        header = {'run_id': run_id, 'script': script, 'dry_run': dry_run,
+                  'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        return cls(os.path.join(directory, run_id + '.jsonl'), run_id, header)
+
+    @classmethod
+    def open(cls, directory, run_id):
+        path = os.path.join(directory, run_id + '.jsonl')
+        if not os.path.exists(path):
+            print(f"Error: No journal found for run {run_id} in {directory}")
+            sys.exit(1)
+        return cls(path, run_id, None)
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write from an interrupted run
+                if 'run_id' in entry and self.header is None:
+                    self.header = entry
+                elif 'user' in entry:
+                    self.entries[entry['user']] = entry
+
+    def write(self, entry):
+        self.f.write(json.dumps(entry) + '\n')
+        self.f.flush()
+        self.unsynced += 1
+        if self.unsynced >= FSYNC_EVERY:
+            os.fsync(self.f.fileno())
+            self.unsynced = 0
+
+    def record(self, user_id, result):
+        entry = {'user': user_id, 'outcome': journal_outcome(result),
+                 'status': result.status, 'counters': list(result.counters)}
+        self.entries[user_id] = entry
+        self.write(entry)
+
+    def completed_users(self):
+        return set(self.entries)
+
+    def failed_users(self):
+        return [user_id for user_id, entry in self.entries.items() if entry['outcome'] == 'failed']
+
+    def add_prior_counts(self, results, user_ids):
+        """Add the journalled counters of users finished before this resume."""
+        for user_id in user_ids:
+            results['processed'] += 1
+            for counter in self.entries[user_id].get('counters', []):
+                results[counter] = results.get(counter, 0) + 1
+
+    def close(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+
+
+def check_dry_run(journal, dry_run):
+    """Exit if the journalled run and this one differ in --dry-run."""
+    journalled = bool(journal.header and journal.header.get('dry_run'))
+    if journalled != dry_run:
+        mode = 'a dry run' if journalled else 'not a dry run'
+        flag = 'with' if journalled else 'without'
+        print(f"Error: Run {journal.run_id} was {mode}; resume it {flag} --dry-run")
+        sys.exit(1)
+
+
+def start_run(args, checkin_log, script, users):
+    """Open the journal for this run and choose which users it must process.
+
+    Returns (journal, users, resumed_users). A resumed run skips every user
+    already in the journal; --retry-failed replays only the failed ones.
+    Either must match the journalled run's --dry-run, since a preview
+    records users as done without changing them.
+    """
+    directory = runs_dir(checkin_log)
+    if args.retry_failed:
+        journal = RunJournal.open(directory, args.retry_failed)
+        check_dry_run(journal, args.dry_run)
+        return journal, journal.failed_users(), set()
+    if args.resume:
+        journal = RunJournal.open(directory, args.resume)
+        check_dry_run(journal, args.dry_run)
+        done = journal.completed_users()
+        return journal, (user_id for user_id in users if user_id not in done), done
+    return RunJournal.create(directory, script, args.dry_run), users, set()
+
+
+def add_journal_arguments(parser):
+    """Add the run journal options shared by the note scripts."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--resume', metavar='RUN_ID', help='Continue an interrupted run from its journal')
+    group.add_argument('--retry-failed', metavar='RUN_ID', help='Replay only the users that failed in a run')
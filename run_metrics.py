@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+import bisect
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+DEFAULT_PROGRESS_INTERVAL = 5.0
+PROFILE_LINES = 25
+
+_NO_TIMER = contextlib.nullcontext()
+# Metrics of the running script; the hooks below do nothing while it is None
+_active = None
+
+
+class TimerStats:
+    """Call count, total, maximum and histogram of one timed operation."""
+    __slots__ = ('calls', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, seconds, calls=1):
+        self.calls += calls
+        self.total += seconds
+        self.max = max(self.max, seconds / calls)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, seconds / calls * 1000)] += calls
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in ms."""
+        rank = self.calls * pct / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'total_s': round(self.total, 6),
+            'mean_ms': round(self.total / self.calls * 1000, 3) if self.calls else 0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max * 1000, 3),
+            'histogram_ms': {('inf' if bound == float('inf') else f'<={bound}'): count
+                             for bound, count in zip(BUCKETS_MS, self.buckets) if count},
+        }
+
+
+class Timer:
+    """Context manager adding the time spent in its block to one timer."""
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+
+class RunMetrics:
+    """Timers and counters of one script run, written out as JSON at the end.
+
+    Safe to update from worker threads. `path` is where finish_metrics
+    writes the file; scripts with a run journal default it to
+    logs/runs/<run-id>.metrics.json.
+    """
+
+    def __init__(self, script, path=None):
+        self.script = script
+        self.path = path
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.started = time.perf_counter()
+        self.timers = {}
+        self.counters = {}
+        self.info = {}
+        self.profiler = None
+        self.profile_path = None
+        self.lock = threading.Lock()
+
+    def timer(self, name):
+        return Timer(self, name)
+
+    def observe(self, name, seconds, calls=1):
+        with self.lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                stats = self.timers[name] = TimerStats()
+            stats.add(seconds, calls)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            counters = dict(self.counters)
+            timers = {name: stats.to_dict() for name, stats in sorted(self.timers.items())}
+        return {
+            'script': self.script,
+            'started': self.started_at,
+            'elapsed_s': round(elapsed, 3),
+            'info': self.info,
+            'counters': counters,
+            'throughput_per_s': {name: round(value / elapsed, 1) for name, value in counters.items()
+                                 if isinstance(value, (int, float)) and elapsed},
+            'timers': timers,
+        }
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def timer(name):
+    """Context manager timing `name` in the active run; free when none is active."""
+    return _active.timer(name) if _active is not None else _NO_TIMER
+
+
+def observe(name, seconds, calls=1):
+    if _active is not None:
+        _active.observe(name, seconds, calls)
+
+
+def count(name, amount=1):
+    if _active is not None:
+        _active.count(name, amount)
+
+
+def timed_iter(name, iterable):
+    """Yield from `iterable`, adding the time spent producing items to timer `name` once it ends."""
+    if _active is None:
+        yield from iterable
+        return
+    metrics = _active
+    spent = 0.0
+    items = 0
+    iterator = iter(iterable)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                spent += time.perf_counter() - started
+                break
+            spent += time.perf_counter() - started
+            items += 1
+            yield item
+    finally:
+        metrics.observe(name, spent)
+        metrics.count(f'{name}_items', items)
+
+
+class Progress:
+    """Prints one progress line at most every `interval` seconds instead of one per item."""
+
+    def __init__(self, label, total=None, interval=DEFAULT_PROGRESS_INTERVAL, out=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.out = out
+        self.started = time.monotonic()
+        self.last = self.started
+
+    def update(self, done, detail=''):
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.write(done, detail, now)
+
+    def finish(self, done, detail=''):
+        self.write(done, detail, time.monotonic())
+
+    def write(self, done, detail, now):
+        elapsed = now - self.started
+        total = f"/{self.total}" if self.total is not None else ""
+        rate = f" ({done / elapsed:.1f}/s)" if elapsed > 0 else ""
+        print(f"{self.label}: {done}{total}{rate}{', ' + detail if detail else ''}", file=self.out or sys.stdout,
+              flush=True)
+
+
+def start_metrics(args, script):
+    """Begin collecting metrics (and a profile with --profile) for a script run."""
+    global _active
+    metrics = RunMetrics(script, getattr(args, 'metrics', None))
+    if getattr(args, 'profile', None):
+        import cProfile  # only loaded for --profile
+        metrics.profile_path = args.profile
+        metrics.profiler = cProfile.Profile()
+        metrics.profiler.enable()
+    _active = metrics
+    return metrics
+
+
+def finish_metrics(metrics):
+    """Stop profiling, print the top functions, and write the metrics file if it has a path."""
+    global _active
+    if _active is metrics:
+        _active = None
+    if metrics.profiler is not None:
+        import pstats
+        metrics.profiler.disable()
+        metrics.profiler.dump_stats(metrics.profile_path)
+        summary = io.StringIO()
+        pstats.Stats(metrics.profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        print(f"\nProfile saved to {metrics.profile_path}; top functions by cumulative time:")
+        print(summary.getvalue().strip())
+    if metrics.path:
+        metrics.write(metrics.path)
+        print(f"\nMetrics written to {metrics.path}")
+
+
+def add_metrics_arguments(parser, progress=True):
+    """Add the metrics, profiling and (optionally) progress options shared by the maintenance scripts."""
+    parser.add_argument('--metrics', metavar='FILE', help='Write timers, counters and throughput of the run as JSON')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Run under cProfile (main thread only) and save the stats to FILE')
+    if progress:
+        parser.add_argument('--progress-every', type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                            help='Seconds between progress lines')
+        parser.add_argument('--verbose', action='store_true', help='Print every item instead of periodic progress')
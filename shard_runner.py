@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Run a note script as N independent shards and merge their results.
+
+Users are assigned to shards by a stable hash of the exact ID sent to Alma,
+so every host computes the same partition and no user lands in two
+shards. Each shard is an ordinary run of fix_agreements.py,
+validate_note_segments.py or reconcile_agreements.py with --shard K/N. It
+has its own API key, journal, checkpoint and cache. It writes its counters
+to a results file that `merge` adds up.
+
+Alma's limit of 25 calls per second is per institution, not per key, so the
+shards share one rate budget. `run` gives each local shard an equal share
+of --rate; shards started by hand must be given theirs with --rate.
+
+    # Four local shards at 5 calls/s each, one API key per line of keys.txt
+    python3 shard_runner.py run fix_agreements --shards 4 --rate 20 --api-keys keys.txt -- --workers 4
+
+    # Shards run by hand on several hosts, then merged from one directory
+    python3 fix_agreements.py --shard 2/4 --rate 5 --api-key-env ALMA_KEY_2 --results shards/shard-2.json
+    python3 shard_runner.py merge shards/
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from alma_client import DEFAULT_RATE, positive_float
+
+SCRIPTS = ('fix_agreements', 'validate_note_segments', 'reconcile_agreements')
+API_KEY_ENV = 'ALMA_SHARD_API_KEY'
+
+
+def parse_shard(value):
+    """(index, count) from 'K/N' with 1 <= K <= N."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard '{value}' is not K/N")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard '{value}' needs 1 <= K <= N")
+    return index, count
+
+
+def shard_of(user_id, count):
+    """1-based shard of a user; the same on every host and Python version."""
+    digest = hashlib.sha1(user_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def in_shard(users, shard):
+    """Yield only the users belonging to `shard` ((index, count), or None for all)."""
+    if shard is None:
+        yield from users
+        return
+    index, count = shard
+    for user_id in users:
+        if shard_of(user_id, count) == index:
+            yield user_id
+
+
+def shard_name(shard):
+    """'shard2of4' for shard (2, 4); None when not sharded."""
+    return None if shard is None else f"shard{shard[0]}of{shard[1]}"
+
+
+def shard_label(script, shard):
+    """Name of a shard's journal and checkpoint: 'fix_agreements-shard2of4'."""
+    return script if shard is None else f"{script}-{shard_name(shard)}"
+
+
+def shard_api_key(args, api_key):
+    """The API key from --api-key-env if given, else the one in config.php."""
+    if not args.api_key_env:
+        return api_key
+    key = os.environ.get(args.api_key_env)
+    if not key:
+        print(f"Error: Environment variable {args.api_key_env} holds no API key")
+        sys.exit(1)
+    return key
+
+
+def write_results(path, script, shard, journal, results, api_calls):
+    """Save one run's counters for `merge`."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        'script': script,
+        'shard': list(shard) if shard else [1, 1],
+        'run_id': journal.run_id,
+        'journal': os.path.abspath(journal.path),
+        'api_calls': api_calls,
+        'results': results,
+    }
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def journal_users(path):
+    """Users recorded in a run journal; a torn final line is ignored."""
+    users = set()
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'user' in entry:
+                users.add(entry['user'])
+    return users
+
+
+def merge_results(paths):
+    """Add up shard result files; returns (script, counters, shards, problems)."""
+    shards = []
+    for path in paths:
+        with open(path, 'r') as f:
+            shards.append(json.load(f))
+    problems = []
+    scripts = {shard['script'] for shard in shards}
+    counts = {shard['shard'][1] for shard in shards}
+    if len(scripts) > 1 or len(counts) > 1:
+        problems.append(f"Result files mix scripts {sorted(scripts)} or shard counts {sorted(counts)}")
+    count = max(counts) if counts else 0
+    indexes = sorted(shard['shard'][0] for shard in shards)
+    missing = sorted(set(range(1, count + 1)) - set(indexes))
+    if missing:
+        problems.append(f"Missing shards: {', '.join(map(str, missing))}")
+    if len(indexes) != len(set(indexes)):
+        problems.append("Some shard has more than one result file")
+
+    counters = {}
+    for shard in shards:
+        for name, value in shard['results'].items():
+            if isinstance(value, bool):
+                counters[name] = counters.get(name, False) or value
+            elif isinstance(value, int):
+                counters[name] = counters.get(name, 0) + value
+
+    # The hash partition keeps shards disjoint; the journals prove it
+    owner = {}
+    overlap = 0
+    for shard in shards:
+        if not os.path.exists(shard['journal']):
+            continue
+        for user_id in journal_users(shard['journal']):
+            if user_id in owner:
+                overlap += 1
+            owner[user_id] = shard['shard'][0]
+    if overlap:
+        problems.append(f"{overlap} users were processed by more than one shard")
+    return (scripts.pop() if len(scripts) == 1 else None), counters, shards, problems
+
+
+def print_merged(script, counters, shards, problems):
+    print(f"\nMerged {len(shards)} shard(s) of {script}:")
+    for shard in sorted(shards, key=lambda shard: shard['shard'][0]):
+        results = shard['results']
+        status = " (stopped early)" if results.get('stopped_early') else ""
+        print(f"  shard {shard['shard'][0]}/{shard['shard'][1]}: {results.get('processed', 0)} users, "
+              f"{shard['api_calls']} API calls, run {shard['run_id']}{status}")
+    print("\nSummary:")
+    for name, value in counters.items():
+        print(f"{name}: {value}")
+    print(f"API calls: {sum(shard['api_calls'] for shard in shards)}")
+    for problem in problems:
+        print(f"Error: {problem}")
+
+
+def read_api_keys(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def run_shards(script, count, script_args, results_dir, api_keys=None, rate=DEFAULT_RATE):
+    """Start one local process per shard and wait for all; returns the result file paths.
+
+    `rate` is the calls per second of all shards together; each gets an
+    equal share.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{script}.py')
+    processes = []
+    for index in range(1, count + 1):
+        results_path = os.path.join(results_dir, f'shard-{index}.json')
+        command = [sys.executable, script_path, *script_args, '--shard', f'{index}/{count}',
+                   '--rate', f'{rate / count:g}', '--results', results_path]
+        env = dict(os.environ)
+        if api_keys:
+            env[API_KEY_ENV] = api_keys[(index - 1) % len(api_keys)]
+            command += ['--api-key-env', API_KEY_ENV]
+        output = open(os.path.join(results_dir, f'shard-{index}.log'), 'w')
+        processes.append((index, subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, env=env), output))
+    print(f"Started {count} shard(s) of {script} at {rate / count:g} calls/s each; "
+          f"output in {results_dir}/shard-N.log")
+
+    paths = []
+    for index, process, output in processes:
+        code = process.wait()
+        output.close()
+        if code != 0:
+            print(f"Shard {index} exited with status {code}; see {output.name}")
+        paths.append(os.path.join(results_dir, f'shard-{index}.json'))
+    return [path for path in paths if os.path.exists(path)]
+
+
+def add_shard_arguments(parser):
+    """Add the sharding options shared by the note scripts."""
+    group = parser.add_argument_group('sharding')
+    group.add_argument('--shard', type=parse_shard, metavar='K/N',
+                       help='Only process the users hashed to shard K of N')
+    group.add_argument('--api-key-env', metavar='NAME', help='Read the Alma API key from this environment variable')
+    group.add_argument('--results', metavar='FILE', help='Write the run counters as JSON for shard_runner.py merge')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a note script as independent shards and merge their results')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='Run every shard as a local process, then merge',
+                                       usage='%(prog)s SCRIPT --shards N [options] [-- SCRIPT_OPTIONS]')
+    run_parser.add_argument('script', choices=SCRIPTS)
+    run_parser.add_argument('--shards', type=int, required=True, help='Number of shards')
+    run_parser.add_argument('--rate', type=positive_float, default=DEFAULT_RATE,
+                            help='Alma API calls per second for all shards together, split evenly')
+    run_parser.add_argument('--api-keys', help='File with one API key per line, used by shard in turn')
+    run_parser.add_argument('--results-dir', help='Directory for shard results and output '
+                                                  '(default: logs/runs/<script>-shards-<time>)')
+    merge_parser = subparsers.add_parser('merge', help='Merge the result files of shards run elsewhere')
+    merge_parser.add_argument('results', nargs='+', help='Result files, or a directory holding shard-*.json')
+    # Everything after -- goes to every shard as is
+    argv = sys.argv[1:]
+    script_args = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:len(argv) - len(script_args) - ('--' in argv)])
+
+    if args.command == 'run':
+        if args.shards < 1:
+            print("Error: --shards must be at least 1")
+            sys.exit(1)
+        api_keys = None
+        if args.api_keys:
+            try:
+                api_keys = read_api_keys(args.api_keys)
+            except OSError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        if any(arg == '--rate' or arg.startswith('--rate=') for arg in script_args):
+            print("Error: Give the total rate as shard_runner.py run --rate; it is split across the shards")
+            sys.exit(1)
+        results_dir = args.results_dir or os.path.join(
+            'logs', 'runs', f"{args.script}-shards-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        paths = run_shards(args.script, args.shards, script_args, results_dir, api_keys, args.rate)
+    else:
+        paths = []
+        for path in args.results:
+            paths.extend(sorted(glob.glob(os.path.join(path, 'shard-*.json'))) if os.path.isdir(path) else [path])
+
+    if not paths:
+        print("Error: No shard result files found")
+        sys.exit(1)
+    script, counters, shards, problems = merge_results(paths)
+    print_merged(script, counters, shards, problems)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+<?php
+/**
+ * Precomputed dashboard summaries (logs/summaries/*.summary.json).
+ *
+ * Each check-in log file gets a small JSON snapshot of its per-month
+ * aggregates: check-ins per user group, per department and per day. An
+ * archive's snapshot is keyed by the archive's inode, size and modification
+ * time, so a closed month is summarized once. The main log's snapshot is
+ * keyed by inode and byte offset, and only lines appended since are read to
+ * bring it up to date; it also keeps the visitor IDs needed for the unique
+ * visitor count. dashboard_summary.py writes the same files from cron.
+ *
+ * Relies on parseLogLine() from admin.php.
+ */
+
+function summaryFilePath($logFile, $summaryDir) {
+    return $summaryDir . '/' . basename($logFile, '.json') . '.summary.json';
+}
+
+/**
+ * Folds complete log lines from the handle's position into $summary.
+ * Visitor IDs are kept for the main log and for the current month.
+ */
+function summarizeLogLines($handle, &$summary, $isMainLog) {
+    $currentMonth = date('Y-m');
+    while (($line = fgets($handle)) !== false) {
+        if (substr($line, -1) !== "\n") break; // still being written
+        $summary['offset'] += strlen($line);
+        $data = parseLogLine($line);
+        if ($data === null) continue;
+        try { $dt = new DateTime($data['timestamp']); } catch (Exception $e) { continue; }
+        $month = $dt->format('Y-m');
+        $date = $dt->format('Y-m-d');
+        $group = $data['userGroup'];
+        $dept = !empty($data['department']) ? $data['department'] : 'N/A';
+
+        $m = &$summary['months'][$month];
+        $m['groups'][$group] = ($m['groups'][$group] ?? 0) + 1;
+        $m['departments'][$dept] = ($m['departments'][$dept] ?? 0) + 1;
+        $m['days'][$date]['total'] = ($m['days'][$date]['total'] ?? 0) + 1;
+        $m['days'][$date]['groups'][$group] = ($m['days'][$date]['groups'][$group] ?? 0) + 1;
+        if ($isMainLog || $month === $currentMonth) {
+            $m['visitors'][$data['purdueId']] = 1;
+        }
+        unset($m);
+    }
+}
+
+/**
+ * Returns the summary of one log file, refreshing its snapshot if stale.
+ */
+function loadLogSummary($logFile, $summaryDir, $isMainLog) {
+    clearstatcache(true, $logFile);
+    $stat = @stat($logFile);
+    $empty = ['inode' => $stat ? $stat['ino'] : 0, 'size' => 0, 'mtime' => 0, 'offset' => 0, 'months' => []];
+    if (!$stat || !is_readable($logFile)) return $empty;
+
+    $summaryFile = summaryFilePath($logFile, $summaryDir);
+    $summary = @json_decode(@file_get_contents($summaryFile), true);
+    $valid = is_array($summary) && ($summary['inode'] ?? null) === $stat['ino'];
+    if ($isMainLog) {
+        // Appends only add lines past the offset; anything else is a rewrite
+        if (!$valid || $stat['size'] < $summary['offset']) $summary = $empty;
+        if ($stat['size'] === $summary['offset']) return $summary;
+    } else {
+        if ($valid && $summary['size'] === $stat['size'] && $summary['mtime'] === $stat['mtime']) return $summary;
+        $summary = $empty;
+    }
+
+    $handle = fopen($logFile, 'r');
+    if (!$handle) return $summary;
+    fseek($handle, $summary['offset']);
+    summarizeLogLines($handle, $summary, $isMainLog);
+    fclose($handle);
+    $summary['size'] = $stat['size'];
+    $summary['mtime'] = $stat['mtime'];
+
+    $tmpFile = $summaryFile . '.' . getmypid() . '.tmp';
+    if (@file_put_contents($tmpFile, json_encode($summary)) !== false) {
+        @chmod($tmpFile, 0666);
+        if (!@rename($tmpFile, $summaryFile)) @unlink($tmpFile);
+    }
+    return $summary;
+}
+
+/**
+ * Loads the summaries of the main check-in log and every monthly archive.
+ */
+function getDashboardSummaries($config) {
+    static $summaries = null;
+    if ($summaries !== null) return $summaries;
+    $summaries = [];
+    if (!isset($config['LOG_PATHS']['CHECKIN'])) return $summaries;
+    $checkInLog = dirname(__FILE__) . '/' . $config['LOG_PATHS']['CHECKIN'];
+    $summaryDir = dirname($checkInLog) . '/summaries';
+    if (!is_dir($summaryDir)) @mkdir($summaryDir, 0775, true);
+    foreach (glob(dirname($checkInLog) . '/archives/checkin_*.json') ?: [] as $archiveFile) {
+        $summaries[] = loadLogSummary($archiveFile, $summaryDir, false);
+    }
+    $summaries[] = loadLogSummary($checkInLog, $summaryDir, true);
+    return $summaries;
+}
+
+/**
+ * Merges one per-month field ('groups' or 'departments') across all files.
+ * @return array ['YYYY-MM' => [name => count]]
+ */
+function mergeMonthlyCounts($summaries, $field) {
+    $report = [];
+    foreach ($summaries as $summary) {
+        foreach ($summary['months'] as $month => $m) {
+            foreach ($m[$field] ?? [] as $name => $count) {
+                $report[$month][$name] = ($report[$month][$name] ?? 0) + $count;
+            }
+        }
+    }
+    return $report;
+}
+
+/**
+ * Check-ins per day of a month with their user groups.
+ * @return array ['YYYY-MM-DD' => ['total' => n, 'groups' => [group => n]]]
+ */
+function mergeDailyCounts($summaries, $month) {
+    $dailyData = [];
+    foreach ($summaries as $summary) {
+        foreach ($summary['months'][$month]['days'] ?? [] as $date => $day) {
+            if (!isset($dailyData[$date])) $dailyData[$date] = ['total' => 0, 'groups' => []];
+            $dailyData[$date]['total'] += $day['total'];
+            foreach ($day['groups'] as $group => $count) {
+                $dailyData[$date]['groups'][$group] = ($dailyData[$date]['groups'][$group] ?? 0) + $count;
+            }
+        }
+    }
+    ksort($dailyData);
+    return $dailyData;
+}
+
+/**
+ * Number of distinct visitors in a month (only tracked for the current month).
+ */
+function countUniqueVisitors($summaries, $month) {
+    $visitors = [];
+    foreach ($summaries as $summary) {
+        $visitors += $summary['months'][$month]['visitors'] ?? [];
+    }
+    return count($visitors);
+}
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from collections import Counter, namedtuple
+from datetime import datetime
+from checkin_logs import archive_month, checkin_log_files
+from run_metrics import add_metrics_arguments, count, finish_metrics, start_metrics, timer
+
+Problem = namedtuple('Problem', ['path', 'line', 'kind', 'detail'])
+
+LEGACY_CSV_LINE = re.compile(rb'^[^,{]+,\s*\d{4}-\d{2}-\d{2}')
+DEBUG_HEADER = re.compile(rb'^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] \[[A-Z]+\] ')
+# A debug line header that does not start the line means two writes interleaved
+EMBEDDED_DEBUG_HEADER = re.compile(rb'.\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] \[(?:INFO|ERROR|WARNING|DEBUG)\] ')
+DETAIL_CHARS = 120
+TIMESTAMP_LENGTH = len('2025-01-31 12:00:00')
+# confirm.php refuses a second check-in by the same user within this window
+DUPLICATE_WINDOW_SECONDS = 30
+SCAN_CACHE_FILENAME = '.validate_logs_cache.json'
+SCAN_CACHE_VERSION = 1
+
+
+def detail(raw):
+    return raw.decode('utf-8', errors='replace').strip()[:DETAIL_CHARS]
+
+
+def iter_raw_lines(path):
+    """Yield (line number, raw line) for every line, including an unterminated last one."""
+    with open(path, 'rb') as f:
+        for number, raw in enumerate(f, 1):
+            yield number, raw
+
+
+def parse_time(timestamp):
+    """datetime of a 'YYYY-MM-DD HH:MM:SS' timestamp, or None if it is not one."""
+    if not isinstance(timestamp, str) or len(timestamp) != TIMESTAMP_LENGTH:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def sequence_problems(previous, timestamp, when, visit_count):
+    """(kind, detail) pairs for a user's check-in following `previous`.
+
+    `previous` is the (timestamp, visitCount) of the user's prior check-in;
+    either visitCount may be None in logs written before it was recorded.
+    """
+    last_timestamp, last_count = previous
+    if timestamp == last_timestamp:
+        yield 'duplicate', f"at {timestamp}"
+    elif timestamp < last_timestamp:
+        yield 'out_of_order', f"{timestamp} after {last_timestamp}"
+    else:
+        last_when = parse_time(last_timestamp)
+        if last_when is not None and (when - last_when).total_seconds() < DUPLICATE_WINDOW_SECONDS:
+            yield 'rapid_duplicate', f"{timestamp} within {DUPLICATE_WINDOW_SECONDS}s of {last_timestamp}"
+    if visit_count is not None and last_count is not None and visit_count != last_count + 1:
+        yield 'visit_count', f"visitCount {visit_count} after {last_count}"
+
+
+def check_checkin_file(path, known_checksum=None):
+    """Scan one check-in log file, or only checksum it if it matches `known_checksum`.
+
+    Returns (checksum, scan). `scan` is None when the checksum matched;
+    otherwise it is a dict with the file's record count, its problems as
+    [line, kind, detail] lists and, per Purdue ID, [first line, first
+    timestamp, first visitCount, last timestamp, last visitCount] so that
+    sequences can be followed into the next file. Runs in a worker process.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    checksum = hashlib.sha256(data).hexdigest()
+    if checksum == known_checksum:
+        return checksum, None
+
+    problems = []
+    users = {}
+    records = 0
+    for number, raw in enumerate(io.BytesIO(data), 1):
+        if not raw.endswith(b'\n'):
+            problems.append([number, 'partial', detail(raw)])
+            continue
+        line = raw.strip()
+        if not line:
+            continue
+        if not line.startswith(b'{'):
+            if not LEGACY_CSV_LINE.match(line):
+                problems.append([number, 'torn', detail(raw)])
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            problems.append([number, 'interleaved' if b'}{' in line else 'torn', detail(raw)])
+            continue
+        if not isinstance(record, dict) or not record.get('purdueId') or not record.get('timestamp'):
+            problems.append([number, 'incomplete', detail(raw)])
+            continue
+        user_id, timestamp = str(record['purdueId']), record['timestamp']
+        when = parse_time(timestamp)
+        if when is None:
+            problems.append([number, 'incomplete', f"{user_id} has timestamp {timestamp!r}"])
+            continue
+        visit_count = record.get('visitCount')
+        if not isinstance(visit_count, int) or isinstance(visit_count, bool):
+            visit_count = None
+        records += 1
+        summary = users.get(user_id)
+        if summary is None:
+            users[user_id] = [number, timestamp, visit_count, timestamp, visit_count]
+            continue
+        for kind, text in sequence_problems((summary[3], summary[4]), timestamp, when, visit_count):
+            problems.append([number, kind, f"{user_id} {text}"])
+        if timestamp > summary[3]:
+            summary[3] = timestamp
+        summary[4] = visit_count
+    return checksum, {'records': records, 'problems': problems, 'users': users}
+
+
+def stitch_files(scans, full_history=True):
+    """Yield a Problem where a user's check-ins do not follow on from one file to the next.
+
+    `scans` is [(path, scan)] in log order. With the full history the first
+    check-in of each user must have visitCount 1; without the archives a
+    user's earliest check-in seen only sets where their sequence starts.
+    """
+    last = {}
+    for path, scan in scans:
+        for user_id, (line, first_timestamp, first_count, last_timestamp, last_count) in scan['users'].items():
+            previous = last.get(user_id)
+            if previous is None:
+                if full_history and first_count is not None and first_count != 1:
+                    yield Problem(path, line, 'visit_count', f"{user_id} first visitCount is {first_count}")
+            else:
+                for kind, text in sequence_problems(previous, first_timestamp, parse_time(first_timestamp),
+                                                    first_count):
+                    yield Problem(path, line, kind, f"{user_id} {text}")
+            if previous is None or last_timestamp > previous[0]:
+                last[user_id] = (last_timestamp, last_count)
+            else:
+                last[user_id] = (previous[0], last_count)
+
+
+def load_scan_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            cache = json.load(f)
+    except ValueError:
+        return {}
+    return cache.get('files', {}) if cache.get('version') == SCAN_CACHE_VERSION else {}
+
+
+def save_scan_cache(path, files):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        # json.dumps uses the C encoder; json.dump would stream through the Python one
+        f.write(json.dumps({'version': SCAN_CACHE_VERSION, 'files': files}))
+    os.replace(tmp_path, path)
+
+
+def file_stat(path):
+    """[inode, size, mtime in ns] of a file, compared before an archive is read again."""
+    stat = os.stat(path)
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def scan_checkin_logs(files, cache_path=None, workers=None):
+    """Scan check-in log files in parallel; returns ([(path, scan)] in log order, files reused).
+
+    Closed monthly archives whose inode, size and mtime match the cache are
+    not read at all. If only those changed (a copy or touch) the SHA-256 is
+    compared before parsing. The main log is always rescanned, since it is
+    still being appended to.
+    """
+    cached = load_scan_cache(cache_path)
+    known = {}
+    stats = {}
+    scans = {}
+    reused = 0
+    changed = False
+    for path in files:
+        if not archive_month(path):
+            continue
+        stats[path] = file_stat(path)
+        entry = cached.get(os.path.abspath(path))
+        if entry and entry.get('stat') == stats[path]:
+            scans[path] = entry
+            reused += 1
+        elif entry:
+            known[path] = entry['sha256']
+    pending = [path for path in files if path not in scans]
+    with timer('checkin_scan'):
+        if len(pending) <= 1 or workers == 1:
+            outcomes = [(path, check_checkin_file(path, known.get(path))) for path in pending]
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(check_checkin_file, path, known.get(path)): path for path in pending}
+                outcomes = [(futures[future], future.result()) for future in as_completed(futures)]
+    for path, (checksum, scan) in outcomes:
+        key = os.path.abspath(path)
+        count('checkin_log_bytes', os.path.getsize(path))
+        if scan is None:
+            scan = cached[key]
+            scan['stat'] = stats[path]
+            reused += 1
+            changed = True
+        elif archive_month(path):
+            cached[key] = scan = dict(scan, sha256=checksum, stat=stats[path])
+            changed = True
+        scans[path] = scan
+    live = {os.path.abspath(path) for path in files}
+    if cache_path and (changed or set(cached) - live):
+        save_scan_cache(cache_path, {key: entry for key, entry in cached.items() if key in live})
+    return [(path, scans[path]) for path in files], reused
+
+
+def check_debug_file(path):
+    """Yield a Problem for every debug log line that two writes interleaved.
+
+    Lines without a timestamp header are continuations of a multi-line
+    message (API XML responses) and are fine.
+    """
+    for number, raw in iter_raw_lines(path):
+        if not raw.endswith(b'\n'):
+            yield Problem(path, number, 'partial', detail(raw))
+        elif EMBEDDED_DEBUG_HEADER.search(raw):
+            yield Problem(path, number, 'interleaved', detail(raw))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan the logs and flag torn, duplicate or out-of-sequence records')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are read too')
+    parser.add_argument('--debug-log', default='logs/debug.log', help='Debug log to check')
+    parser.add_argument('--no-archives', action='store_true', help='Only check the main check-in log')
+    parser.add_argument('--show', type=int, default=20, help='Number of problems to list')
+    parser.add_argument('--workers', type=int, help='Processes scanning log files in parallel (default: CPU count)')
+    parser.add_argument('--cache', help='Checksums and scan results of closed archives '
+                                        f'(default: {SCAN_CACHE_FILENAME} next to the check-in log)')
+    parser.add_argument('--no-cache', action='store_true', help='Rescan every archive and save no checksums')
+    add_metrics_arguments(parser, progress=False)
+    args = parser.parse_args()
+    metrics = start_metrics(args, 'validate_logs')
+
+    problems = []
+    kinds = Counter()
+
+    def collect(found):
+        for problem in found:
+            kinds[problem.kind] += 1
+            if len(problems) < args.show:
+                problems.append(problem)
+
+    if os.path.exists(args.checkin_log):
+        files = checkin_log_files(args.checkin_log, include_archives=not args.no_archives)
+        print(f"Checking {len(files)} check-in log file(s)...")
+        cache_path = None
+        if not args.no_cache:
+            cache_path = args.cache or os.path.join(os.path.dirname(args.checkin_log) or '.', SCAN_CACHE_FILENAME)
+        scans, reused = scan_checkin_logs(files, cache_path, args.workers)
+        if reused:
+            print(f"Reused the scans of {reused} unchanged archive(s)")
+        order = {path: index for index, path in enumerate(files)}
+        found = [Problem(path, *problem) for path, scan in scans for problem in scan['problems']]
+        found.extend(stitch_files(scans, full_history=not args.no_archives))
+        found.sort(key=lambda problem: (order[problem.path], problem.line))
+        collect(found)
+        users = set()
+        for _, scan in scans:
+            users.update(scan['users'])
+        print(f"\nCheck-in records: {sum(scan['records'] for _, scan in scans)} from {len(users)} users")
+    else:
+        print(f"Check-in log not found at {args.checkin_log}, skipping")
+    if os.path.exists(args.debug_log):
+        print(f"Checking {args.debug_log}...")
+        with timer('debug_scan'):
+            collect(check_debug_file(args.debug_log))
+    else:
+        print(f"Debug log not found at {args.debug_log}, skipping")
+
+    for problem in problems:
+        print(f"{problem.path}:{problem.line}: {problem.kind}: {problem.detail}")
+    for kind, total in kinds.items():
+        count(f'problems_{kind}', total)
+    finish_metrics(metrics)
+    if not kinds:
+        print("No torn, duplicate or out-of-sequence records found")
+        return
+    print("\nProblems found: " + ", ".join(f"{kind} {total}" for kind, total in sorted(kinds.items())))
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+<?php
+/**
+ * Per-user visit index (logs/visit_index.sqlite) used by confirm.php.
+ *
+ * Holds each user's highest visitCount and latest check-in timestamp so a
+ * check-in is a single primary-key lookup instead of a scan of the check-in
+ * log and its archives. The index is built by visit_index.py and kept in
+ * step by confirm.php, which updates it in the same write transaction as
+ * each log append, and by admin.php, which corrects the user's entry in the
+ * same transaction as each edit or delete. meta.log_offset records how much
+ * of the main check-in log the index covers; lines appended past it by
+ * anything else are applied before the next lookup.
+ */
+
+/**
+ * Opens the visit index next to the check-in log.
+ * @return PDO|null Null if pdo_sqlite is missing or the index was never built
+ */
+function openVisitIndex($checkInLogFile) {
+    $indexFile = dirname($checkInLogFile) . '/visit_index.sqlite';
+    if (!extension_loaded('pdo_sqlite') || !is_writable($indexFile)) {
+        return null;
+    }
+    try {
+        $db = new PDO('sqlite:' . $indexFile);
+        $db->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
+        $db->setAttribute(PDO::ATTR_TIMEOUT, 5);
+        if (getVisitIndexMeta($db, 'log_offset') === null) {
+            return null;
+        }
+        return $db;
+    } catch (PDOException $e) {
+        visitIndexError('Could not open visit index: ' . $e->getMessage());
+        return null;
+    }
+}
+
+/**
+ * Logs a visit index failure to the debug log where the page has one
+ * (confirm.php), otherwise to the PHP error log (admin.php).
+ */
+function visitIndexError($message) {
+    if (function_exists('debugLog')) {
+        debugLog($message, 'ERROR');
+    } else {
+        error_log("Equipment Agreement: $message");
+    }
+}
+
+/**
+ * Starts a write transaction holding the index's write lock from the start,
+ * waiting up to the PDO timeout for another writer. PDO::beginTransaction()
+ * would take the lock only at the first write, so the transaction is run
+ * in SQL: end it with commitVisitIndexWrite() or rollBackVisitIndexWrite(),
+ * never PDO::commit() or PDO::rollBack(), which do not know it is open.
+ */
+function beginVisitIndexWrite(PDO $db) {
+    $db->exec('BEGIN IMMEDIATE');
+}
+
+function commitVisitIndexWrite(PDO $db) {
+    $db->exec('COMMIT');
+}
+
+/**
+ * Rolls back the write transaction, if one is still open, without throwing.
+ */
+function rollBackVisitIndexWrite(PDO $db) {
+    try {
+        $db->exec('ROLLBACK');
+    } catch (PDOException $e) {
+        // No transaction was open
+    }
+}
+
+function getVisitIndexMeta(PDO $db, $key) {
+    $stmt = $db->prepare('SELECT value FROM meta WHERE key = ?');
+    $stmt->execute([$key]);
+    $value = $stmt->fetchColumn();
+    return $value === false ? null : $value;
+}
+
+function setVisitIndexMeta(PDO $db, $key, $value) {
+    $db->prepare('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)')->execute([$key, (string)$value]);
+}
+
+/**
+ * Raises a user's entry to at least the given visit count and timestamp.
+ * Timestamps are 'Y-m-d H:i:s' strings, which sort chronologically.
+ */
+function recordVisitInIndex(PDO $db, $purdueId, $visitCount, $timestamp) {
+    $db->prepare(
+        'INSERT INTO visits (purdue_id, visit_count, last_visit) VALUES (?, ?, ?)
+         ON CONFLICT(purdue_id) DO UPDATE SET
+             visit_count = MAX(visit_count, excluded.visit_count),
+             last_visit = MAX(COALESCE(last_visit, \'\'), COALESCE(excluded.last_visit, \'\'))'
+    )->execute([(string)$purdueId, intval($visitCount), $timestamp]);
+}
+
+/**
+ * Replaces a user's entry with the visit count and last visit the logs now
+ * hold, found as confirm.php does without the index. Used after an admin
+ * edit or delete, which recordVisitInIndex could only ever raise. The entry
+ * is removed if the user has no check-ins left.
+ */
+function refreshVisitInIndex(PDO $db, $checkInLogFile, $purdueId) {
+    [$visitCount, $lastVisitTimestamp] = scanVisitHistory($checkInLogFile, $purdueId);
+    if ($visitCount === 0 && $lastVisitTimestamp === 0) {
+        $db->prepare('DELETE FROM visits WHERE purdue_id = ?')->execute([(string)$purdueId]);
+        return;
+    }
+    $db->prepare('INSERT OR REPLACE INTO visits (purdue_id, visit_count, last_visit) VALUES (?, ?, ?)')->execute(
+        [(string)$purdueId, $visitCount, $lastVisitTimestamp ? date('Y-m-d H:i:s', $lastVisitTimestamp) : null]);
+}
+
+/**
+ * Applies check-in log lines appended since the index was last updated.
+ * If the main log shrank it was rotated into the archives, whose entries
+ * are already indexed, so only the offset is reset.
+ */
+function catchUpVisitIndex(PDO $db, $checkInLogFile) {
+    $offset = intval(getVisitIndexMeta($db, 'log_offset'));
+    clearstatcache(true, $checkInLogFile);
+    $size = is_readable($checkInLogFile) ? filesize($checkInLogFile) : 0;
+    if ($size === $offset) {
+        return;
+    }
+    if ($size > $offset && ($handle = fopen($checkInLogFile, 'r'))) {
+        fseek($handle, $offset);
+        while (($line = fgets($handle)) !== false) {
+            if (substr($line, -1) !== "\n") break; // still being written
+            $offset += strlen($line);
+            $data = json_decode(trim($line), true);
+            if (is_array($data) && isset($data['purdueId'])) {
+                recordVisitInIndex($db, $data['purdueId'], $data['visitCount'] ?? 0, $data['timestamp'] ?? null);
+            }
+        }
+        fclose($handle);
+    } else {
+        $offset = $size;
+    }
+    setVisitIndexMeta($db, 'log_offset', $offset);
+}
+
+/**
+ * Looks up a user's visit count and last visit time in the index.
+ * Must be called inside the write transaction that will record the visit.
+ * @return array [visitCount, lastVisitTimestamp (Unix time, 0 if none)]
+ */
+function lookupVisitInIndex(PDO $db, $checkInLogFile, $purdueId) {
+    catchUpVisitIndex($db, $checkInLogFile);
+    $stmt = $db->prepare('SELECT visit_count, last_visit FROM visits WHERE purdue_id = ?');
+    $stmt->execute([(string)$purdueId]);
+    $row = $stmt->fetch(PDO::FETCH_ASSOC);
+    if (!$row) {
+        return [0, 0];
+    }
+    $lastVisit = $row['last_visit'] ? strtotime($row['last_visit']) : 0;
+    return [intval($row['visit_count']), $lastVisit ?: 0];
+}
+
+/**
+ * Records a check-in that was just appended to the main log and advances
+ * the covered offset past it.
+ */
+function recordAppendedVisit(PDO $db, $checkInLogFile, $purdueId, $visitCount, $timestamp) {
+    recordVisitInIndex($db, $purdueId, $visitCount, $timestamp);
+    clearstatcache(true, $checkInLogFile);
+    setVisitIndexMeta($db, 'log_offset', filesize($checkInLogFile));
+}
+
+/**
+ * Finds a user's visit count and last visit by scanning the logs: the main
+ * log first, then archives newest first until a month mentions the user.
+ * Used when the index is unavailable.
+ * @return array [visitCount, lastVisitTimestamp (Unix time, 0 if none)]
+ */
+function scanVisitHistory($checkInLogFile, $purdueId) {
+    $visitCount = 0;
+    $lastVisitTimestamp = 0;
+    $foundInMain = false;
+
+    // 1. Scan the main log file (logs/checkin_log.json)
+    if (is_readable($checkInLogFile) && ($handle = fopen($checkInLogFile, "r"))) {
+        while (($line = fgets($handle)) !== false) {
+            if (strpos($line, '"purdueId":"'.$purdueId.'"') !== false) {
+                $data = json_decode(trim($line), true);
+                if ($data) {
+                    $foundInMain = true;
+                    $visitCount = max($visitCount, intval($data['visitCount'] ?? 0));
+                    if (isset($data['timestamp'])) {
+                        $currentTs = strtotime($data['timestamp']);
+                        if ($currentTs > $lastVisitTimestamp) $lastVisitTimestamp = $currentTs;
+                    }
+                }
+            }
+        }
+        fclose($handle);
+    }
+
+    // 2. If not found in the main log, check the archives in reverse chronological order
+    if (!$foundInMain) {
+        $logDir = dirname($checkInLogFile);
+        $archiveDir = $logDir . '/archives';
+        if (is_dir($archiveDir)) {
+            $archiveFiles = glob($archiveDir . '/checkin_*.json');
+            if ($archiveFiles) {
+                // Sort files in reverse chronological order
+                rsort($archiveFiles);
+                foreach ($archiveFiles as $archiveFile) {
+                    if (is_readable($archiveFile) && ($handle = fopen($archiveFile, "r"))) {
+                        $foundInArchive = false;
+                        while (($line = fgets($handle)) !== false) {
+                            if (strpos($line, '"purdueId":"'.$purdueId.'"') !== false) {
+                                $data = json_decode(trim($line), true);
+                                if ($data) {
+                                    $foundInArchive = true;
+                                    $visitCount = max($visitCount, intval($data['visitCount'] ?? 0));
+                                    if (isset($data['timestamp'])) {
+                                        $currentTs = strtotime($data['timestamp']);
+                                        if ($currentTs > $lastVisitTimestamp) $lastVisitTimestamp = $currentTs;
+                                    }
+                                }
+                            }
+                        }
+                        fclose($handle);
+                        // Stop scanning older months if we found entries in the most recent archived month
+                        if ($foundInArchive) {
+                            break;
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+    return [$visitCount, $lastVisitTimestamp];
+}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sqlite3
+import stat
+import sys
+import time
+from checkin_logs import checkin_log_files, iter_lines, parse_line
+
+INDEX_FILENAME = 'visit_index.sqlite'
+
+
+def default_index_path(checkin_log):
+    """confirm.php looks for the index next to the main check-in log."""
+    return os.path.join(os.path.dirname(checkin_log) or '.', INDEX_FILENAME)
+
+
+def scan_visits(checkin_log):
+    """Collect each user's highest visitCount and latest timestamp from every log.
+
+    Returns (visits, log_offset), where visits maps purdueId to
+    [visit_count, last_visit] and log_offset is how far the main log was read.
+    """
+    visits = {}
+    log_offset = 0
+    for path in checkin_log_files(checkin_log):
+        offset = 0
+        for _, offset, line in iter_lines(path):
+            record = parse_line(line)
+            if record is None:
+                continue
+            try:
+                visit_count = int(record.get('visitCount') or 0)
+            except (TypeError, ValueError):
+                visit_count = 0
+            timestamp = record.get('timestamp') or ''
+            entry = visits.get(record['purdueId'])
+            if entry is None:
+                visits[record['purdueId']] = [visit_count, timestamp]
+            else:
+                if visit_count > entry[0]:
+                    entry[0] = visit_count
+                if timestamp > entry[1]:
+                    entry[1] = timestamp
+        if path == checkin_log:
+            log_offset = offset
+    return visits, log_offset
+
+
+def rebuild_index(checkin_log, index_path):
+    """Rebuild the visit index from the logs and swap it in atomically.
+
+    The new index is written to a temporary file and renamed over the old
+    one, so confirm.php sees either the old or the new index. Check-ins
+    appended during the rebuild lie past the recorded log offset and are
+    picked up by confirm.php's catch-up on the next check-in.
+    """
+    visits, log_offset = scan_visits(checkin_log)
+    tmp_path = index_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        CREATE TABLE visits (
+            purdue_id TEXT PRIMARY KEY,
+            visit_count INTEGER NOT NULL,
+            last_visit TEXT
+        );
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """)
+    conn.executemany("INSERT INTO visits VALUES (?, ?, ?)",
+                     ((user_id, count, last or None) for user_id, (count, last) in visits.items()))
+    conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                     [('log_offset', str(log_offset)), ('built_at', time.strftime('%Y-%m-%d %H:%M:%S'))])
+    conn.commit()
+    conn.close()
+    # The web server writes to the index, so give it the check-in log's permissions
+    os.chmod(tmp_path, stat.S_IMODE(os.stat(checkin_log).st_mode))
+    os.replace(tmp_path, index_path)
+    return len(visits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the per-user visit index used by confirm.php')
+    parser.add_argument('--checkin-log', default='logs/checkin_log.json',
+                        help='JSON-lines check-in log; its monthly archives are read too')
+    parser.add_argument('--index', help=f'Index file (default: {INDEX_FILENAME} next to the check-in log)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.checkin_log):
+        print(f"Error: Check-in log file not found at {args.checkin_log}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    index_path = args.index or default_index_path(args.checkin_log)
+    users = rebuild_index(args.checkin_log, index_path)
+    print(f"Indexed {users} users into {index_path} ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    main()